@@ -1,83 +1,16 @@
-class Fruit:
-    def __init__(self, name, price):
-        self.name = name
-        self.price = price
-    
-    def calculate_price(self, weight, discount=1.0):
-        return self.price * weight * discount
-
-class ShoppingSystem:
-    def __init__(self):
-        self.fruits = {
-            'apple': Fruit('蘋果', 8),
-            'strawberry': Fruit('草莓', 13),
-            'mango': Fruit('芒果', 20)
-        }
-    
-    def calculate_price(self, apple_weight=0, strawberry_weight=0, mango_weight=0, 
-                       strawberry_discount=1.0, discount_threshold=0, discount_amount=0):
-        # 計算總價
-        apple_price = self.fruits['apple'].calculate_price(apple_weight)
-        strawberry_price = self.fruits['strawberry'].calculate_price(strawberry_weight, strawberry_discount)
-        mango_price = self.fruits['mango'].calculate_price(mango_weight)
-        
-        total = apple_price + strawberry_price + mango_price
-        
-        # 應用滿減
-        if discount_threshold > 0 and total >= discount_threshold:
-            total -= discount_amount
-        return total
-    
-    def calculate_customer_a(self, apple_weight, strawberry_weight):
-        """顧客A：只買蘋果和草莓，無促銷"""
-        return self.calculate_price(apple_weight, strawberry_weight)
-    
-    def calculate_customer_b(self, apple_weight, strawberry_weight, mango_weight):
-        """顧客B：買三種水果，無促銷"""
-        return self.calculate_price(apple_weight, strawberry_weight, mango_weight)
-    
-    def calculate_customer_c(self, apple_weight, strawberry_weight, mango_weight):
-        """顧客C：買三種水果，草莓8折"""
-        return self.calculate_price(apple_weight, strawberry_weight, mango_weight, strawberry_discount=0.8)
-    
-    def calculate_customer_d(self, apple_weight, strawberry_weight, mango_weight):
-        """顧客D：買三種水果，草莓8折，滿100減10"""
-        return self.calculate_price(apple_weight, strawberry_weight, mango_weight, 
-                                   strawberry_discount=0.8, discount_threshold=100, discount_amount=10)
-    
-    def print_receipt(self, apple_weight, strawberry_weight, mango_weight, 
-                     strawberry_discount=1.0, discount_threshold=0, discount_amount=0, customer_name=""):
-        """打印購物小票"""
-        print(f"\n{'='*30}")
-        if customer_name:
-            print(f"顧客{customer_name}的購物小票")
-        else:
-            print("購物小票")
-        print('-'*30)
-        
-        # 計算各項價格
-        apple_price = self.fruits['apple'].calculate_price(apple_weight)
-        strawberry_price = self.fruits['strawberry'].calculate_price(strawberry_weight, strawberry_discount)
-        mango_price = self.fruits['mango'].calculate_price(mango_weight)
-        
-        if apple_weight > 0:
-            print(f"蘋果: {apple_weight}斤 × {self.fruits['apple'].price}元/斤 = {apple_price:.1f}元")
-        if strawberry_weight > 0:
-            discount_text = f" ({strawberry_discount:.1%}折)" if strawberry_discount != 1.0 else ""
-            print(f"草莓: {strawberry_weight}斤 × {self.fruits['strawberry'].price}元/斤{discount_text} = {strawberry_price:.1f}元")
-        if mango_weight > 0:
-            print(f"芒果: {mango_weight}斤 × {self.fruits['mango'].price}元/斤 = {mango_price:.1f}元")
-        subtotal = apple_price + strawberry_price + mango_price
-        print('-'*30)
-        total = subtotal
-        if discount_threshold > 0 and subtotal >= discount_threshold:
-            print(f"小計: {subtotal:.1f}元")
-            print(f"滿減優惠: -{discount_amount}元 (滿{discount_threshold}減{discount_amount})")
-            total -= discount_amount
-        
-        print(f"總計: {total:.1f}元")
-        print('='*30)
-        return total
+import contextlib
+import csv
+import json
+import os
+import sys
+
+# 計價核心在pricing_core（不依賴GUI），這裡匯入並保留原本的名稱
+from pricing_core import (
+    BASKET_SKUS, REASON_INVALID_SCHEME, REASON_NEGATIVE_WEIGHT, REASON_NOT_INTEGER,
+    Fruit, ShoppingSystem, check_weights, parse_weight, reason_message,
+)
+from profiling import DEFAULT_DUMP_INTERVAL, NULL_TRACER, PROFILE_ENV, ProfileSession
+from receipt_writer import DEFAULT_BUFFER_SIZE, ReceiptWriter
 
 def get_user_input(fruit_name, allow_zero=True):
     """獲取用戶輸入的水果斤數"""
@@ -88,98 +21,364 @@ def get_user_input(fruit_name, allow_zero=True):
             
             # 檢查是否為負數
             if weight < 0:
-                print("錯誤: 水果斤數不能為負數，請重新輸入")
+                print(f"錯誤: {reason_message(REASON_NEGATIVE_WEIGHT)}，請重新輸入")
                 continue
                 
             return weight
         except ValueError:
             print("錯誤: 請輸入整數，請重新輸入")
 
-def validate_weights(apple_weight, strawberry_weight, mango_weight, customer_type):
-    """驗證輸入的水果斤數"""
-    # 檢查是否全為零
-    if apple_weight == 0 and strawberry_weight == 0 and mango_weight == 0:
-        print("錯誤: 所有水果斤數不能都為零，請至少購買一種水果")
+def validate_weights(apple_weight, strawberry_weight, mango_weight, customer_type, promotions=None):
+    """驗證輸入的水果斤數（promotions: 方案表，預設為內建方案）"""
+    error = check_weights(apple_weight, strawberry_weight, mango_weight, customer_type, promotions)
+    if error:
+        print(f"錯誤: {error}")
         return False
+    return True
+
+TRANSACTION_FIELDS = ('scheme', 'apple', 'strawberry', 'mango')
+
+def iter_transaction_lines(stream, fmt='csv'):
+    """
+    逐行讀取交易記錄的原始文字（略過空行）
+    返回:
+        (標題欄位, (行號, 原始行)的迭代器)；jsonl格式沒有標題，標題欄位為None
+    """
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"不支持的檔案格式: {fmt}")
+    lines = ((line_no, line.strip()) for line_no, line in enumerate(stream, 1) if line.strip())
+    header = None
+    if fmt == 'csv':
+        for _, line in lines:
+            header = parse_header(line)
+            break
+    return header, lines
+
+def parse_header(line):
+    """解析csv標題列"""
+    return [field.strip().lower() for field in next(csv.reader([line]))]
+
+def parse_transaction(line, fmt='csv', header=None):
+    """解析一行交易記錄為欄位字典，無法解析時返回None"""
+    if fmt == 'jsonl':
+        try:
+            row = json.loads(line)
+        except ValueError:
+            return None
+        return row if isinstance(row, dict) else None
+    fields = next(csv.reader([line]))
+    return dict(zip(header, fields)) if header and len(fields) == len(header) else None
+
+def read_transactions(stream, fmt='csv'):
+    """
+    逐行讀取交易記錄（生成器，不會一次載入整個檔案）
+    參數:
+        stream: 文字檔案物件
+        fmt: 'csv'（需含標題列 scheme,apple,strawberry,mango）或 'jsonl'
+    產出:
+        (行號, 欄位字典, 原始行)；無法解析的行欄位字典為None
+    """
+    header, lines = iter_transaction_lines(stream, fmt)
+    for line_no, line in lines:
+        yield line_no, parse_transaction(line, fmt, header), line
+
+def price_transactions(rows, system):
+    """
+    驗證並計算每筆交易（生成器）
+    產出:
+        (行號, 方案, 蘋果斤數, 草莓斤數, 芒果斤數, 總價, 錯誤訊息)；
+        驗證失敗時總價為None並附上錯誤訊息
+    """
+    for line_no, choice, apple, strawberry, mango, quote, error in quote_transactions(rows, system):
+        yield line_no, choice, apple, strawberry, mango, None if error else quote.total, error
+
+def quote_transactions(rows, system):
+    """與price_transactions相同，但產出報價（QuoteResult）而非總價"""
+    for line_no, choice, apple_weight, strawberry_weight, mango_weight, error in \
+            validate_transactions(rows, system.promotions):
+        if error:
+            yield line_no, choice, apple_weight, strawberry_weight, mango_weight, None, error
+            continue
+        quote = system.quote_scheme(choice, apple_weight, strawberry_weight, mango_weight)
+        yield line_no, choice, apple_weight, strawberry_weight, mango_weight, quote, None
+
+def validate_transactions(rows, schemes):
+    """
+    解析並驗證每筆交易（生成器，不計價）
+    schemes: 方案表（方案代碼 → Promotion，例如ShoppingSystem.promotions）
+    產出:
+        (行號, 方案, 蘋果斤數, 草莓斤數, 芒果斤數, 錯誤訊息)；通過驗證時錯誤訊息為None
+    """
+    for line_no, choice, apple_weight, strawberry_weight, mango_weight, error in \
+            parse_transactions(rows, schemes):
+        if error is None:
+            error = check_weights(apple_weight, strawberry_weight, mango_weight, choice, schemes)
+        yield line_no, choice, apple_weight, strawberry_weight, mango_weight, error
+
+def parse_transactions(rows, schemes):
+    """
+    解析每筆交易的方案與斤數（生成器），只檢查能否解析，不檢查斤數規則
+    大量記錄可先解析成欄，再以pricing_core.validate_columns整欄驗證
+    產出:
+        與validate_transactions相同；斤數規則未檢查的行錯誤訊息為None
+    """
+    for line_no, row, raw in rows:
+        if row is None:
+            yield line_no, None, None, None, None, f"無法解析: {raw}"
+            continue
+        choice = str(row.get('scheme', '')).strip().upper()
+        if choice not in schemes:
+            yield line_no, choice, None, None, None, reason_message(REASON_INVALID_SCHEME, choice)
+            continue
+        try:
+            apple_weight = parse_weight(row.get('apple'))
+            strawberry_weight = parse_weight(row.get('strawberry'))
+            mango_weight = parse_weight(row.get('mango'))
+        except ValueError:
+            yield line_no, choice, None, None, None, reason_message(REASON_NOT_INTEGER)
+            continue
+        yield line_no, choice, apple_weight, strawberry_weight, mango_weight, None
+
+def guess_format(input_path):
+    """依副檔名判斷輸入格式"""
+    name = str(input_path)
+    if name.endswith('.frtx'):
+        return 'columnar'
+    return 'jsonl' if name.endswith(('.jsonl', '.json')) else 'csv'
+
+@contextlib.contextmanager
+def open_pricing_streams(input_path, output_path='-', reject_path=None):
+    """
+    開啟檔案計價所需的輸入、結果與拒絕記錄串流
+    '-'表示標準輸入/輸出；未指定拒絕檔時寫到標準錯誤
+    """
+    with contextlib.ExitStack() as stack:
+        if input_path == '-':
+            source = sys.stdin
+        else:
+            source = stack.enter_context(open(input_path, encoding='utf-8', newline=''))
+        if output_path == '-':
+            output = sys.stdout
+        else:
+            output = stack.enter_context(open(output_path, 'w', encoding='utf-8', newline=''))
+        if reject_path:
+            rejects = stack.enter_context(open(reject_path, 'w', encoding='utf-8', newline=''))
+        else:
+            rejects = sys.stderr
+        yield source, output, rejects
+
+def write_priced(results, output, rejects, header=True):
+    """
+    將price_transactions的結果寫為CSV
+    返回:
+        (成功筆數, 拒絕筆數)
+    """
+    result_writer = csv.writer(output, lineterminator='\n')
+    reject_writer = csv.writer(rejects, lineterminator='\n')
+    if header:
+        result_writer.writerow(TRANSACTION_FIELDS + ('total',))
+        reject_writer.writerow(('line', 'reason'))
     
-    # 檢查顧客A是否購買了芒果
-    if customer_type == 'A' and mango_weight > 0:
-        print("錯誤: 顧客A方案不支持購買芒果")
-        return False
+    accepted = rejected = 0
+    for line_no, choice, apple, strawberry, mango, total, error in results:
+        if error:
+            reject_writer.writerow((line_no, error))
+            rejected += 1
+        else:
+            result_writer.writerow((choice, apple, strawberry, mango, f"{total:.2f}"))
+            accepted += 1
+    return accepted, rejected
+
+def make_system(catalog_path=None):
+    """建立ShoppingSystem；指定目錄檔時以檔案中的單價與品名計價"""
+    system = ShoppingSystem()
+    if catalog_path:
+        from catalog_reload import watch_catalog  # 只有使用目錄檔時才載入
+        watch_catalog(system, catalog_path)
+    return system
+
+def file_mode(input_path, output_path='-', reject_path=None, fmt=None, catalog_path=None):
+    """
+    非互動模式：從檔案或標準輸入逐行計價，結果寫到檔案或標準輸出
+    驗證失敗的行寫入拒絕檔（未指定時寫到標準錯誤），不會中斷執行
+    catalog_path: 可選的商品目錄檔（見catalog_reload）
+    返回:
+        (成功筆數, 拒絕筆數)
+    """
+    if fmt is None:
+        fmt = guess_format(input_path)
     
-    # 檢查是否為負數（在get_user_input中已經檢查，這裡再次確認）
-    if apple_weight < 0 or strawberry_weight < 0 or mango_weight < 0:
-        print("錯誤: 水果斤數不能為負數")
-        return False
+    system = make_system(catalog_path)
+    with open_pricing_streams(input_path, output_path, reject_path) as (source, output, rejects):
+        return write_priced(price_transactions(read_transactions(source, fmt), system), output, rejects)
+
+def receipt_mode(input_path, receipt_path='-', index_path=None, reject_path=None, fmt=None,
+                 buffer_size=DEFAULT_BUFFER_SIZE, catalog_path=None):
+    """
+    批量重印小票：逐筆計價並以ReceiptWriter整塊寫出，內容與print_scheme_receipt相同
+    指定索引檔時使用分框格式，可再以receipt_writer.read_receipt依序號讀取
+    返回:
+        (成功筆數, 拒絕筆數)
+    """
+    if fmt is None:
+        fmt = guess_format(input_path)
     
-    return True
+    system = make_system(catalog_path)
+    with contextlib.ExitStack() as stack:
+        if input_path == '-':
+            source = sys.stdin
+        else:
+            source = stack.enter_context(open(input_path, encoding='utf-8', newline=''))
+        if receipt_path == '-':
+            sys.stdout.flush()
+            output = sys.stdout.buffer
+        else:
+            output = stack.enter_context(open(receipt_path, 'wb'))
+        index = stack.enter_context(open(index_path, 'wb')) if index_path else None
+        if reject_path:
+            rejects = stack.enter_context(open(reject_path, 'w', encoding='utf-8', newline=''))
+        else:
+            rejects = sys.stderr
+        
+        reject_writer = csv.writer(rejects, lineterminator='\n')
+        reject_writer.writerow(('line', 'reason'))
+        accepted = rejected = 0
+        with ReceiptWriter(output, index, buffer_size=buffer_size) as writer:
+            for line_no, choice, _, _, _, quote, error in quote_transactions(
+                    read_transactions(source, fmt), system):
+                if error:
+                    reject_writer.writerow((line_no, error))
+                    rejected += 1
+                else:
+                    writer.write_quote(quote, choice)
+                    accepted += 1
+        return accepted, rejected
 
-def interactive_mode():
+def interactive_mode(catalog_path=None, profile=None):
+    """
+    互動模式；指定目錄檔時每位顧客開始前檢查檔案，有變動即換用新價目
+    profile: 可選的profiling.ProfileSession，記錄每位顧客驗證、計價與小票輸出的延遲，
+        並在顧客之間定期寫出剖析結果
+    """
+    tracer = profile.tracer if profile is not None else NULL_TRACER
     system = ShoppingSystem()
+    watcher = None
+    if catalog_path:
+        from catalog_reload import watch_catalog
+        watcher = watch_catalog(
+            system, catalog_path,
+            on_reload=lambda version: print(f"\n已重新載入商品目錄（價目版本 {version}）"),
+            on_error=lambda exc: print(f"\n商品目錄載入失敗，沿用目前價目: {exc}"))
+    codes = list(system.promotions)
     while True:
+        if watcher is not None:
+            watcher.poll()
         print("請選擇顧客類型:")
-        print("A: 只買蘋果和草莓，無促銷")
-        print("B: 買三種水果，無促銷")
-        print("C: 買三種水果，草莓8折")
-        print("D: 買三種水果，草莓8折，滿100減10")
+        for promotion in system.promotions.values():
+            print(f"{promotion.code}: {promotion.description}")
         print("Q: 退出系統")
-        choice = input("請輸入選擇 (A/B/C/D/Q): ").strip().upper()
+        choice = input(f"請輸入選擇 ({'/'.join(codes)}/Q): ").strip().upper()
         
         if choice == 'Q':
             print("\n感謝使用，再見！")
             break
             
-        if choice not in ['A', 'B', 'C', 'D']:
-            print("錯誤: 請輸入 A, B, C, D 或 Q")
+        if choice not in system.promotions:
+            print(f"錯誤: 請輸入 {', '.join(codes)} 或 Q")
             continue
         
-        if choice == 'A':
-            while True:
-                apple_weight = get_user_input("蘋果")
-                strawberry_weight = get_user_input("草莓")
-                mango_weight = 0
-                
-                # 驗證輸入
-                if validate_weights(apple_weight, strawberry_weight, mango_weight, choice):
-                    break
-                else:
-                    print("請重新輸入...")
-                    
-            # 計算並顯示結果
-            total = system.print_receipt(
-                apple_weight, strawberry_weight, mango_weight, 
-                customer_name=choice
-            )
+        promotion = system.promotions[choice]
+        while True:
+            # 只詢問該方案可購買的水果
+            weights = {
+                sku: get_user_input(system.fruits[sku].name) if promotion.sells(sku) else 0
+                for sku in BASKET_SKUS
+            }
+            apple_weight = weights['apple']
+            strawberry_weight = weights['strawberry']
+            mango_weight = weights['mango']
             
-        else:  # B, C, D 顧客
-            while True:
-                apple_weight = get_user_input("蘋果")
-                strawberry_weight = get_user_input("草莓")
-                mango_weight = get_user_input("芒果")
-                
-                # 驗證輸入
-                if validate_weights(apple_weight, strawberry_weight, mango_weight, choice):
-                    break
-                else:
-                    print("請重新輸入...")
-            
-            # 根據顧客類型設置參數
-            if choice in ['C', 'D']:
-                strawberry_discount = 0.8
+            # 驗證輸入
+            with tracer.span('validate', 'cli'):
+                valid = validate_weights(apple_weight, strawberry_weight, mango_weight, choice,
+                                         system.promotions)
+            if valid:
+                break
             else:
-                strawberry_discount = 1.0
+                print("請重新輸入...")
+        
+        # 計算並顯示結果（與print_scheme_receipt相同，分段計時）
+        with tracer.span('checkout', 'event', scheme=choice):
+            with tracer.span('pricing', 'cli'):
+                quote = system.quote_scheme(choice, apple_weight, strawberry_weight, mango_weight)
+            with tracer.span('receipt_build', 'cli'):
+                receipt = quote.receipt_text(choice)
+            with tracer.span('print', 'cli'):
+                print(receipt)
+        if profile is not None:
+            profile.maybe_dump()
 
-            discount_threshold = 100 if choice == 'D' else 0
-            discount_amount = 10 if choice == 'D' else 0
-            
-            # 計算並顯示結果
-            total = system.print_receipt(
-                apple_weight, strawberry_weight, mango_weight,
-                strawberry_discount=strawberry_discount,
-                discount_threshold=discount_threshold,
-                discount_amount=discount_amount,
-                customer_name=choice
-            )
+def main(argv=None):
+    """命令列入口：無參數時進入互動模式，指定--input時進入檔案計價模式"""
+    import argparse  # 只有命令列入口需要，批量工作行程匯入本模組時不載入
+    
+    parser = argparse.ArgumentParser(description="水果價格試算系統")
+    parser.add_argument('--input', help="交易記錄檔案路徑，'-'表示標準輸入")
+    parser.add_argument('--output', default='-', help="計價結果輸出路徑，預設為標準輸出")
+    parser.add_argument('--rejects', help="拒絕記錄輸出路徑，預設為標準錯誤")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'columnar'],
+                        help="輸入格式，預設依副檔名判斷（.frtx為欄式二進位檔）")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="平行計價的行程數，0表示依CPU核心數；預設為1（單行程）")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="平行計價時每個區塊的行數")
+    parser.add_argument('--receipts', help="改為批量輸出購物小票到此路徑，'-'表示標準輸出")
+    parser.add_argument('--receipt-index', help="小票索引檔路徑（使用分框格式，可依序號讀取小票）")
+    parser.add_argument('--catalog', default=os.environ.get('FRUIT_CATALOG'),
+                        help="商品目錄檔（JSON或TOML），預設取環境變數FRUIT_CATALOG；"
+                             "互動模式下修改檔案即自動換用新價目")
+    parser.add_argument('--to-columnar', metavar='PATH',
+                        help="不計價，將交易記錄轉為欄式二進位檔（.frtx）後結束")
+    parser.add_argument('--profile', metavar='PREFIX', default=os.environ.get(PROFILE_ENV),
+                        help="互動模式的剖析輸出路徑前綴（寫出PREFIX.trace.json與PREFIX.pstats），"
+                             "預設取環境變數FRUIT_PROFILE")
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_DUMP_INTERVAL,
+                        help="剖析結果定期寫出的間隔（秒）")
+    args = parser.parse_args(argv)
+    
+    if args.input is None:
+        if not args.profile:
+            interactive_mode(args.catalog)
+            return 0
+        with ProfileSession(args.profile, args.profile_interval) as profile:
+            try:
+                interactive_mode(args.catalog, profile)
+            finally:
+                print("\n".join(profile.summary_lines()), file=sys.stderr)
+        return 0
+    
+    fmt = args.format or guess_format(args.input)
+    if args.receipt_index and not args.receipts:
+        parser.error("--receipt-index需要同時指定--receipts")
+    if args.receipts and (args.to_columnar or fmt == 'columnar'):
+        # 欄式路徑只輸出總價，不產生報價，無法輸出小票
+        parser.error("欄式輸入（.frtx或--format columnar）與--to-columnar不支援--receipts/--receipt-index")
+    if args.to_columnar:
+        from columnar import convert_transactions  # 需要numpy，只在轉檔時載入
+        convert_transactions(args.input, args.to_columnar, args.rejects, args.format)
+    elif fmt == 'columnar':
+        from columnar import price_columnar_file
+        price_columnar_file(args.input, args.output, catalog_path=args.catalog)
+    elif args.receipts:
+        receipt_mode(args.input, args.receipts, args.receipt_index, args.rejects, args.format,
+                     catalog_path=args.catalog)
+    elif args.workers == 1:
+        file_mode(args.input, args.output, args.rejects, args.format, args.catalog)
+    else:
+        from parallel_batch import price_file_parallel
+        price_file_parallel(args.input, args.output, args.rejects, args.format,
+                            workers=args.workers or None, chunk_size=args.chunk_size,
+                            catalog_path=args.catalog)
+    return 0
 
 if __name__ == "__main__":
-    interactive_mode()
\ No newline at end of file
+    sys.exit(main())
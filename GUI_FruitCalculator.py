@@ -1,83 +1,180 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import datetime
+import os
 
-class Fruit:
-    def __init__(self, name, price):
-        self.name = name
-        self.price = price
-    
-    def calculate_price(self, weight, discount=1.0):
-        """計算該水果的總價"""
-        return self.price * weight * discount
+from pricing_core import (
+    BASKET_SKUS, REASON_ALL_ZERO, REASON_NEGATIVE_WEIGHT, REASON_VALID, ShoppingSystem,
+    check_reason, reason_message,
+)
+from profiling import NULL_TRACER, session_from_env, traced
+from receipt_history import ReceiptHistory
 
-class ShoppingSystem:
-    def __init__(self):
-        self.fruits = {
-            'apple': Fruit('蘋果', 8),
-            'strawberry': Fruit('草莓', 13),
-            'mango': Fruit('芒果', 20)
-        }
+# tkinter在建立視窗時才載入（見load_tkinter），匯入本模組不需要GUI套件
+tk = ttk = messagebox = tkfont = None
+
+def load_tkinter():
+    """載入tkinter並設定模組層級的tk、ttk、messagebox、tkfont，返回tk模組"""
+    global tk, ttk, messagebox, tkfont
+    if tk is None:
+        import tkinter
+        import tkinter.font
+        import tkinter.messagebox
+        import tkinter.ttk
+        tk = tkinter
+        ttk = tkinter.ttk
+        messagebox = tkinter.messagebox
+        tkfont = tkinter.font
+    return tk
+
+# 水果名稱顏色
+FRUIT_COLORS = {
+    'apple': '#e74c3c',
+    'strawberry': '#e91e63',
+    'mango': '#f39c12',
+}
+DEFAULT_FRUIT_COLOR = '#2c3e50'
+
+# 即時試算：最後一次輸入後等待多少毫秒才重新計價
+LIVE_DEBOUNCE_MS = 150
+
+# 使用商品目錄檔時，每隔多少毫秒檢查一次檔案是否變動
+CATALOG_POLL_MS = 1000
+
+INITIAL_PROMPT = "請選擇顧客方案並輸入水果斤數，小票會隨輸入即時更新。"
+
+# 結果區文字樣式（建立Text時設定一次）
+RESULT_TAGS = {
+    'title': {'font': ('Microsoft JhengHei', 12, 'bold'), 'foreground': '#2c3e50'},
+    'normal': {'font': ('Microsoft JhengHei', 10), 'foreground': '#34495e'},
+    'highlight': {'font': ('Microsoft JhengHei', 11, 'bold'), 'foreground': '#e74c3c'},
+    'discount': {'font': ('Microsoft JhengHei', 10), 'foreground': '#27ae60'},
+}
+
+
+def price_label_text(price):
+    """輸入區的單價標籤文字，例如「8元/斤」"""
+    return f"{price}元/斤"
+
+
+def tag_lines(text):
+    """
+    為任意文字逐行挑選樣式，返回可直接傳給Text.insert的(文字, 標籤, ...)片段
+    報價小票請改用QuoteResult.gui_receipt_segments，不需逐行判斷
+    """
+    segments = []
+    for line in text.split('\n'):
+        if '顧客' in line and '購物小票' in line:
+            tag = 'title'
+        elif '【' in line and '】' in line:
+            tag = 'title'
+        elif '滿減優惠:' in line:
+            tag = 'discount'
+        elif '=' in line or '-' in line:
+            tag = 'normal'
+        elif '應付總額' in line:
+            tag = 'highlight'
+        else:
+            tag = 'normal'
+        if segments and segments[-1] == tag:
+            segments[-2] += line + '\n'
+        else:
+            segments += [line + '\n', tag]
+    return tuple(segments)
+
+
+class ReceiptHistoryPanel:
+    """
+    虛擬化的歷史小票列表
+    Listbox只放入可見的幾列，捲動時依捲動位置替換內容，成本與歷史筆數無關
+    """
+    def __init__(self, parent, history, on_select, rows=8):
+        load_tkinter()
+        self.history = history
+        self.on_select = on_select
+        self.top = 0          # 第一個可見列的索引
+        self.visible = rows   # 可見列數（依元件高度更新）
+        self.selected = None
+        
+        self.frame = tk.Frame(parent, bg='#f8f9fa')
+        self.listbox = tk.Listbox(
+            self.frame,
+            height=rows,
+            font=('Microsoft JhengHei', 10),
+            bg='#f8f9fa',
+            relief=tk.FLAT,
+            activestyle='none',
+            exportselection=False
+        )
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self._line_height = max(1, tkfont.Font(font=self.listbox.cget('font')).metrics('linespace'))
+        self.listbox.bind('<Configure>', self.on_resize)
+        self.listbox.bind('<<ListboxSelect>>', self.on_listbox_select)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.listbox.bind(sequence, self.on_wheel)
+        self.refresh()
     
-    def calculate_price(self, apple_weight=0, strawberry_weight=0, mango_weight=0, 
-                        strawberry_discount=1.0, discount_threshold=0, discount_amount=0):
-        """
-        通用計算方法
-        參數:
-            apple_weight: 蘋果斤數
-            strawberry_weight: 草莓斤數
-            mango_weight: 芒果斤數
-            strawberry_discount: 草莓折扣，默認為1.0（無折扣）
-            discount_threshold: 滿減門檻，默認為0（無滿減）
-            discount_amount: 滿減金額，默認為0（無滿減）
-        """
-        # 計算總價
-        apple_price = self.fruits['apple'].calculate_price(apple_weight)
-        strawberry_price = self.fruits['strawberry'].calculate_price(strawberry_weight, strawberry_discount)
-        mango_price = self.fruits['mango'].calculate_price(mango_weight)
-        
-        total = apple_price + strawberry_price + mango_price
-        
-        # 應用滿減
-        if discount_threshold > 0 and total >= discount_threshold:
-            total -= discount_amount
-        return total
-    
-    def get_detailed_calculation(self, apple_weight, strawberry_weight, mango_weight, 
-                                strawberry_discount=1.0, discount_threshold=0, discount_amount=0):
-        """獲取詳細的計算明細"""
-        # 計算各項價格
-        apple_price = self.fruits['apple'].calculate_price(apple_weight)
-        strawberry_price = self.fruits['strawberry'].calculate_price(strawberry_weight, strawberry_discount)
-        mango_price = self.fruits['mango'].calculate_price(mango_weight)
-        
-        subtotal = apple_price + strawberry_price + mango_price
-        discount_applied = False
-        discount_info = ""
-        final_total = subtotal
-        
-        # 應用滿減
-        if discount_threshold > 0 and subtotal >= discount_threshold:
-            discount_applied = True
-            discount_info = f"滿{discount_threshold}減{discount_amount}"
-            final_total -= discount_amount
-        
-        return {
-            'apple_price': apple_price,
-            'strawberry_price': strawberry_price,
-            'mango_price': mango_price,
-            'subtotal': subtotal,
-            'discount_applied': discount_applied,
-            'discount_amount': discount_amount if discount_applied else 0,
-            'discount_info': discount_info,
-            'final_total': final_total,
-            'strawberry_discount': strawberry_discount,
-            'strawberry_original': strawberry_weight * 13.0
-        }
+    def on_wheel(self, event):
+        """滑鼠滾輪（Windows/macOS為MouseWheel，X11為Button-4/5）"""
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_by(-3 if up else 3)
+        return 'break'
+    
+    def on_resize(self, event):
+        visible = max(1, event.height // self._line_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        """捲軸回呼：('moveto', 比例) 或 ('scroll', 步數, 'units'/'pages')"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.history)))
+        elif unit == 'pages':
+            self.scroll_by(int(amount) * self.visible)
+        else:
+            self.scroll_by(int(amount))
+    
+    def scroll_by(self, rows):
+        self.scroll_to(self.top + rows)
+    
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.history) - self.visible))
+        if top != self.top:
+            self.top = top
+            self.refresh()
+    
+    def refresh(self, follow=False):
+        """重新填入可見列；follow為True時捲到最後一筆"""
+        total = len(self.history)
+        if follow:
+            self.top = max(0, total - self.visible)
+        rows = self.history.rows(self.top, self.top + self.visible)
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *rows)
+        if self.selected is not None and self.top <= self.selected < self.top + len(rows):
+            self.listbox.selection_set(self.selected - self.top)
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + len(rows)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def on_listbox_select(self, event=None):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+            self.on_select(self.selected)
 
 class FruitPriceCalculatorGUI:
-    def __init__(self, root):
+    # 事件延遲追蹤器（見profiling）；未啟用剖析時各區段不計時
+    tracer = NULL_TRACER
+    
+    def __init__(self, root, catalog_path=None, tracer=None):
+        load_tkinter()
         self.root = root
+        if tracer is not None:
+            self.tracer = tracer
         self.root.title("水果價格試算系統 - 全功能版")
         
         # 設定全螢幕
@@ -90,61 +187,63 @@ class FruitPriceCalculatorGUI:
         # 設定應用程式主題顏色
         self.root.configure(bg='#f5f7fa')
         
-        # 創建水果價格試算系統實例
+        # 創建水果價格試算系統實例；指定商品目錄檔時定期檢查，修改後自動換用新價目
         self.shopping_system = ShoppingSystem()
+        self.catalog_watcher = None
+        if catalog_path:
+            from catalog_reload import watch_catalog  # 只有使用目錄檔時才載入
+            self.catalog_watcher = watch_catalog(self.shopping_system, catalog_path)
         
-        # 顧客方案資料
+        # 顧客方案資料（由promotions.PROMOTIONS產生）
         self.customer_options = {
-            "顧客A - 蘋果草莓，無促銷": {
-                "code": "A",
-                "description": "只買蘋果和草莓，無促銷",
-                "has_mango": False,
-                "strawberry_discount": 1.0,
-                "discount_threshold": 0,
-                "discount_amount": 0
-            },
-            "顧客B - 三種水果，無促銷": {
-                "code": "B",
-                "description": "買三種水果，無促銷",
-                "has_mango": True,
-                "strawberry_discount": 1.0,
-                "discount_threshold": 0,
-                "discount_amount": 0
-            },
-            "顧客C - 三種水果，草莓8折": {
-                "code": "C",
-                "description": "買三種水果，草莓8折",
-                "has_mango": True,
-                "strawberry_discount": 0.8,
-                "discount_threshold": 0,
-                "discount_amount": 0
-            },
-            "顧客D - 草莓8折，滿100減10": {
-                "code": "D",
-                "description": "草莓8折，滿100減10",
-                "has_mango": True,
-                "strawberry_discount": 0.8,
-                "discount_threshold": 100,
-                "discount_amount": 10
+            promotion.label: {
+                "code": promotion.code,
+                "description": promotion.description,
+                "has_mango": promotion.sells("mango"),
+                "strawberry_discount": promotion.discount_for("strawberry"),
+                "discount_threshold": promotion.discount_threshold,
+                "discount_amount": promotion.discount_amount,
+                "discount_tiers": promotion.discount_tiers,
+                "discounts": promotion.discounts
             }
+            for promotion in self.shopping_system.promotions.values()
         }
         
-        # 水果重量變數
-        self.apple_weight = tk.IntVar(value=0)
-        self.strawberry_weight = tk.IntVar(value=0)
-        self.mango_weight = tk.IntVar(value=0)
+        # 水果重量變數（購物籃的三種水果）
+        self.weight_vars = {sku: tk.IntVar(value=0) for sku in BASKET_SKUS}
+        self.apple_weight = self.weight_vars['apple']
+        self.strawberry_weight = self.weight_vars['strawberry']
+        self.mango_weight = self.weight_vars['mango']
         
         # 顧客類型變數
         self.selected_customer = tk.StringVar(value=list(self.customer_options.keys())[0])
         
-        # 芒果輸入框框架引用
+        # 水果輸入框框架與單價標籤引用
+        self.fruit_frames = {}
+        self.price_labels = {}
         self.mango_frame = None
         
+        # 即時試算狀態：待執行的after代號、目前小票對應的報價鍵與輸入提示
+        self._pending_recalc = None
+        self._shown_key = None
+        self._shown_hint = ""
+        
+        # 歷史小票（按下「計算價格」後加入）
+        self.history = ReceiptHistory()
+        
         # 建立應用程式框架
         self.create_main_layout()
         
         # 初始更新芒果輸入框狀態
         self.on_customer_changed()
+        
+        # 斤數或方案變動時排程即時試算
+        for var in self.weight_vars.values():
+            var.trace_add('write', self.schedule_recalc)
+        self.selected_customer.trace_add('write', self.schedule_recalc)
+        
+        if self.catalog_watcher is not None:
+            self.root.after(CATALOG_POLL_MS, self.poll_catalog)
     
     def create_main_layout(self):
         """建立主佈局"""
@@ -285,23 +384,31 @@ class FruitPriceCalculatorGUI:
         # 水果輸入表單
         self.fruit_entries = {}
         
-        # 蘋果輸入框
-        apple_frame = self.create_fruit_input(
-            input_frame, " 蘋果", "8元/斤", self.apple_weight, "#e74c3c"
-        )
-        apple_frame.pack(fill=tk.X, pady=8)
-        
-        # 草莓輸入框
-        strawberry_frame = self.create_fruit_input(
-            input_frame, " 草莓", "13元/斤", self.strawberry_weight, "#e91e63"
-        )
-        strawberry_frame.pack(fill=tk.X, pady=8)
+        # 依商品目錄建立各水果輸入框（名稱與單價取自目前的目錄快照）
+        snapshot = self.shopping_system.catalog.snapshot
+        for sku in BASKET_SKUS:
+            index = snapshot.index_of(sku)
+            fruit_frame = self.create_fruit_input(
+                input_frame, f" {snapshot.names[index]}", price_label_text(snapshot.prices[index]),
+                self.weight_vars[sku], FRUIT_COLORS.get(sku, DEFAULT_FRUIT_COLOR)
+            )
+            fruit_frame.pack(fill=tk.X, pady=8)
+            self.fruit_frames[sku] = fruit_frame
+            self.price_labels[sku] = fruit_frame.price_label
         
         # 芒果輸入框（保留引用）
-        self.mango_frame = self.create_fruit_input(
-            input_frame, " 芒果", "20元/斤", self.mango_weight, "#f39c12"
+        self.mango_frame = self.fruit_frames['mango']
+        
+        # 輸入提示（即時試算時顯示無效輸入的原因，不彈出對話框）
+        self.input_hint_label = tk.Label(
+            input_frame,
+            text="",
+            font=('Microsoft JhengHei', 9),
+            bg='white',
+            fg='#e74c3c',
+            anchor='w'
         )
-        self.mango_frame.pack(fill=tk.X, pady=8)
+        self.input_hint_label.pack(fill=tk.X, side=tk.BOTTOM, pady=(5, 0))
         
         return left_frame
     
@@ -323,13 +430,15 @@ class FruitPriceCalculatorGUI:
             anchor='w'
         ).pack(side=tk.LEFT)
         
-        tk.Label(
+        # 單價標籤（商品目錄重新載入時更新）
+        fruit_frame.price_label = tk.Label(
             name_frame,
             text=price_info,
             font=('Microsoft JhengHei', 10),
             bg='white',
             fg='#7f8c8d'
-        ).pack(side=tk.LEFT, padx=(5, 0))
+        )
+        fruit_frame.price_label.pack(side=tk.LEFT, padx=(5, 0))
         
         # 輸入框和調整按鈕
         input_row = tk.Frame(fruit_frame, bg='white')
@@ -429,6 +538,10 @@ class FruitPriceCalculatorGUI:
             pady=15
         )
         
+        # 設定不同文字的樣式（只需一次）
+        for tag, options in RESULT_TAGS.items():
+            self.result_text.tag_configure(tag, **options)
+        
         # 滾動條
         scrollbar = tk.Scrollbar(display_frame, command=self.result_text.yview)
         self.result_text.configure(yscrollcommand=scrollbar.set)
@@ -436,8 +549,23 @@ class FruitPriceCalculatorGUI:
         self.result_text.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        # 歷史小票列表
+        history_frame = tk.Frame(right_frame, bg='white')
+        history_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+        
+        tk.Label(
+            history_frame,
+            text="歷史小票（點選可重新顯示）",
+            font=('Microsoft JhengHei', 10, 'bold'),
+            bg='white',
+            fg='#2c3e50'
+        ).pack(anchor='w', pady=(0, 5))
+        
+        self.history_panel = ReceiptHistoryPanel(history_frame, self.history, self.show_history_receipt)
+        self.history_panel.frame.pack(fill=tk.X)
+        
         # 初始提示文字
-        self.update_result("請選擇顧客方案並輸入水果斤數，然後點擊「計算價格」按鈕。")
+        self.update_result(INITIAL_PROMPT)
         
         return right_frame
     
@@ -535,30 +663,36 @@ class FruitPriceCalculatorGUI:
                 self.mango_frame.pack(fill=tk.X, pady=8)
     
     def validate_inputs(self):
-        """驗證輸入"""
+        """驗證輸入（規則與命令列、批量驗證相同，見pricing_core.check_reason）"""
         try:
             apple = self.apple_weight.get()
             strawberry = self.strawberry_weight.get()
             mango = self.mango_weight.get()
-            
-            # 檢查是否全為零
-            if apple == 0 and strawberry == 0 and mango == 0:
-                messagebox.showwarning("警告", "請至少購買一種水果！所有水果斤數不能都為零。")
-                return False
-            
-            # 檢查是否為負數
-            if apple < 0 or strawberry < 0 or mango < 0:
-                messagebox.showerror("輸入錯誤", "水果斤數不能為負數！")
-                return False
-            
-            return True
         except tk.TclError:
             messagebox.showerror("輸入錯誤", "請輸入有效的整數！")
             return False
+        
+        customer_info = self.customer_options.get(self.selected_customer.get())
+        code = customer_info["code"] if customer_info is not None else None
+        reason = check_reason(apple, strawberry, mango, code, self.shopping_system.promotions)
+        if reason == REASON_VALID:
+            return True
+        message = reason_message(reason, code)
+        if reason == REASON_ALL_ZERO:
+            messagebox.showwarning("警告", message)
+        elif reason == REASON_NEGATIVE_WEIGHT:
+            messagebox.showerror("輸入錯誤", message)
+        else:
+            # 方案不販售的水果，例如顧客A購買芒果
+            messagebox.showwarning("方案限制", message)
+        return False
     
+    @traced('calculate_price')
     def calculate_price(self):
         """計算價格"""
-        if not self.validate_inputs():
+        with self.tracer.span('validate'):
+            valid = self.validate_inputs()
+        if not valid:
             return
         
         apple = self.apple_weight.get()
@@ -572,105 +706,127 @@ class FruitPriceCalculatorGUI:
         
         customer_info = self.customer_options[selected]
         
-        # 檢查顧客A是否購買了芒果
-        if not customer_info["has_mango"] and mango > 0:
-            messagebox.showwarning("方案限制", "顧客A方案不支持購買芒果！")
-            return
-        
-        # 計算價格
-        total = self.shopping_system.calculate_price(
-            apple_weight=apple,
-            strawberry_weight=strawberry,
-            mango_weight=mango if customer_info["has_mango"] else 0,
-            strawberry_discount=customer_info["strawberry_discount"],
-            discount_threshold=customer_info["discount_threshold"],
-            discount_amount=customer_info["discount_amount"]
-        )
-        
-        # 獲取詳細計算結果
-        details = self.shopping_system.get_detailed_calculation(
-            apple_weight=apple,
-            strawberry_weight=strawberry,
-            mango_weight=mango if customer_info["has_mango"] else 0,
-            strawberry_discount=customer_info["strawberry_discount"],
-            discount_threshold=customer_info["discount_threshold"],
-            discount_amount=customer_info["discount_amount"]
-        )
+        # 計價一次，明細與總價都來自同一份報價
+        with self.tracer.span('pricing'):
+            quote = self.shopping_system.get_quote(
+                apple_weight=apple,
+                strawberry_weight=strawberry,
+                mango_weight=mango if customer_info["has_mango"] else 0,
+                strawberry_discount=customer_info["strawberry_discount"],
+                discount_threshold=customer_info["discount_threshold"],
+                discount_amount=customer_info["discount_amount"],
+                discount_tiers=customer_info["discount_tiers"],
+                discounts=customer_info["discounts"]
+            )
         
         # 顯示結果
-        self.display_result(customer_info, details, total)
+        self.display_result(customer_info, quote)
+        self._shown_key = (customer_info["code"], apple, strawberry, mango,
+                           self.shopping_system.catalog_version)
+        
+        # 加入歷史小票
+        self.history.append(customer_info["code"], quote)
+        self.history_panel.refresh(follow=True)
     
-    def display_result(self, customer_info, details, total):
+    def display_result(self, customer_info, quote):
         """顯示計算結果"""
-        apple = self.apple_weight.get()
-        strawberry = self.strawberry_weight.get()
-        mango = self.mango_weight.get()
-        
-        result = "=" * 40 + "\n"
-        result += f"顧客{customer_info['code']} 購物小票\n"
-        result += "=" * 40 + "\n\n"
-        
-        # 顯示購買清單
-        result += "【購買清單】\n"
-        result += "-" * 30 + "\n"
-        
-        if apple > 0:
-            result += f" 蘋果: {apple}斤 × 8元/斤 = {details['apple_price']:.1f}元\n"
-        
-        if strawberry > 0:
-            discount_text = ""
-            if customer_info["strawberry_discount"] != 1.0:
-                discount_text = f" ({(1-customer_info['strawberry_discount'])*100:.0f}折)"
-            
-            result += f" 草莓: {strawberry}斤 × 13元/斤{discount_text} = {details['strawberry_price']:.1f}元\n"
-        
-        if mango > 0 and customer_info["has_mango"]:
-            result += f" 芒果: {mango}斤 × 20元/斤 = {details['mango_price']:.1f}元\n"
-        
-        result += "-" * 30 + "\n\n"
-        
-        # 顯示小計
-        result += f"【小計】 {details['subtotal']:.1f}元\n\n"
-        
-        # 顯示優惠信息（簡化版）
-        if details['discount_applied']:
-            result += f"滿減優惠: -{details['discount_amount']}元\n\n"
+        with self.tracer.span('display_result'):
+            segments = quote.gui_receipt_segments(customer_info['code'])
+        self.update_result_segments(segments)
+    
+    def show_history_receipt(self, index):
+        """重新顯示第index筆歷史小票"""
+        self.update_result_segments(self.history.quote(index).gui_receipt_segments(self.history.code(index)))
+        self._shown_key = None  # 下次即時試算時重繪目前輸入的小票
+    
+    def schedule_recalc(self, *args):
+        """輸入變動：重新開始防抖計時，連續輸入時只在停頓後計價一次"""
+        if self._pending_recalc is not None:
+            self.root.after_cancel(self._pending_recalc)
+        self._pending_recalc = self.root.after(LIVE_DEBOUNCE_MS, self.recalculate_live)
+    
+    @traced('recalculate_live')
+    def recalculate_live(self):
+        """
+        即時試算：輸入無效時只更新提示文字，不彈出對話框
+        報價鍵（方案、斤數、價目版本）未變時不重新計價，也不重繪小票
+        """
+        self._pending_recalc = None
+        customer_info = self.customer_options.get(self.selected_customer.get())
+        if customer_info is None:
+            return
+        try:
+            apple = self.apple_weight.get()
+            strawberry = self.strawberry_weight.get()
+            mango = self.mango_weight.get() if customer_info["has_mango"] else 0
+        except tk.TclError:
+            # 輸入途中（例如清空後尚未輸入）保留目前的小票
+            self.show_input_hint("請輸入有效的整數")
+            return
         
-        # 顯示總計
-        result += "=" * 40 + "\n"
-        result += f"【應付總額】 {details['final_total']:.1f}元\n"
-        result += "=" * 40
+        with self.tracer.span('validate'):
+            reason = check_reason(apple, strawberry, mango, customer_info["code"],
+                                  self.shopping_system.promotions)
+        if reason == REASON_ALL_ZERO:
+            self.show_input_hint("")
+            if self._shown_key is not None:
+                self._shown_key = None
+                self.update_result(INITIAL_PROMPT)
+            return
+        if reason:
+            self.show_input_hint(reason_message(reason, customer_info["code"]))
+            return
+        self.show_input_hint("")
         
-        self.update_result(result)
+        key = (customer_info["code"], apple, strawberry, mango, self.shopping_system.catalog_version)
+        if key == self._shown_key:
+            return
+        with self.tracer.span('pricing'):
+            quote = self.shopping_system.get_quote(
+                apple_weight=apple,
+                strawberry_weight=strawberry,
+                mango_weight=mango,
+                strawberry_discount=customer_info["strawberry_discount"],
+                discount_threshold=customer_info["discount_threshold"],
+                discount_amount=customer_info["discount_amount"],
+                discount_tiers=customer_info["discount_tiers"],
+                discounts=customer_info["discounts"]
+            )
+        self.display_result(customer_info, quote)
+        self._shown_key = key
+    
+    def poll_catalog(self):
+        """定期檢查商品目錄檔；重新載入後更新單價標籤並重新試算目前的輸入"""
+        if self.catalog_watcher.poll():
+            self.refresh_price_labels()
+            self.schedule_recalc()
+        self.root.after(CATALOG_POLL_MS, self.poll_catalog)
+    
+    def refresh_price_labels(self):
+        """依目前的目錄快照更新各水果的單價標籤（文字未變時不觸碰元件）"""
+        snapshot = self.shopping_system.catalog.snapshot
+        for sku, label in self.price_labels.items():
+            text = price_label_text(snapshot.prices[snapshot.index_of(sku)])
+            if label.cget('text') != text:
+                label.config(text=text)
+    
+    def show_input_hint(self, text):
+        """更新輸入提示（內容未變時不觸碰元件）"""
+        if text != self._shown_hint:
+            self._shown_hint = text
+            self.input_hint_label.config(text=text)
     
     def update_result(self, text):
-        """更新結果顯示區域"""
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        
-        # 設定不同文字的樣式
-        self.result_text.tag_configure('title', font=('Microsoft JhengHei', 12, 'bold'), foreground='#2c3e50')
-        self.result_text.tag_configure('normal', font=('Microsoft JhengHei', 10), foreground='#34495e')
-        self.result_text.tag_configure('highlight', font=('Microsoft JhengHei', 11, 'bold'), foreground='#e74c3c')
-        self.result_text.tag_configure('discount', font=('Microsoft JhengHei', 10), foreground='#27ae60')
-        
-        # 插入格式化文字
-        lines = text.split('\n')
-        for line in lines:
-            if '顧客' in line and '購物小票' in line:
-                self.result_text.insert(tk.END, line + '\n', 'title')
-            elif '【' in line and '】' in line:
-                self.result_text.insert(tk.END, line + '\n', 'title')
-            elif '滿減優惠:' in line:
-                self.result_text.insert(tk.END, line + '\n', 'discount')
-            elif '=' in line or '-' in line:
-                self.result_text.insert(tk.END, line + '\n', 'normal')
-            elif '應付總額' in line:
-                self.result_text.insert(tk.END, line + '\n', 'highlight')
-            else:
-                self.result_text.insert(tk.END, line + '\n', 'normal')
-        
-        self.result_text.config(state=tk.DISABLED)
+        """更新結果顯示區域（任意文字，逐行挑選樣式）"""
+        self.update_result_segments(tag_lines(text))
+    
+    def update_result_segments(self, segments):
+        """以(文字, 標籤, ...)片段更新結果顯示區域，一次插入"""
+        with self.tracer.span('text_insert'):
+            self.result_text.config(state=tk.NORMAL)
+            self.result_text.delete(1.0, tk.END)
+            self.result_text.insert(tk.END, *segments)
+            self.result_text.config(state=tk.DISABLED)
     
     def clear_entries(self):
         """清除所有輸入框"""
@@ -679,10 +835,15 @@ class FruitPriceCalculatorGUI:
         self.mango_weight.set(0)
         self.selected_customer.set(list(self.customer_options.keys())[0])
         self.on_customer_changed()  # 更新界面狀態
-        self.update_result("請選擇顧客方案並輸入水果斤數，然後點擊「計算價格」按鈕。")
+        self._shown_key = None
+        self.update_result(INITIAL_PROMPT)
 
 def main():
-    """主函數 - 啟動應用程式"""
+    """主函數 - 啟動應用程式（環境變數FRUIT_PROFILE可啟用剖析，見profiling）"""
+    load_tkinter()
+    session = session_from_env()
+    if session is not None:
+        session.start()
     root = tk.Tk()
     
     # 設定視窗圖標
@@ -691,11 +852,26 @@ def main():
     except:
         pass
     
-    # 建立應用程式
-    app = FruitPriceCalculatorGUI(root)
+    # 建立應用程式（環境變數FRUIT_CATALOG可指定商品目錄檔）
+    app = FruitPriceCalculatorGUI(root, os.environ.get('FRUIT_CATALOG'),
+                                  tracer=session.tracer if session is not None else None)
+    
+    if session is not None:
+        # 在事件之間定期寫出剖析結果
+        interval_ms = max(1, int(session.dump_interval * 1000))
+        
+        def dump_profile():
+            session.dump()
+            root.after(interval_ms, dump_profile)
+        root.after(interval_ms, dump_profile)
     
     # 啟動主迴圈
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        if session is not None:
+            session.close()
+            print("\n".join(session.summary_lines()))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
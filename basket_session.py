@@ -0,0 +1,229 @@
+"""
+掃描結帳的購物籃工作階段
+
+收銀台每掃一件商品（或移除一件）只更新該水果的一行金額，小計與滿減狀態隨之調整，
+不需要以全部斤數重新呼叫calculate_price。行金額依該水果的總斤數計算與捨入，
+因此任何時候的總價都與calculate_price完整重算的結果逐分相同。
+
+滿減門檻的變化以事件回報，例如「再買3.2元即可減10元」、「已滿100元，減10元」。
+分級滿減時，升到更高一檔回報REACHED、降到較低一檔回報LOST，同一檔內回報距離下一檔的PROGRESS。
+
+價目變動後，讀取小計、總價或掃描時都會先以新價目重算各行；價目變動造成的門檻變化
+與該次掃描的變化一起，在下一次scan回報。
+
+暫停中的購物籃可用to_basket()轉為精簡的quotes.Basket保存（只有方案代碼與斤數），
+之後以BasketSession.from_basket依當時的價目恢復。
+"""
+from money import cents_to_yuan, format_yuan, line_total_cents, to_basis_points, to_cents
+from pricing_core import BASKET_SKUS
+from promotions import basket_rates
+from quotes import Basket
+
+# 事件種類
+PROGRESS = 'progress'   # 尚未達到門檻，還差多少
+REACHED = 'reached'     # 達到門檻，開始滿減
+LOST = 'lost'           # 移除商品後低於門檻，不再滿減
+
+
+class ThresholdEvent:
+    """滿減門檻事件（金額為整數分）"""
+    __slots__ = ('kind', 'subtotal_cents', 'threshold_cents', 'amount_cents')
+
+    def __init__(self, kind, subtotal_cents, threshold_cents, amount_cents):
+        self.kind = kind
+        self.subtotal_cents = subtotal_cents
+        self.threshold_cents = threshold_cents
+        self.amount_cents = amount_cents
+
+    @property
+    def remaining_cents(self):
+        """距離門檻還差多少（分），已達門檻時為0"""
+        return max(self.threshold_cents - self.subtotal_cents, 0)
+
+    @property
+    def message(self):
+        threshold = format_yuan(self.threshold_cents)
+        amount = format_yuan(self.amount_cents)
+        if self.kind == REACHED:
+            return f"已滿{threshold}元，減{amount}元"
+        remaining = format_yuan(self.remaining_cents)
+        if self.kind == LOST:
+            return f"未滿{threshold}元，不再減{amount}元（還差{remaining}元）"
+        return f"再買{remaining}元即可減{amount}元"
+
+    def __repr__(self):
+        return f"ThresholdEvent({self.kind!r}, {self.subtotal_cents}, {self.threshold_cents}, {self.amount_cents})"
+
+
+class BasketSession:
+    """
+    掃描中的購物籃，保存各水果的斤數與行金額（分）
+    參數:
+        system: ShoppingSystem
+        code: 方案代碼；指定時折扣與滿減依該方案，且不可掃描方案不販售的水果
+        strawberry_discount, discount_threshold, discount_amount, discount_tiers, discounts:
+            未指定方案時的促銷參數（與calculate_price相同）
+    屬性:
+        on_event: 可選的回呼（建立後設定），每個門檻事件都會呼叫一次
+    """
+    def __init__(self, system, code=None, strawberry_discount=1.0, discount_threshold=0,
+                 discount_amount=0, discount_tiers=None, discounts=None):
+        self.system = system
+        self.code = code
+        if code is not None:
+            promotion = system.promotions[code]
+            self.skus = frozenset(promotion.skus)
+            strawberry_discount = promotion.discount_for('strawberry')
+            discounts = promotion.discounts
+            discount_threshold = promotion.discount_threshold
+            discount_amount = promotion.discount_amount
+            discount_tiers = promotion.discount_tiers
+        else:
+            self.skus = frozenset(BASKET_SKUS)
+        self.strawberry_discount = strawberry_discount
+        self.discount_threshold = discount_threshold
+        self.discount_amount = discount_amount
+        self.discount_tiers = discount_tiers
+        self.discounts = discounts
+        self._discount_bp = {sku: to_basis_points(rate)
+                             for sku, rate in zip(BASKET_SKUS, basket_rates(BASKET_SKUS, strawberry_discount, discounts))}
+        self._threshold_cents = to_cents(discount_threshold) if discount_threshold > 0 else 0
+        self._amount_cents = to_cents(discount_amount)
+        self.on_event = None
+        self.clear()
+
+    @classmethod
+    def from_basket(cls, system, basket):
+        """
+        由to_basket()保存的購物籃（quotes.Basket）恢復工作階段，金額依目前價目計算
+        Basket只保存方案代碼：未指定方案的工作階段恢復後沒有促銷
+        """
+        session = cls(system, basket.scheme)
+        skus = session._snapshot.skus
+        for index, weight in basket:
+            session.scan(skus[index], weight)
+        return session
+
+    def to_basket(self):
+        """目前斤數的精簡快照（quotes.Basket，商品以目錄索引表示），略過斤數為0的水果"""
+        index = self._index
+        return Basket(self.code, ((index[sku], weight) for sku, weight in self.weights.items() if weight))
+
+    def clear(self):
+        """清空購物籃"""
+        self.weights = dict.fromkeys(BASKET_SKUS, 0)
+        self._lines = dict.fromkeys(BASKET_SKUS, 0)
+        self._subtotal = 0
+        self._reported = 0  # 上次掃描後的小計，門檻事件以此為變化前的金額
+        self._snapshot = self.system.catalog.snapshot
+        self._index = {sku: self._snapshot.index_of(sku) for sku in BASKET_SKUS}
+
+    @property
+    def subtotal_cents(self):
+        """小計（分，未扣滿減）；目錄已換成新快照時先以新價目重算"""
+        if self._snapshot is not self.system.catalog.snapshot:
+            self._reprice()
+        return self._subtotal
+
+    @property
+    def discount_applied(self):
+        if self.discount_tiers is not None:
+            return self.discount_tiers.index_for(self.subtotal_cents) >= 0
+        return self._threshold_cents > 0 and self.subtotal_cents >= self._threshold_cents
+
+    @property
+    def total_cents(self):
+        """應付總額（分）"""
+        subtotal = self.subtotal_cents
+        if self.discount_tiers is not None:
+            return subtotal - self.discount_tiers.discount_cents(subtotal)
+        if self.discount_applied:
+            return subtotal - self._amount_cents
+        return subtotal
+
+    @property
+    def total(self):
+        """應付總額（元）"""
+        return cents_to_yuan(self.total_cents)
+
+    def scan(self, sku, weight=1):
+        """
+        掃描商品（weight為負數表示移除），返回本次觸發的門檻事件列表
+        只重算該水果一行的金額，成本與購物籃內容無關
+        """
+        if sku not in self.skus:
+            raise ValueError(f"顧客{self.code}方案不支持購買{self.system.fruits[sku].name}")
+        new_weight = self.weights[sku] + weight
+        if new_weight < 0:
+            raise ValueError("水果斤數不能為負數")
+        # 變化前的金額取上次掃描後的小計（重算前），價目變動跨過門檻時也會回報
+        before = self._reported
+        if self._snapshot is not self.system.catalog.snapshot:
+            self._reprice()
+
+        price_cents = self._snapshot.price_cents[self._index[sku]]
+        line = line_total_cents(price_cents, new_weight, self._discount_bp[sku])
+        self._subtotal += line - self._lines[sku]
+        self._lines[sku] = line
+        self.weights[sku] = new_weight
+        self._reported = self._subtotal
+        return self._threshold_events(before)
+
+    def remove(self, sku, weight=1):
+        """移除商品，返回本次觸發的門檻事件列表"""
+        return self.scan(sku, -weight)
+
+    def _reprice(self):
+        """價目變動後以新的目錄快照與目前斤數重算各行金額"""
+        snapshot = self._snapshot = self.system.catalog.snapshot
+        for sku, weight in self.weights.items():
+            price_cents = snapshot.price_cents[self._index[sku]]
+            self._lines[sku] = line_total_cents(price_cents, weight, self._discount_bp[sku])
+        self._subtotal = sum(self._lines.values())
+
+    def _threshold_events(self, before):
+        if self.discount_tiers is not None:
+            return self._tier_events(before)
+        threshold = self._threshold_cents
+        after = self._subtotal
+        if not threshold or after == before:
+            return []
+        if after >= threshold:
+            if before >= threshold:
+                return []
+            kind = REACHED
+        elif before >= threshold:
+            kind = LOST
+        else:
+            kind = PROGRESS
+        return self._emit(ThresholdEvent(kind, after, threshold, self._amount_cents))
+
+    def _tier_events(self, before):
+        """分級滿減的門檻事件：以bisect比較前後所在的檔次"""
+        tiers = self.discount_tiers
+        after = self._subtotal
+        if after == before:
+            return []
+        tier = tiers.index_for(after)
+        previous = tiers.index_for(before)
+        if tier > previous:
+            kind = REACHED
+        elif tier < previous:
+            kind, tier = LOST, previous
+        elif tier + 1 < len(tiers):
+            kind, tier = PROGRESS, tier + 1
+        else:
+            return []  # 已在最高一檔
+        return self._emit(ThresholdEvent(kind, after, tiers.threshold_cents[tier], tiers.amount_cents[tier]))
+
+    def _emit(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+        return [event]
+
+    def quote(self):
+        """目前購物籃的完整報價（QuoteResult），用於列印小票"""
+        weights = self.weights
+        return self.system.get_quote(weights['apple'], weights['strawberry'], weights['mango'],
+                                     self.strawberry_discount, self.discount_threshold,
+                                     self.discount_amount, self.discount_tiers, self.discounts)
@@ -0,0 +1,136 @@
+"""
+掃描結帳基準：BasketSession逐件更新與每次以calculate_price完整重算的比較
+
+每次掃描後都核對總價與calculate_price_cents完整重算的結果，以及門檻事件是否正確；
+核對時每隔--reprice-every次掃描修改一次單價，確認價目變動後（下一次掃描前）讀到的總價已是新價，
+且價目變動跨過門檻時由下一次掃描回報事件；每隔SAVE_EVERY次掃描另核對以to_basket保存、
+from_basket恢復的購物籃與直接以Basket計價的總價。不一致時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_basket_session.py [掃描次數] [--reprice-every 7]
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from basket_session import LOST, PROGRESS, REACHED, BasketSession
+from money import to_cents
+from pricing_core import BASKET_SKUS, ShoppingSystem
+
+# 核對時每隔幾次掃描核對一次Basket的保存與恢復
+SAVE_EVERY = 11
+
+
+def make_scans(system, code, n, seed=0):
+    """隨機掃描與移除序列（移除不會使斤數小於0）"""
+    rng = random.Random(seed)
+    skus = [sku for sku in BASKET_SKUS if system.promotions[code].sells(sku)]
+    weights = dict.fromkeys(skus, 0)
+    scans = []
+    for _ in range(n):
+        sku = rng.choice(skus)
+        weight = rng.randint(1, 3)
+        if weights[sku] >= weight and rng.random() < 0.3:
+            weight = -weight
+        weights[sku] += weight
+        scans.append((sku, weight))
+    return scans
+
+
+def check(system, code, scans, reprice_every=0, seed=0):
+    """
+    逐次核對，返回第一個不一致的說明；全部一致時返回None
+    reprice_every大於0時每隔這麼多次掃描隨機修改一項單價（會修改system的價目）
+    """
+    rng = random.Random(seed)
+    promotion = system.promotions[code]
+    threshold = to_cents(promotion.discount_threshold) if promotion.discount_threshold > 0 else 0
+    session = BasketSession(system, code)
+    weights = dict.fromkeys(BASKET_SKUS, 0)
+    before = 0
+    params = (promotion.discount_for('strawberry'), promotion.discount_threshold,
+              promotion.discount_amount, promotion.discount_tiers, promotion.discounts)
+    for number, (sku, weight) in enumerate(scans):
+        if reprice_every and number % reprice_every == reprice_every - 1:
+            system.set_price(rng.choice(BASKET_SKUS), rng.randrange(2, 41) / 2)
+            expected = system.calculate_price_cents(*weights.values(), *params)
+            if session.total_cents != expected:
+                return f"方案{code}第{number}次掃描前改價後: {session.total_cents} != {expected}"
+        events = session.scan(sku, weight)
+        weights[sku] += weight
+        args = (weights['apple'], weights['strawberry'], weights['mango'], *params)
+        expected = system.calculate_price_cents(*args)
+        if session.total_cents != expected:
+            return f"方案{code}第{number}次掃描: {session.total_cents} != {expected}"
+        if number % SAVE_EVERY == 0:
+            # 保存為Basket再恢復，以及直接以Basket計價，都須得到相同的總價
+            basket = session.to_basket()
+            restored = BasketSession.from_basket(system, basket).total_cents
+            priced = system.price_basket_scheme_cents(code, basket)
+            if restored != expected or priced != expected:
+                return f"方案{code}第{number}次掃描的Basket: 恢復 {restored}、計價 {priced}，應為 {expected}"
+        subtotal = system.calculate_price_cents(*args[:4], discounts=promotion.discounts)
+        kinds = [event.kind for event in events]
+        if not threshold or subtotal == before:
+            wanted = []
+        elif subtotal >= threshold:
+            wanted = [] if before >= threshold else [REACHED]
+        else:
+            wanted = [LOST] if before >= threshold else [PROGRESS]
+        if kinds != wanted:
+            return f"方案{code}第{number}次掃描的事件: {kinds} != {wanted}"
+        before = subtotal
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掃描結帳基準")
+    parser.add_argument('scans', type=int, nargs='?', default=100_000, help="計時的掃描次數")
+    parser.add_argument('--reprice-every', type=int, default=7, help="核對時每隔幾次掃描改一次單價")
+    args = parser.parse_args(argv)
+    n = args.scans
+    system = ShoppingSystem()
+
+    for code in sorted(system.promotions):
+        scans = make_scans(system, code, 5_000, seed=ord(code))
+        failure = (check(system, code, scans)
+                   or check(ShoppingSystem(), code, scans, args.reprice_every, seed=ord(code)))
+        if failure:
+            print(failure)
+            return 1
+
+    scans = make_scans(system, 'D', n)
+    promotion = system.promotions['D']
+    params = (promotion.discount_for('strawberry'), promotion.discount_threshold,
+              promotion.discount_amount)
+
+    start = perf_counter()
+    weights = dict.fromkeys(BASKET_SKUS, 0)
+    for sku, weight in scans:
+        weights[sku] += weight
+        system.calculate_price_cents(weights['apple'], weights['strawberry'], weights['mango'], *params)
+    full_time = perf_counter() - start
+
+    start = perf_counter()
+    session = BasketSession(system, 'D')
+    for sku, weight in scans:
+        session.scan(sku, weight)
+    session_time = perf_counter() - start
+
+    example = BasketSession(system, 'D')
+    messages = [event.message for sku in ('apple', 'apple', 'mango', 'mango', 'mango')
+                for event in example.scan(sku, 3)]
+
+    print(f"掃描次數: {n:,}（每次掃描後皆與calculate_price一致，含每{args.reprice_every}次改價的核對）")
+    print(f"calculate_price完整重算: {full_time / n * 1e6:>8.2f} 微秒/次")
+    print(f"BasketSession逐件更新:   {session_time / n * 1e6:>8.2f} 微秒/次（含門檻事件）")
+    print("事件範例: " + "；".join(messages))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+批量計價基準測試：比較calculate_prices_batch與逐筆calculate_customer_a~d的吞吐量
+
+另量測少於SCALAR_BATCH_ROWS筆的小批次（逐筆計價的退路）。任何結果與逐筆計算不一致，
+或大批次未快於逐筆計算--min-speedup倍時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_batch.py [--rows 1000000] [--small-rows 100] [--min-speedup 1.0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FruitPriceCalculator import ShoppingSystem
+from pricing_core import SCALAR_BATCH_ROWS
+
+
+def make_baskets(n, seed=0):
+    """產生隨機購物資料"""
+    rng = random.Random(seed)
+    schemes = [rng.choice('ABCD') for _ in range(n)]
+    apple = [rng.randint(0, 20) for _ in range(n)]
+    strawberry = [rng.randint(0, 20) for _ in range(n)]
+    mango = [0 if s == 'A' else rng.randint(0, 20) for s in schemes]
+    return apple, strawberry, mango, schemes
+
+
+def scalar_loop(system, apple, strawberry, mango, schemes):
+    """逐筆計算"""
+    methods = {
+        'A': lambda a, s, m: system.calculate_customer_a(a, s),
+        'B': system.calculate_customer_b,
+        'C': system.calculate_customer_c,
+        'D': system.calculate_customer_d,
+    }
+    return [methods[c](a, s, m) for a, s, m, c in zip(apple, strawberry, mango, schemes)]
+
+
+def compare(system, n, repeat=1):
+    """逐筆與批量計算n筆，返回(逐筆秒數, 批量秒數, 不一致筆數)（各取最短）"""
+    apple, strawberry, mango, schemes = make_baskets(n)
+    scalar_time = batch_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        expected = scalar_loop(system, apple, strawberry, mango, schemes)
+        scalar_time = min(scalar_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        totals = system.calculate_prices_batch(apple, strawberry, mango, schemes)
+        batch_time = min(batch_time, time.perf_counter() - start)
+    mismatches = sum(1 for x, y in zip(expected, totals.tolist()) if x != y)
+    return scalar_time, batch_time, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量計價基準測試")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="大批次的筆數")
+    parser.add_argument('--small-rows', type=int, default=100,
+                        help=f"小批次的筆數（少於{SCALAR_BATCH_ROWS}筆時逐筆計價）")
+    parser.add_argument('--min-speedup', type=float, default=1.0, help="大批次相對逐筆計算的最低倍數")
+    args = parser.parse_args(argv)
+    system = ShoppingSystem()
+    compare(system, SCALAR_BATCH_ROWS)  # 預熱：載入numpy（第一次批量計價時才匯入）
+
+    scalar_time, batch_time, mismatches = compare(system, args.rows)
+    speedup = scalar_time / batch_time
+    print(f"筆數: {args.rows}")
+    print(f"逐筆計算: {args.rows / scalar_time:,.0f} 筆/秒 ({scalar_time:.3f}s)")
+    print(f"批量計算: {args.rows / batch_time:,.0f} 筆/秒 ({batch_time:.3f}s)")
+    print(f"加速比: {speedup:.1f}x")
+
+    small_scalar, small_batch, small_mismatches = compare(system, args.small_rows, repeat=200)
+    print(f"小批次 {args.small_rows} 筆: 逐筆 {small_scalar * 1e6:.1f} 微秒，批量 {small_batch * 1e6:.1f} 微秒")
+    mismatches += small_mismatches
+    print(f"結果不一致筆數: {mismatches}")
+
+    status = 1 if mismatches else 0
+    if speedup < args.min_speedup:
+        print(f"批量計算未達逐筆計算的 {args.min_speedup:.1f} 倍")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+並行價目壓力測試：多個讀取執行緒持續計價，同時另一個執行緒不斷切換整組單價
+
+寫入端在兩組單價之間交替（價目版本為偶數時是第一組、奇數時是第二組），
+讀取端檢查每筆報價的單價與總價都屬於報價記錄的那個版本，且calculate_price與
+各方案計價函數的結果只會是其中一組單價的總價，不會出現新舊價格混雜（torn read）。
+另比較有無寫入時的讀取吞吐量。出現混雜或吞吐量下降超過預算時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_catalog_concurrency.py [--readers 4] [--seconds 2] [--update-interval-ms 0.5]
+        [--switch-interval-ms 0.1]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_core import BASKET_SKUS, ShoppingSystem
+
+# 兩組單價（元），依BASKET_SKUS順序；任何混雜的組合都會得到不同的總價
+PRICE_SETS = ((8, 13, 20), (9, 14, 21))
+CENTS_SETS = tuple(tuple(price * 100 for price in prices) for prices in PRICE_SETS)
+TOTALS = frozenset(sum(cents) for cents in CENTS_SETS)
+
+
+def reader(system, stop, results, slot):
+    """持續計價並檢查，結果寫入results[slot] = (次數, 混雜次數)"""
+    count = torn = 0
+    price_b = system.pricers['B']
+    while not stop.is_set():
+        for _ in range(100):
+            quote = system.get_quote(1, 1, 1)
+            expected = CENTS_SETS[quote.catalog_version % 2]
+            if (tuple(cents for _, _, cents in quote.unit_prices) != expected
+                    or quote.final_cents != sum(expected)):
+                torn += 1
+            if system.calculate_price_cents(1, 1, 1) not in TOTALS:
+                torn += 1
+            if price_b(1, 1, 1) not in TOTALS:
+                torn += 1
+        count += 300
+    results[slot] = (count, torn)
+
+
+def writer(system, stop, interval, updates, update=True):
+    """每interval秒切換一次單價；update為False時只以相同的節奏喚醒（對照組）"""
+    version = system.catalog_version
+    while not stop.is_set():
+        if update:
+            prices = PRICE_SETS[(version + 1) % 2]
+            version = system.set_prices(dict(zip(BASKET_SKUS, prices)))
+            updates[0] += 1
+        time.sleep(interval)
+
+
+def run(system, readers, seconds, interval, update):
+    """執行一輪，返回(讀取次數/秒, 混雜次數, 更新次數)"""
+    stop = threading.Event()
+    results = [None] * readers
+    updates = [0]
+    threads = [threading.Thread(target=reader, args=(system, stop, results, i)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer, args=(system, stop, interval, updates, update)))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return (sum(count for count, _ in results) / elapsed, sum(torn for _, torn in results),
+            updates[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="並行價目壓力測試")
+    parser.add_argument('--readers', type=int, default=4, help="讀取執行緒數")
+    parser.add_argument('--seconds', type=float, default=2.0, help="每輪的秒數")
+    parser.add_argument('--update-interval-ms', type=float, default=0.5, help="寫入端兩次更新的間隔")
+    parser.add_argument('--switch-interval-ms', type=float, default=0.1,
+                        help="直譯器切換執行緒的間隔，越小越常在計價途中切換")
+    parser.add_argument('--max-loss', type=float, default=0.10, help="可接受的讀取吞吐量下降比例")
+    args = parser.parse_args(argv)
+
+    sys.setswitchinterval(args.switch_interval_ms / 1000)
+    system = ShoppingSystem()
+    interval = args.update_interval_ms / 1000
+    idle, idle_torn, _ = run(system, args.readers, args.seconds, interval, update=False)
+    busy, busy_torn, updates = run(system, args.readers, args.seconds, interval, update=True)
+    loss = 1 - busy / idle
+
+    print(f"讀取執行緒: {args.readers}，寫入間隔: {args.update_interval_ms} 毫秒")
+    print(f"無寫入:   {idle:>12,.0f} 次/秒")
+    print(f"持續寫入: {busy:>12,.0f} 次/秒（{updates:,} 次更新，吞吐量變化 {-loss:+.1%}）")
+    print(f"新舊價格混雜: {idle_torn + busy_torn} 次")
+    if idle_torn or busy_torn:
+        return 1
+    if loss > args.max_loss:
+        print(f"讀取吞吐量下降超過 {args.max_loss:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+商品目錄熱重載基準：10,000項商品的JSON/TOML目錄檔
+
+量測檔案未變動時的輪詢成本、重新載入（解析、驗證、替換）的耗時，以及另一個執行緒
+持續計價時，重新載入期間計價延遲的變化。每次重新載入時全部單價都會變動（最壞情況）。
+JSON與簡單版面的TOML目錄檔重新載入超過預算時以狀態碼1結束。
+含註解等其他寫法的TOML改由純Python的tomllib解析（TOML+註解），只列出耗時供參考。
+
+用法:
+    python benchmarks/bench_catalog_reload.py [--skus 10000] [--budget-ms 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import DEFAULT_ITEMS
+from catalog_reload import watch_catalog
+from pricing_core import ShoppingSystem
+
+
+def make_items(skus, bump=0):
+    """預設的三種水果加上skus-3項其他商品；bump讓每次寫出的單價不同"""
+    items = [(sku, name, price + bump) for sku, name, price in DEFAULT_ITEMS]
+    items += [(f"sku{i:05d}", f"商品{i}", round(1 + (i * 37 % 5000) / 100 + bump, 2))
+              for i in range(skus - len(items))]
+    return items
+
+
+def write_catalog(path, items, comment=False):
+    """寫出目錄檔；comment為True時在TOML開頭加註解（不是簡單版面，改由tomllib解析）"""
+    if path.endswith('.toml'):
+        text = "# 商品目錄\n" if comment else ""
+        text += "".join(f'[[items]]\nsku = "{sku}"\nname = "{name}"\nprice = {price}\n\n'
+                       for sku, name, price in items)
+    else:
+        text = json.dumps({"items": [{"sku": sku, "name": name, "price": price}
+                                     for sku, name, price in items]}, ensure_ascii=False)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def pricing_latencies(system, stop, samples):
+    """持續計價並記錄每次get_quote的延遲（秒）"""
+    while not stop.is_set():
+        start = perf_counter()
+        system.get_quote(3, 5, 2, 0.8, 100, 10)
+        samples.append(perf_counter() - start)
+
+
+def measure_reloads(path, skus, rounds, comment=False):
+    system = ShoppingSystem()
+    write_catalog(path, make_items(skus), comment)
+    watcher = watch_catalog(system, path)
+
+    polls = 10_000
+    start = perf_counter()
+    for _ in range(polls):
+        watcher.poll()
+    poll_us = (perf_counter() - start) / polls * 1e6
+
+    times = []
+    for bump in range(1, rounds + 1):
+        write_catalog(path, make_items(skus, bump), comment)
+        start = perf_counter()
+        reloaded = watcher.poll()
+        times.append(perf_counter() - start)
+        if not reloaded or system.fruits['apple'].price != DEFAULT_ITEMS[0][2] + bump:
+            raise RuntimeError(f"重新載入失敗: {watcher.last_error}")
+    return system, watcher, poll_us, times
+
+
+def p99(samples):
+    return sorted(samples)[int(len(samples) * 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="商品目錄熱重載基準")
+    parser.add_argument('--skus', type=int, default=10_000, help="目錄商品數")
+    parser.add_argument('--rounds', type=int, default=20, help="重新載入次數")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help="每次重新載入的預算（中位數）")
+    args = parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"商品數: {args.skus:,}")
+        # (標籤, 副檔名, TOML開頭加註解, 是否套用預算)
+        for label, suffix, comment, budgeted in (('JSON', 'json', False, True),
+                                                  ('TOML', 'toml', False, True),
+                                                  ('TOML+註解', 'toml', True, False)):
+            path = os.path.join(tmp, f"catalog.{suffix}")
+            system, watcher, poll_us, times = measure_reloads(path, args.skus, args.rounds, comment)
+            median = statistics.median(times) * 1000
+            note = "" if budgeted else "（tomllib，僅供參考）"
+            print(f"{label:<9} 未變動時輪詢 {poll_us:6.1f} 微秒，重新載入 中位數 {median:6.2f} 毫秒，"
+                  f"最大 {max(times) * 1000:6.2f} 毫秒{note}")
+            if budgeted and median > args.budget_ms:
+                failures.append(f"{label}重新載入 {median:.2f} 毫秒超過預算 {args.budget_ms} 毫秒")
+
+        # 計價執行緒持續報價，比較重新載入期間與平常的延遲
+        for reloading in (False, True):
+            stop = threading.Event()
+            samples = []
+            thread = threading.Thread(target=pricing_latencies, args=(system, stop, samples))
+            thread.start()
+            end = time.monotonic() + 1.0
+            bump = 100
+            while time.monotonic() < end:
+                if reloading:
+                    bump += 1
+                    write_catalog(path, make_items(args.skus, bump))
+                    watcher.poll()
+                time.sleep(0.05)
+            stop.set()
+            thread.join()
+            label = "重新載入期間" if reloading else "平常        "
+            print(f"計價延遲（{label}）: p50 {statistics.median(samples) * 1e6:6.2f} 微秒，"
+                  f"p99 {p99(samples) * 1e6:6.2f} 微秒，{len(samples):,} 次")
+
+    if failures:
+        for failure in failures:
+            print(failure)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+欄式交易記錄基準：比較CSV逐行計價與轉成欄式二進位檔（.frtx）後以記憶體映射計價的吞吐量
+兩條路徑的計價輸出不完全相同時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_columnar.py [筆數]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar import ColumnarTransactions, convert_transactions, price_columnar_file
+from FruitPriceCalculator import file_mode
+from pricing_core import ShoppingSystem
+
+
+def write_transactions(path, n, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(('scheme', 'apple', 'strawberry', 'mango'))
+        for _ in range(n):
+            writer.writerow((rng.choice('ABCD'), rng.randint(0, 20), rng.randint(1, 20),
+                             rng.randint(0, 20)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="欄式交易記錄基準")
+    parser.add_argument('rows', type=int, nargs='?', default=500_000, help="交易筆數")
+    args = parser.parse_args(argv)
+    n = args.rows
+    system = ShoppingSystem()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'tx.csv')
+        columnar = os.path.join(tmp, 'tx.frtx')
+        csv_out = os.path.join(tmp, 'csv_totals.csv')
+        columnar_out = os.path.join(tmp, 'columnar_totals.csv')
+        write_transactions(source, n)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            start = perf_counter()
+            file_mode(source, csv_out)
+            csv_time = perf_counter() - start
+
+            start = perf_counter()
+            convert_transactions(source, columnar)
+            convert_time = perf_counter() - start
+
+        start = perf_counter()
+        price_columnar_file(columnar, columnar_out)
+        columnar_time = perf_counter() - start
+
+        # 只計價不輸出：記憶體映射的各欄直接交給向量化計價
+        start = perf_counter()
+        with ColumnarTransactions(columnar) as transactions:
+            for begin, end in transactions.iter_chunks():
+                transactions.price_cents(system, begin, end)
+        pricing_time = perf_counter() - start
+
+        size = os.path.getsize(columnar)
+        with open(csv_out, 'rb') as a, open(columnar_out, 'rb') as b:
+            identical = a.read() == b.read()
+
+    print(f"筆數: {n:,}（欄式檔 {size / n:.1f} 位元組/筆）")
+    print(f"CSV逐行計價:         {n / csv_time:>12,.0f} 筆/秒")
+    print(f"CSV轉欄式檔（一次）: {n / convert_time:>12,.0f} 筆/秒")
+    print(f"欄式檔計價+CSV輸出:  {n / columnar_time:>12,.0f} 筆/秒 (CSV的{csv_time / columnar_time:.1f}倍)")
+    print(f"欄式檔僅計價:        {n / pricing_time:>12,.0f} 筆/秒")
+    print(f"計價結果相同: {'是' if identical else '否'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
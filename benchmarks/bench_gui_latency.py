@@ -0,0 +1,198 @@
+"""
+GUI即時試算延遲基準：模擬收銀員逐鍵輸入與按+/-，量測每次按鍵的處理時間
+
+每次按鍵量測：IntVar寫入觸發的防抖排程 + 防抖到期後的即時試算（驗證、計價、小票重繪）。
+有顯示器時使用真正的Tk視窗（隱藏），沒有顯示器時以替身元件執行同一套方法。
+任何一次按鍵超過預算（預設16毫秒）時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_gui_latency.py [--keystrokes 2000] [--budget-ms 16]
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GUI_FruitCalculator
+from GUI_FruitCalculator import FruitPriceCalculatorGUI
+from FruitPriceCalculator import ShoppingSystem
+
+
+class _FakeRoot:
+    """只保留after/after_cancel，防抖回呼由基準直接觸發"""
+    def __init__(self):
+        self.pending = {}
+        self._next = 0
+
+    def after(self, ms, func):
+        self._next += 1
+        self.pending[self._next] = func
+        return self._next
+
+    def after_cancel(self, handle):
+        self.pending.pop(handle, None)
+
+    def fire(self):
+        pending, self.pending = self.pending, {}
+        for func in pending.values():
+            func()
+
+    def update_idletasks(self):
+        pass
+
+
+class _FakeVar:
+    """模擬tk.IntVar/StringVar：set時呼叫write追蹤；無法轉為整數時get拋出TclError"""
+    def __init__(self, value, integer=True):
+        self.value = value
+        self.integer = integer
+        self.traces = []
+
+    def get(self):
+        if not self.integer:
+            return self.value
+        try:
+            return int(self.value)
+        except ValueError:
+            raise GUI_FruitCalculator.load_tkinter().TclError(f'expected integer but got "{self.value}"')
+
+    def set(self, value):
+        self.value = value
+        for callback in self.traces:
+            callback('var', '', 'write')
+
+    def trace_add(self, mode, callback):
+        self.traces.append(callback)
+
+
+class _FakeWidget:
+    """吸收Label/Text的所有呼叫"""
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def build_headless():
+    """不建立視窗，直接以替身元件組出GUI物件"""
+    GUI_FruitCalculator.load_tkinter()
+    gui = FruitPriceCalculatorGUI.__new__(FruitPriceCalculatorGUI)
+    gui.root = _FakeRoot()
+    gui.shopping_system = ShoppingSystem()
+    gui.customer_options = {
+        promotion.label: {
+            "code": promotion.code,
+            "description": promotion.description,
+            "has_mango": promotion.sells("mango"),
+            "strawberry_discount": promotion.discount_for("strawberry"),
+            "discount_threshold": promotion.discount_threshold,
+            "discount_amount": promotion.discount_amount,
+            "discount_tiers": promotion.discount_tiers,
+            "discounts": promotion.discounts
+        }
+        for promotion in gui.shopping_system.promotions.values()
+    }
+    gui.weight_vars = {sku: _FakeVar(0) for sku in gui.shopping_system.fruits}
+    gui.apple_weight = gui.weight_vars['apple']
+    gui.strawberry_weight = gui.weight_vars['strawberry']
+    gui.mango_weight = gui.weight_vars['mango']
+    gui.selected_customer = _FakeVar(list(gui.customer_options)[-1], integer=False)
+    gui._pending_recalc = None
+    gui._shown_key = None
+    gui._shown_hint = ""
+    gui.input_hint_label = _FakeWidget()
+    gui.result_text = _FakeWidget()
+    for var in gui.weight_vars.values():
+        var.trace_add('write', gui.schedule_recalc)
+    gui.selected_customer.trace_add('write', gui.schedule_recalc)
+    return gui, gui.root.fire
+
+
+def build_tk():
+    """建立隱藏的真實Tk視窗；沒有顯示器時返回None"""
+    tk = GUI_FruitCalculator.load_tkinter()
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    gui = FruitPriceCalculatorGUI(root)
+    gui.selected_customer.set(list(gui.customer_options)[-1])
+
+    def fire():
+        if gui._pending_recalc is not None:
+            root.after_cancel(gui._pending_recalc)
+            gui.recalculate_live()
+        root.update_idletasks()
+    return gui, fire
+
+
+def keystrokes(n, seed=0):
+    """產生(水果, 新值)的按鍵序列：逐位輸入、刪除成空字串、非數字與+/-"""
+    rng = random.Random(seed)
+    skus = ('apple', 'strawberry', 'mango')
+    current = dict.fromkeys(skus, '0')
+    for _ in range(n):
+        sku = rng.choice(skus)
+        action = rng.random()
+        text = current[sku]
+        if action < 0.5:
+            text = (text if text not in ('0', '') else '') + str(rng.randint(0, 9))
+        elif action < 0.65:
+            text = text[:-1]
+        elif action < 0.7:
+            text = text + 'x'
+        elif action < 0.85:
+            text = str(max(0, _to_int(text) + 1))
+        else:
+            text = str(max(0, _to_int(text) - 1))
+        if len(text) > 3:
+            text = text[-1]
+        current[sku] = text
+        yield sku, text
+
+
+def _to_int(text):
+    try:
+        return int(text)
+    except ValueError:
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GUI即時試算延遲基準")
+    parser.add_argument('--keystrokes', type=int, default=2000)
+    parser.add_argument('--budget-ms', type=float, default=16.0)
+    parser.add_argument('--headless', action='store_true', help="即使有顯示器也使用替身元件")
+    args = parser.parse_args(argv)
+
+    built = None if args.headless else build_tk()
+    mode = 'Tk'
+    if built is None:
+        built = build_headless()
+        mode = '替身元件'
+    gui, fire = built
+
+    samples = []
+    for sku, text in keystrokes(args.keystrokes):
+        start = perf_counter()
+        gui.weight_vars[sku].set(text)
+        fire()
+        samples.append(perf_counter() - start)
+
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[int(len(samples) * 0.99)] * 1000
+    worst = samples[-1] * 1000
+    print(f"模式: {mode}，按鍵數: {len(samples)}")
+    print(f"每次按鍵延遲 p50 {p50:.3f} 毫秒，p99 {p99:.3f} 毫秒，最大 {worst:.3f} 毫秒")
+    if worst > args.budget_ms:
+        print(f"超過預算 {args.budget_ms} 毫秒")
+        return 1
+    print(f"全部按鍵均在預算 {args.budget_ms} 毫秒內")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+歷史小票面板基準：填入大量歷史小票後隨機捲動，量測每次重繪可見列的時間
+
+有顯示器時使用真正的Tk Listbox（隱藏視窗），沒有顯示器時以替身元件執行同一套捲動邏輯。
+任何一次捲動超過預算（預設16毫秒）時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_history.py [--entries 100000] [--scrolls 2000] [--budget-ms 16]
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GUI_FruitCalculator
+from GUI_FruitCalculator import ReceiptHistoryPanel
+from FruitPriceCalculator import ShoppingSystem
+from receipt_history import ReceiptHistory
+
+
+class _FakeWidget:
+    """吸收Listbox/Scrollbar的所有呼叫"""
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def fill_history(n, seed=0):
+    system = ShoppingSystem()
+    codes = sorted(system.promotions)
+    rng = random.Random(seed)
+    history = ReceiptHistory()
+    for _ in range(n):
+        code = rng.choice(codes)
+        history.append(code, system.quote_scheme(code, rng.randint(0, 20), rng.randint(1, 20),
+                                                 rng.randint(0, 20)))
+    return history
+
+
+def build_panel(history, headless):
+    """返回(面板, 每次捲動後的重繪函數, 模式名稱)"""
+    tk = GUI_FruitCalculator.load_tkinter()
+    if not headless:
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            root = None
+        if root is not None:
+            root.withdraw()
+            panel = ReceiptHistoryPanel(root, history, lambda index: None)
+            panel.frame.pack()
+            return panel, root.update_idletasks, 'Tk'
+    panel = ReceiptHistoryPanel.__new__(ReceiptHistoryPanel)
+    panel.history = history
+    panel.on_select = lambda index: None
+    panel.top = 0
+    panel.visible = 8
+    panel.selected = None
+    panel.listbox = _FakeWidget()
+    panel.scrollbar = _FakeWidget()
+    return panel, lambda: None, '替身元件'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="歷史小票面板捲動基準")
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--scrolls', type=int, default=2000)
+    parser.add_argument('--budget-ms', type=float, default=16.0)
+    parser.add_argument('--headless', action='store_true', help="即使有顯示器也使用替身元件")
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    history = fill_history(args.entries)
+    print(f"建立 {len(history):,} 筆歷史小票: {perf_counter() - start:.2f} 秒")
+
+    panel, redraw, mode = build_panel(history, args.headless)
+    rng = random.Random(1)
+    samples = []
+    for _ in range(args.scrolls):
+        action = rng.random()
+        start = perf_counter()
+        if action < 0.4:
+            panel.on_scrollbar('moveto', str(rng.random()))
+        elif action < 0.8:
+            panel.on_scrollbar('scroll', str(rng.choice((-1, 1))), 'units')
+        else:
+            panel.on_scrollbar('scroll', str(rng.choice((-1, 1))), 'pages')
+        redraw()
+        samples.append(perf_counter() - start)
+
+    # 顯示一筆歷史小票的成本（產生片段）
+    start = perf_counter()
+    for index in range(0, len(history), max(1, len(history) // 1000)):
+        history.quote(index).gui_receipt_segments(history.code(index))
+    print(f"重新產生歷史小票片段: {(perf_counter() - start) / 1000 * 1e6:.1f} 微秒/筆")
+
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[int(len(samples) * 0.99)] * 1000
+    worst = samples[-1] * 1000
+    print(f"模式: {mode}，捲動次數: {len(samples)}")
+    print(f"每次捲動 p50 {p50:.3f} 毫秒，p99 {p99:.3f} 毫秒，最大 {worst:.3f} 毫秒")
+    if worst > args.budget_ms:
+        print(f"超過預算 {args.budget_ms} 毫秒")
+        return 1
+    print(f"全部捲動均在預算 {args.budget_ms} 毫秒內")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+記憶體基準：比較以字典保存與以__slots__型別保存購物籃及報價記錄的每筆位元組數
+
+節省比例低於--min-savings時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_memory.py [--rows 1000000] [--min-savings 0.2]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FruitPriceCalculator import ShoppingSystem
+from quotes import Basket
+
+
+def make_weights(n, seed=0):
+    rng = random.Random(seed)
+    return [(rng.choice('BCD'), rng.randint(0, 20), rng.randint(0, 20), rng.randint(0, 20))
+            for _ in range(n)]
+
+
+def measure(build):
+    """返回build()建立的物件所佔的記憶體（位元組）"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="記憶體基準")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="購物籃筆數")
+    parser.add_argument('--min-savings', type=float, default=0.2, help="__slots__型別最少須節省的比例")
+    args = parser.parse_args(argv)
+    n = args.rows
+    system = ShoppingSystem()
+    weights = make_weights(n)
+    params = {code: (p.discount_for('strawberry'), p.discount_threshold, p.discount_amount)
+              for code, p in system.promotions.items()}
+
+    def build_dicts():
+        return [
+            ({'scheme': scheme, 'apple': apple, 'strawberry': strawberry, 'mango': mango},
+             system.get_detailed_calculation(apple, strawberry, mango, *params[scheme]))
+            for scheme, apple, strawberry, mango in weights
+        ]
+
+    def build_slots():
+        return [
+            (Basket.from_weights(scheme, (apple, strawberry, mango)),
+             system.get_quote(apple, strawberry, mango, *params[scheme]))
+            for scheme, apple, strawberry, mango in weights
+        ]
+
+    before = measure(build_dicts)
+    after = measure(build_slots)
+    print(f"筆數: {n}")
+    print(f"字典（購物籃+明細）:     {before / n:,.0f} 位元組/筆")
+    print(f"__slots__（Basket+QuoteResult）: {after / n:,.0f} 位元組/筆")
+    savings = 1 - after / before
+    print(f"節省: {savings:.0%}")
+    if savings < args.min_savings:
+        print(f"節省未達 {args.min_savings:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+指標開銷基準：比較未啟用與啟用指標時的計價吞吐量
+
+兩個ShoppingSystem（一個啟用指標）以多輪短量測交替進行：每輪先後量測兩者並取比值，
+開銷以各輪比值的中位數計算，減少單核心機器上頻率與排程變動造成的雜訊；吞吐量取各自最快的一次。
+另核對兩者的計價結果。任何項目的開銷超過--max-overhead或結果不一致時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_metrics.py [--number 20000] [--rounds 60] [--max-overhead 0.05]
+"""
+import argparse
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FruitPriceCalculator import ShoppingSystem
+
+
+# 量測的呼叫（每個系統各自編譯一份Timer：3.11的特化快取依程式碼物件保存，
+# 兩個系統共用同一段程式碼時會互相干擾）
+CASES = {
+    'calculate_price': 'system.calculate_price(3, 7, 2, 0.8, 100, 10)',
+    'calculate_customer_d': 'system.calculate_customer_d(3, 7, 2)',
+    'get_detailed_calculation': 'system.get_detailed_calculation(3, 7, 2, 0.8, 100, 10)',
+}
+
+
+def build_timers(system):
+    return {name: timeit.Timer(stmt, globals={'system': system}) for name, stmt in CASES.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="指標開銷基準")
+    parser.add_argument('--number', type=int, default=20_000, help="每次量測的呼叫次數")
+    parser.add_argument('--rounds', type=int, default=60, help="交替量測的輪數（開銷取各輪比值的中位數）")
+    parser.add_argument('--max-overhead', type=float, default=0.05, help="允許的開銷比例，預設0.05")
+    args = parser.parse_args(argv)
+
+    plain = ShoppingSystem()
+    instrumented = ShoppingSystem()
+    metrics = instrumented.enable_metrics()
+    timers = {False: build_timers(plain), True: build_timers(instrumented)}
+
+    mismatches = [name for name, stmt in CASES.items()
+                  if eval(stmt, {'system': plain}) != eval(stmt, {'system': instrumented})]
+    mismatches += [f"calculate_price_cents{args}"
+                   for args in ((0, 0, 0), (5, 3, 1, 0.8, 100, 10), (20, 20, 20, 0.8, 100, 10))
+                   if plain.calculate_price_cents(*args) != instrumented.calculate_price_cents(*args)]
+
+    best = {(name, enabled): float('inf') for name in CASES for enabled in (False, True)}
+    ratios = {name: [] for name in CASES}
+    for _ in range(args.rounds):
+        for name in CASES:
+            elapsed = {}
+            for enabled in (False, True):
+                elapsed[enabled] = timers[enabled][name].timeit(args.number)
+                best[name, enabled] = min(best[name, enabled], elapsed[enabled])
+            ratios[name].append(elapsed[True] / elapsed[False])
+
+    status = 0
+    print(f"{'項目':<26}{'未啟用 (次/秒)':>16}{'啟用 (次/秒)':>16}{'開銷':>8}")
+    for name in CASES:
+        disabled, enabled = best[name, False], best[name, True]
+        overhead = statistics.median(ratios[name]) - 1
+        flag = ''
+        if overhead > args.max_overhead:
+            flag = '  <-- 超過預算'
+            status = 1
+        print(f"{name:<26}{args.number / disabled:>16,.0f}{args.number / enabled:>16,.0f}"
+              f"{overhead:>8.1%}{flag}")
+    print(f"計價次數: {metrics.value('fruit_quotes_total', scheme='custom'):,}（custom）、"
+          f"{metrics.value('fruit_quotes_total', scheme='D'):,}（D）")
+    if mismatches:
+        print(f"啟用指標後結果不一致: {', '.join(mismatches)}")
+        status = 1
+    if status and not mismatches:
+        print(f"開銷超過預算 {args.max_overhead:.0%}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
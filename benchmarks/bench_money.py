@@ -0,0 +1,95 @@
+"""
+定點數金額微基準：比較原本的浮點數計價與整數（分）計價
+
+整數計價的熱路徑是calculate_price_cents（編譯後的函數，返回分），須比浮點數計價快；
+calculate_price（元）是相容舊介面的包裝，多一次方法呼叫與分→元換算，
+只列出其吞吐量供參考，不保證比浮點數快。
+各路徑以多輪短量測交替進行，各取最快的一次。calculate_price_cents未達--min-speedup倍，
+或整數計價與精確結果不一致時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_money.py [--number 20000] [--rounds 30] [--min-speedup 1.0]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FruitPriceCalculator import ShoppingSystem
+
+
+class FloatFruit:
+    """原本的浮點數實作（僅供對照）"""
+    def __init__(self, name, price):
+        self.name = name
+        self.price = price
+
+    def calculate_price(self, weight, discount=1.0):
+        return self.price * weight * discount
+
+
+def float_calculate_price(fruits, apple_weight=0, strawberry_weight=0, mango_weight=0,
+                          strawberry_discount=1.0, discount_threshold=0, discount_amount=0):
+    """原本的ShoppingSystem.calculate_price（僅供對照）"""
+    apple_price = fruits['apple'].calculate_price(apple_weight)
+    strawberry_price = fruits['strawberry'].calculate_price(strawberry_weight, strawberry_discount)
+    mango_price = fruits['mango'].calculate_price(mango_weight)
+    total = apple_price + strawberry_price + mango_price
+    if discount_threshold > 0 and total >= discount_threshold:
+        total -= discount_amount
+    return total
+
+
+# 量測的呼叫（各自編譯一份Timer）
+CASES = {
+    'float': 'float_calculate_price(float_fruits, 3, 7, 2, 0.8, 100, 10)',
+    'cents': 'system.calculate_price_cents(3, 7, 2, 0.8, 100, 10)',
+    'yuan': 'system.calculate_price(3, 7, 2, 0.8, 100, 10)',
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="定點數金額微基準")
+    parser.add_argument('--number', type=int, default=20_000, help="每次量測的呼叫次數")
+    parser.add_argument('--rounds', type=int, default=30, help="交替量測的輪數（取最快）")
+    parser.add_argument('--min-speedup', type=float, default=1.0,
+                        help="calculate_price_cents相對浮點數計價的最低倍數")
+    args = parser.parse_args(argv)
+
+    system = ShoppingSystem()
+    float_fruits = {
+        'apple': FloatFruit('蘋果', 8),
+        'strawberry': FloatFruit('草莓', 13),
+        'mango': FloatFruit('芒果', 20),
+    }
+    namespace = {'system': system, 'float_fruits': float_fruits,
+                 'float_calculate_price': float_calculate_price}
+    timers = {name: timeit.Timer(stmt, globals=namespace) for name, stmt in CASES.items()}
+
+    best = dict.fromkeys(CASES, float('inf'))
+    for _ in range(args.rounds):
+        for name, timer in timers.items():
+            best[name] = min(best[name], timer.timeit(args.number))
+
+    cents_speedup = best['float'] / best['cents']
+    print(f"浮點數計價:                    {args.number / best['float']:>12,.0f} 次/秒")
+    print(f"定點數計價（分，熱路徑）:      {args.number / best['cents']:>12,.0f} 次/秒 ({cents_speedup:.2f}x)")
+    print(f"定點數計價（元，相容舊介面）:  {args.number / best['yuan']:>12,.0f} 次/秒 "
+          f"({best['float'] / best['yuan']:.2f}x，僅供參考)")
+    print(f"浮點數結果: {eval(CASES['float'], namespace)!r}")
+    print(f"定點數結果: {eval(CASES['yuan'], namespace)!r}（{eval(CASES['cents'], namespace)} 分）")
+
+    status = 0
+    if eval(CASES['cents'], namespace) != 12680 or eval(CASES['yuan'], namespace) != 126.8:
+        print("定點數計價結果錯誤")
+        status = 1
+    if cents_speedup < args.min_speedup:
+        print(f"calculate_price_cents未達浮點數計價的 {args.min_speedup:.2f} 倍")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+多行程批量計價的擴展性基準：以不同行程數計價同一個交易檔，比較吞吐量與加速比
+
+行程數從1開始每次加倍到--max-workers。效率為加速比除以實際可用的核心數（行程數與CPU核心數取小）；
+任何行程數的輸出與單行程file_mode不一致，或效率低於--min-efficiency時以狀態碼1結束。
+--min-efficiency預設為0（只列出效率），在多核心機器上可設為例如0.8檢查接近線性的擴展。
+
+用法:
+    python benchmarks/bench_parallel.py [--rows 1000000] [--max-workers CPU核心數] [--min-efficiency 0]
+"""
+import argparse
+import filecmp
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FruitPriceCalculator import file_mode
+from parallel_batch import price_file_parallel
+
+
+def write_transactions(path, n, seed=0):
+    """產生隨機交易檔（含少量無效行）"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("scheme,apple,strawberry,mango\n")
+        for _ in range(n):
+            scheme = rng.choice('ABCD')
+            mango = 0 if scheme == 'A' and rng.random() < 0.99 else rng.randint(0, 20)
+            f.write(f"{scheme},{rng.randint(0, 20)},{rng.randint(0, 20)},{mango}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多行程批量計價的擴展性基準")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="交易筆數")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help="最大行程數")
+    parser.add_argument('--min-efficiency', type=float, default=0.0,
+                        help="最低平行效率（加速比 ÷ 可用核心數），預設0表示不檢查")
+    args = parser.parse_args(argv)
+    n = args.rows
+    cpus = os.cpu_count() or 1
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'transactions.csv')
+        write_transactions(source, n)
+
+        expected = os.path.join(tmp, 'expected.csv')
+        start = time.perf_counter()
+        file_mode(source, expected, os.path.join(tmp, 'rejects.csv'))
+        serial_time = time.perf_counter() - start
+        print(f"筆數: {n}，CPU核心數: {cpus}")
+        print(f"單行程 file_mode: {n / serial_time:,.0f} 筆/秒")
+
+        workers = 1
+        while workers <= args.max_workers:
+            output = os.path.join(tmp, f'out_{workers}.csv')
+            start = time.perf_counter()
+            price_file_parallel(source, output, os.path.join(tmp, f'rejects_{workers}.csv'),
+                                workers=workers)
+            elapsed = time.perf_counter() - start
+            same = filecmp.cmp(expected, output, shallow=False)
+            speedup = serial_time / elapsed
+            efficiency = speedup / min(workers, cpus)
+            print(f"{workers:>3} 行程: {n / elapsed:,.0f} 筆/秒 "
+                  f"(加速比 {speedup:.2f}x, 效率 {efficiency:.0%}, 輸出{'一致' if same else '不一致'})")
+            if not same:
+                failures.append(f"{workers} 行程的輸出與單行程不一致")
+            if efficiency < args.min_efficiency:
+                failures.append(f"{workers} 行程的效率 {efficiency:.0%} 低於 {args.min_efficiency:.0%}")
+            workers *= 2
+
+    if failures:
+        for failure in failures:
+            print(failure)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+批量小票輸出基準：比較逐張print_receipt與ReceiptWriter整塊寫出的吞吐量
+ReceiptWriter的輸出與逐張print的內容不完全相同時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_receipts.py [張數]
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_core import ShoppingSystem
+from receipt_writer import ReceiptWriter
+
+
+def make_quotes(system, n, seed=0):
+    rng = random.Random(seed)
+    codes = sorted(system.promotions)
+    quotes = []
+    for _ in range(n):
+        code = rng.choice(codes)
+        quotes.append((code, system.quote_scheme(code, rng.randint(0, 20), rng.randint(1, 20),
+                                                 rng.randint(0, 20))))
+    return quotes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量小票輸出基準")
+    parser.add_argument('receipts', type=int, nargs='?', default=200_000, help="小票張數")
+    args = parser.parse_args(argv)
+    n = args.receipts
+    system = ShoppingSystem()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 標準輸出為終端機或設定PYTHONUNBUFFERED時是行緩衝，每行一次寫入
+        printed = os.path.join(tmp, 'printed.txt')
+        quotes = make_quotes(system, n)
+        start = perf_counter()
+        with open(printed, 'w', encoding='utf-8', buffering=1) as f, contextlib.redirect_stdout(f):
+            for code, quote in quotes:
+                system.print_quote(quote, code)
+        print_time = perf_counter() - start
+
+        quotes = make_quotes(system, n)  # 報價會快取小票文字，每項量測使用新的報價
+        start = perf_counter()
+        with open(os.path.join(tmp, 'printed_block.txt'), 'w', encoding='utf-8') as f, \
+                contextlib.redirect_stdout(f):
+            for code, quote in quotes:
+                system.print_quote(quote, code)
+        block_time = perf_counter() - start
+
+        written = os.path.join(tmp, 'written.txt')
+        quotes = make_quotes(system, n)
+        start = perf_counter()
+        with open(written, 'wb') as f, ReceiptWriter(f) as writer:
+            for code, quote in quotes:
+                writer.write_quote(quote, code)
+        write_time = perf_counter() - start
+
+        framed = os.path.join(tmp, 'framed.bin')
+        quotes = make_quotes(system, n)
+        start = perf_counter()
+        with open(framed, 'wb') as f, open(framed + '.idx', 'wb') as index, \
+                ReceiptWriter(f, index) as writer:
+            for code, quote in quotes:
+                writer.write_quote(quote, code)
+        framed_time = perf_counter() - start
+
+        with open(printed, 'rb') as a, open(written, 'rb') as b:
+            identical = a.read() == b.read()
+
+    print(f"張數: {n:,}")
+    print(f"print_quote（行緩衝）:   {n / print_time:>12,.0f} 張/秒")
+    print(f"print_quote（區塊緩衝）: {n / block_time:>12,.0f} 張/秒")
+    print(f"ReceiptWriter:           {n / write_time:>12,.0f} 張/秒 (行緩衝的{print_time / write_time:.1f}倍)")
+    print(f"ReceiptWriter分框+索引:  {n / framed_time:>12,.0f} 張/秒")
+    print(f"輸出內容逐位元組相同: {'是' if identical else '否'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+計價服務負載測試：在本機啟動pricing_server，量測固定送出速率下的吞吐量與延遲百分位數（p50/p99），
+並檢查過載時的負載卸除
+
+兩個情境（預設都執行）：
+    rate  以固定速率（開放迴路，不等回應）送出--rate 請求/秒，持續--duration秒；
+          實際完成的吞吐量低於--rate的95%、p99延遲超過--max-p99-ms或出現錯誤時判為失敗。
+          延遲自請求寫出時起算。
+    shed  以--max-queue很小的服務接收遠超過處理能力的突發請求；
+          須有請求被拒絕（overloaded）、每個請求都得到回應，且突發過後的探測請求正常計價。
+
+限制：客戶端與服務在同一台機器上執行，單核心機器上兩者分享同一個核心，
+量到的是兩者合計的上限。另列出服務行程的CPU時間換算的每核心處理能力（不含客戶端）供參考。
+任何情境失敗時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_server.py [--scenario rate|shed|all] [--duration 5] [--rate 20000]
+                                      [--connections 4] [--max-p99-ms 2.0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 固定速率情境每次醒來送出到期的請求（秒）
+TICK = 0.0005
+# 實際吞吐量至少須達到目標速率的比例
+MIN_RATE_RATIO = 0.95
+
+
+def make_bodies(seed, count=1024):
+    """預先產生請求內容（不含id），送出時只需填入id"""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        scheme = rng.choice('ABCD')
+        mango = 0 if scheme == 'A' else rng.randint(0, 20)
+        bodies.append(f'"scheme": "{scheme}", "apple": {rng.randint(0, 20)}, '
+                      f'"strawberry": {rng.randint(1, 20)}, "mango": {mango}}}\n'.encode())
+    return bodies
+
+
+class Server:
+    """以子行程啟動pricing_server（連接埠由系統分配）"""
+    def __init__(self, *options):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'pricing_server.py'), '--port', '0', *options],
+            stdout=subprocess.PIPE, text=True)
+        address = self.process.stdout.readline().strip().rsplit(' ', 1)[-1]
+        host, port = address.rsplit(':', 1)
+        self.host, self.port = host, int(port)
+
+    def stop(self):
+        """結束服務並返回其CPU時間（秒）"""
+        before = os.times()
+        self.process.terminate()
+        self.process.wait()
+        after = os.times()
+        return (after.children_user - before.children_user) + (after.children_system - before.children_system)
+
+
+async def paced_client(host, port, rate, duration, latencies, errors, seed):
+    """單一連線：以固定速率送出請求（不等回應），另一個協程讀取回應"""
+    reader, writer = await asyncio.open_connection(host, port)
+    bodies = make_bodies(seed)
+    sent = {}
+
+    async def send():
+        next_id = 0
+        start = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            due = int((now - start) * rate)
+            while next_id < due:
+                sent[next_id] = time.perf_counter()
+                writer.write(b'{"id": %d, %s' % (next_id, bodies[next_id % len(bodies)]))
+                next_id += 1
+            await asyncio.sleep(TICK)
+        # 送完後關閉寫入端：服務回完全部請求後關閉連線，receive讀到EOF結束
+        # （回應可能在送完之前就已全部收到，不能以「已送完且沒有待回應」判斷）
+        writer.write_eof()
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            latencies.append(time.perf_counter() - sent.pop(response['id']))
+            if 'error' in response:
+                errors[response['error']] = errors.get(response['error'], 0) + 1
+
+    await asyncio.gather(send(), receive())
+    writer.close()
+
+
+async def burst_client(host, port, count, results, seed):
+    """單一連線：一次寫出count個請求，再讀回全部回應"""
+    reader, writer = await asyncio.open_connection(host, port)
+    bodies = make_bodies(seed)
+    writer.write(b''.join(b'{"id": %d, %s' % (i, bodies[i % len(bodies)]) for i in range(count)))
+    await writer.drain()
+    for _ in range(count):
+        line = await reader.readline()
+        if not line:
+            break
+        results.append(json.loads(line))
+    writer.close()
+
+
+async def probe(host, port):
+    """送出一個已知結果的請求，返回(回應, 延遲秒數)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    start = time.perf_counter()
+    writer.write(b'{"id": 0, "scheme": "D", "apple": 5, "strawberry": 5, "mango": 5}\n')
+    response = json.loads(await reader.readline())
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return response, elapsed
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run_rate(args):
+    """固定速率情境，返回失敗訊息列表"""
+    server = Server()
+    latencies = []
+    errors = {}
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            paced_client(server.host, server.port, args.rate / args.connections, args.duration,
+                         latencies, errors, seed)
+            for seed in range(args.connections)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server_cpu = server.stop()
+
+    throughput = len(latencies) / elapsed
+    p99 = percentile(latencies, 0.99) * 1000 if latencies else float('inf')
+    print(f"[rate] 目標速率: {args.rate:,.0f} 請求/秒（{args.connections} 個連線）")
+    print(f"[rate] 吞吐量: {throughput:,.0f} 請求/秒")
+    if latencies:
+        print(f"[rate] 延遲 p50: {percentile(latencies, 0.50) * 1000:.3f} ms，p99: {p99:.3f} ms")
+    if server_cpu > 0:
+        print(f"[rate] 服務CPU時間: {server_cpu:.2f} 秒（每核心約 {len(latencies) / server_cpu:,.0f} 請求/秒，僅供參考）")
+    print(f"[rate] 錯誤: {errors or '無'}")
+
+    failures = []
+    if throughput < args.rate * MIN_RATE_RATIO:
+        failures.append(f"吞吐量 {throughput:,.0f} 請求/秒未達目標 {args.rate:,.0f} 的 {MIN_RATE_RATIO:.0%}")
+    if p99 > args.max_p99_ms:
+        failures.append(f"p99延遲 {p99:.3f} ms 超過 {args.max_p99_ms} ms")
+    if errors:
+        failures.append(f"出現錯誤回應: {errors}")
+    return failures
+
+
+async def run_shed(args):
+    """負載卸除情境，返回失敗訊息列表"""
+    server = Server('--max-queue', str(args.shed_queue))
+    results = []
+    try:
+        sent = args.shed_burst * args.connections
+        await asyncio.gather(*(burst_client(server.host, server.port, args.shed_burst, results, seed)
+                               for seed in range(args.connections)))
+        response, probe_latency = await probe(server.host, server.port)
+    finally:
+        server.stop()
+
+    shed = sum(result.get('error') == 'overloaded' for result in results)
+    others = sum('error' in result and result['error'] != 'overloaded' for result in results)
+    print(f"[shed] 佇列上限: {args.shed_queue}，突發請求: {sent:,}")
+    print(f"[shed] 回應: {len(results):,}，完成計價: {len(results) - shed - others:,}，"
+          f"拒絕（overloaded）: {shed:,}，其他錯誤: {others}")
+    print(f"[shed] 突發後的探測請求: {response}（{probe_latency * 1000:.3f} ms）")
+
+    failures = []
+    if len(results) != sent:
+        failures.append(f"只收到 {len(results):,}/{sent:,} 個回應")
+    if not shed:
+        failures.append("佇列已滿時沒有請求被拒絕")
+    if others:
+        failures.append(f"出現 {others} 個非overloaded的錯誤")
+    if response.get('total') != 182.0:
+        failures.append(f"突發後的探測請求結果錯誤: {response}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="計價服務負載測試")
+    parser.add_argument('--scenario', choices=('rate', 'shed', 'all'), default='all', help="執行的情境")
+    parser.add_argument('--duration', type=float, default=5.0, help="固定速率情境的秒數")
+    parser.add_argument('--rate', type=float, default=20_000, help="目標送出速率（請求/秒）")
+    parser.add_argument('--connections', type=int, default=4, help="連線數")
+    parser.add_argument('--max-p99-ms', type=float, default=2.0, help="p99延遲上限（毫秒）")
+    parser.add_argument('--shed-queue', type=int, default=64, help="負載卸除情境的服務佇列上限")
+    parser.add_argument('--shed-burst', type=int, default=5_000, help="負載卸除情境每個連線的突發請求數")
+    args = parser.parse_args(argv)
+
+    failures = []
+    if args.scenario in ('rate', 'all'):
+        failures += asyncio.run(run_rate(args))
+    if args.scenario in ('shed', 'all'):
+        failures += asyncio.run(run_shed(args))
+    if failures:
+        print()
+        for failure in failures:
+            print(failure)
+        return 1
+    print("\n全部情境通過")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
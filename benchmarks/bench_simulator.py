@@ -0,0 +1,75 @@
+"""
+促銷方案試算基準：100個候選方案的網格對大量歷史購物記錄做一次試算
+
+以實測吞吐量推算1000萬筆購物的耗時，超過預算（預設5分鐘）或與逐筆計價不一致時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_simulator.py [--rows 2000000] [--target-rows 10000000] [--budget-s 300]
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from promotion_simulator import PromotionSimulator, candidate_grid
+
+RATES = (0.7, 0.75, 0.8, 0.85, 0.9)
+THRESHOLDS = (80, 100, 120, 150, 200)
+AMOUNTS = (5, 10, 15, 20)
+CHUNK_ROWS = 1 << 20
+
+
+def check_sample(candidates, apple, strawberry, mango):
+    """以編譯後的逐筆計價函數核對試算結果"""
+    simulator = PromotionSimulator(candidates)
+    simulator.add(apple, strawberry, mango)
+    rows = list(zip(apple.tolist(), strawberry.tolist(), mango.tolist()))
+    for result in simulator.results():
+        pricer = result.promotion.price_cents
+        if sum(pricer(*row) for row in rows) != result.revenue_cents:
+            return result.promotion.code
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="促銷方案試算基準")
+    parser.add_argument('--rows', type=int, default=2_000_000, help="實際量測的購物筆數")
+    parser.add_argument('--target-rows', type=int, default=10_000_000, help="推算耗時的購物筆數")
+    parser.add_argument('--budget-s', type=float, default=300.0, help="推算耗時的預算（秒）")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    apple, strawberry, mango = (rng.integers(0, 20, args.rows, dtype=np.int32) for _ in range(3))
+    candidates = candidate_grid(RATES, THRESHOLDS, AMOUNTS)
+
+    mismatch = check_sample(candidates, apple[:2000], strawberry[:2000], mango[:2000])
+
+    start = perf_counter()
+    simulator = PromotionSimulator(candidates)
+    for begin in range(0, args.rows, CHUNK_ROWS):
+        end = begin + CHUNK_ROWS
+        simulator.add(apple[begin:end], strawberry[begin:end], mango[begin:end])
+    results = simulator.results()
+    elapsed = perf_counter() - start
+    projected = elapsed * args.target_rows / args.rows
+
+    best = max(results, key=lambda result: result.revenue_cents)
+    print(f"候選方案: {len(results)}，購物筆數: {args.rows:,}")
+    print(f"耗時: {elapsed:.2f} 秒（{args.rows * len(results) / elapsed:,.0f} 筆×方案/秒）")
+    print(f"推算 {args.target_rows:,} 筆: {projected:.1f} 秒（預算 {args.budget_s:.0f} 秒）")
+    print(f"營收最高: {best.promotion.code}，達標比例 {best.threshold_share:.1%}")
+    if mismatch:
+        print(f"候選方案 {mismatch} 的試算結果與逐筆計價不一致")
+        return 1
+    if projected > args.budget_s:
+        print("超過預算")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
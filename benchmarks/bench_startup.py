@@ -0,0 +1,84 @@
+"""
+冷啟動匯入基準：以 python -X importtime 在全新行程中匯入各模組，量測累計匯入時間
+
+計價核心（pricing_core）須在預算內完成匯入，且核心與GUI模組匯入時都不得載入
+tkinter或numpy（兩者只在建立視窗或第一次批量計價時才載入）。
+超過預算或載入了禁止的模組時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_startup.py [--runs 15] [--budget-ms 25]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模組 -> 匯入時不得載入的套件
+MODULES = {
+    'pricing_core': ('tkinter', '_tkinter', 'numpy'),
+    'FruitPriceCalculator': ('tkinter', '_tkinter', 'numpy'),
+    'GUI_FruitCalculator': ('tkinter', '_tkinter', 'numpy'),
+    'pricing_server': ('tkinter', '_tkinter'),
+    'parallel_batch': ('tkinter', '_tkinter'),
+}
+CORE = 'pricing_core'
+
+
+def import_once(module):
+    """在新行程中匯入module，返回(累計微秒, 載入的全部模組名稱)"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # 與實際部署相同，使用已編譯的.pyc
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        loaded.add(name)
+        if name == module:
+            cumulative = int(cumulative_us)
+    return cumulative, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="冷啟動匯入基準")
+    parser.add_argument('--runs', type=int, default=15, help="每個模組量測的行程數")
+    parser.add_argument('--budget-ms', type=float, default=25.0, help="計價核心的累計匯入時間預算")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'模組':<24}{'中位數 (毫秒)':>14}{'最小 (毫秒)':>14}")
+    for module, forbidden in MODULES.items():
+        import_once(module)  # 預熱：產生.pyc
+        samples = []
+        loaded = set()
+        for _ in range(args.runs):
+            cumulative, loaded = import_once(module)
+            samples.append(cumulative / 1000)
+        median = statistics.median(samples)
+        print(f"{module:<24}{median:>14.2f}{min(samples):>14.2f}")
+        leaked = sorted(name for name in loaded if name.split('.')[0] in forbidden)
+        if leaked:
+            failures.append(f"{module} 匯入時載入了 {', '.join(leaked)}")
+        if module == CORE and median > args.budget_ms:
+            failures.append(f"{module} 匯入時間 {median:.2f} 毫秒超過預算 {args.budget_ms} 毫秒")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(failure)
+        return 1
+    print(f"\n{CORE} 在預算 {args.budget_ms} 毫秒內，且未載入GUI或numpy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+分級滿減基準：數百檔滿減表的逐筆與批量查詢
+
+比較逐筆查詢時bisect二分搜尋（ThresholdTiers.discount_cents）與逐檔線性掃描的耗時，
+以及批量計價時numpy.searchsorted一次查出整欄的吞吐量；另以線性掃描核對編譯後的方案計價函數、
+calculate_price_cents與price_columns_cents的結果。結果不一致時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_tiers.py [--tiers 300] [--rows 10000000]
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_core import ShoppingSystem
+from promotions import PROMOTIONS
+from tiers import ThresholdTiers
+
+
+def make_tiers(count):
+    """滿100減10起，每檔門檻加20元、減額加2.5元"""
+    return [(100 + 20 * i, 10 + 2.5 * i) for i in range(count)]
+
+
+def linear_discount(tier_rows, subtotal):
+    """逐檔掃描的參考實作：小計達到的最後一檔減額"""
+    discount = 0
+    for threshold, amount in tier_rows:
+        if subtotal < threshold:
+            break
+        discount = amount
+    return discount
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        times.append(perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分級滿減基準")
+    parser.add_argument('--tiers', type=int, default=300, help="滿減檔數")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="批量查詢的筆數")
+    parser.add_argument('--lookups', type=int, default=200_000, help="逐筆查詢的次數")
+    parser.add_argument('--repeat', type=int, default=3, help="重複次數（取最短）")
+    args = parser.parse_args(argv)
+
+    tiers = ThresholdTiers(make_tiers(args.tiers))
+    tier_rows = list(zip(tiers.threshold_cents, tiers.amount_cents))
+    top = tiers.threshold_cents[-1] + 10_000
+    rng = np.random.default_rng(0)
+    subtotals = rng.integers(0, top, args.lookups).tolist()
+
+    bisect_time, by_bisect = best_of(lambda: list(map(tiers.discount_cents, subtotals)), args.repeat)
+    linear_time, by_scan = best_of(
+        lambda: [linear_discount(tier_rows, subtotal) for subtotal in subtotals], args.repeat)
+    print(f"檔數: {len(tiers)}")
+    print(f"逐筆bisect: {bisect_time / args.lookups * 1e9:,.0f} 納秒/筆")
+    print(f"逐筆線性掃描: {linear_time / args.lookups * 1e9:,.0f} 納秒/筆"
+          f"（bisect快 {linear_time / bisect_time:.1f} 倍）")
+    mismatches = sum(a != b for a, b in zip(by_bisect, by_scan))
+
+    column = rng.integers(0, top, args.rows, dtype=np.int64)
+    batch_time, by_batch = best_of(lambda: tiers.discounts_cents(column), args.repeat)
+    print(f"批量searchsorted: {batch_time:.3f} 秒（{args.rows / batch_time / 1e6:.1f} M筆/秒）")
+    sample = column[:args.lookups].tolist()
+    mismatches += sum(int(got) != linear_discount(tier_rows, subtotal)
+                      for got, subtotal in zip(by_batch[:args.lookups], sample))
+
+    # 各條計價路徑與線性掃描核對
+    tiered = {"code": "T", "label": "分級滿減", "description": "分級滿減",
+              "skus": ("apple", "strawberry", "mango"), "discounts": {"strawberry": 0.8},
+              "discount_tiers": make_tiers(args.tiers)}
+    system = ShoppingSystem(promotions=list(PROMOTIONS) + [tiered])
+    weights = [rng.integers(0, 60, args.lookups // 10) for _ in range(3)]
+    scheme = np.zeros(len(weights[0]), dtype=np.uint8)
+    batch = system.price_columns_cents(('T',), scheme, *weights).tolist()
+    pricer = system.pricers['T']
+    for (a, s, m), got in zip(zip(*(w.tolist() for w in weights)), batch):
+        subtotal = system.calculate_price_cents(a, s, m, 0.8)
+        expected = subtotal - linear_discount(tier_rows, subtotal)
+        if not (got == pricer(a, s, m) == expected
+                == system.calculate_price_cents(a, s, m, 0.8, discount_tiers=tiers)):
+            mismatches += 1
+    print(f"核對: 不一致 {mismatches} 筆")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+整欄驗證基準：一千萬筆購物的斤數檢查與計價耗時比較
+
+以pricing_core.validate_columns檢查全部列（含負數、全為零、方案不販售的水果與無效方案），
+再以ShoppingSystem.price_columns_cents計價同樣的欄，比較兩者耗時；另取樣逐筆以
+check_reason核對原因代碼。原因代碼不一致，或驗證耗時超過計價的--max-ratio倍時以狀態碼1結束。
+
+用法:
+    python benchmarks/bench_validation.py [--rows 10000000] [--max-ratio 0.5]
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_core import (
+    REASON_INVALID_SCHEME, REASON_NAMES, ShoppingSystem, check_reason, validate_columns,
+)
+
+
+def make_columns(rows, schemes, seed=0):
+    """隨機購物欄：約1%的無效方案索引、負數斤數與全為零的購物"""
+    rng = np.random.default_rng(seed)
+    scheme = rng.integers(0, len(schemes), rows, dtype=np.uint8)
+    scheme[rng.random(rows) < 0.01] = len(schemes)  # 超出方案表的索引為無效方案
+    weights = []
+    for _ in range(3):
+        weight = rng.integers(0, 20, rows, dtype=np.int32)
+        weight[rng.random(rows) < 0.005] *= -1
+        weights.append(weight)
+    zero = rng.random(rows) < 0.01
+    for weight in weights:
+        weight[zero] = 0
+    return scheme, weights
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        times.append(perf_counter() - start)
+    return min(times), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="整欄驗證基準")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="購物筆數")
+    parser.add_argument('--repeat', type=int, default=3, help="重複次數（取最短）")
+    parser.add_argument('--sample', type=int, default=100_000, help="逐筆核對的筆數")
+    parser.add_argument('--max-ratio', type=float, default=0.5, help="驗證耗時相對計價耗時的上限")
+    args = parser.parse_args(argv)
+
+    system = ShoppingSystem()
+    schemes = tuple(sorted(system.promotions))
+    scheme, weights = make_columns(args.rows, schemes)
+
+    validate_time, (valid, reasons) = best_of(
+        lambda: validate_columns(schemes, scheme, *weights, promotions=system.promotions),
+        args.repeat)
+    rows = np.flatnonzero(valid)
+    price_time, _ = best_of(
+        lambda: system.price_columns_cents(schemes, scheme[rows], *(w[rows] for w in weights)),
+        args.repeat)
+
+    print(f"筆數: {args.rows:,}（通過 {len(rows):,}）")
+    for code, count in zip(*np.unique(reasons, return_counts=True)):
+        print(f"  {REASON_NAMES[code]:<20} {count:>10,}")
+    print(f"驗證: {validate_time:.3f} 秒（{args.rows / validate_time / 1e6:.1f} M筆/秒）")
+    print(f"計價: {price_time:.3f} 秒（{len(rows) / price_time / 1e6:.1f} M筆/秒）")
+    ratio = validate_time / price_time
+    print(f"驗證/計價: {ratio:.2f}")
+
+    codes = schemes + (None,)
+    sample = np.random.default_rng(1).choice(args.rows, min(args.sample, args.rows), replace=False)
+    mismatches = 0
+    for i in sample.tolist():
+        code = codes[scheme[i]]
+        expected = (check_reason(*(int(w[i]) for w in weights), code, system.promotions)
+                    if code else REASON_INVALID_SCHEME)
+        if expected != reasons[i]:
+            mismatches += 1
+    print(f"逐筆核對: {len(sample):,} 筆，不一致 {mismatches} 筆")
+
+    status = 0
+    if mismatches:
+        status = 1
+    if ratio > args.max_ratio:
+        print(f"驗證耗時超過計價的 {args.max_ratio} 倍")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+計價正確性驗證基準：約一千萬筆案例的完整驗證
+
+以verification.run_verification執行全組合、門檻附近與隨機大斤數案例（隨機案例平均分配給
+各方案），量測總耗時與吞吐量，並與目標吞吐量（一千萬筆在60秒內完成所需，約16.7萬筆/秒）比較。
+發現反例、超過預算或吞吐量未達目標時以狀態碼1結束；以較小的--cases試跑時也能看出能否達標。
+
+用法:
+    python benchmarks/bench_verification.py [--cases 10000000] [--workers 0] [--budget 60] [--target 166667]
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_core import ShoppingSystem
+from verification import PATHS, run_verification
+
+# 目標吞吐量：一千萬筆案例在60秒內驗證完畢
+TARGET_THROUGHPUT = 10_000_000 / 60
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="計價正確性驗證基準")
+    parser.add_argument('--cases', type=int, default=10_000_000, help="隨機案例總數（各方案平分）")
+    parser.add_argument('--workers', type=int, default=0, help="行程數，0表示依CPU核心數")
+    parser.add_argument('--budget', type=float, default=60.0, help="總耗時預算（秒）")
+    parser.add_argument('--target', type=float, default=TARGET_THROUGHPUT, help="目標吞吐量（筆/秒）")
+    args = parser.parse_args(argv)
+
+    system = ShoppingSystem()
+    workers = args.workers or os.cpu_count() or 1
+    start = perf_counter()
+    checked, failures = run_verification(workers, system,
+                                         random_cases=args.cases // len(system.promotions))
+    elapsed = perf_counter() - start
+    throughput = checked / elapsed
+    print(f"行程數: {workers}")
+    print(f"案例數: {checked:,} × {len(PATHS)} 條計價路徑")
+    print(f"耗時: {elapsed:.2f} 秒（{throughput:,.0f} 筆/秒）")
+    print(f"目標: {args.target:,.0f} 筆/秒，達成 {throughput / args.target:.0%}")
+
+    status = 0
+    if failures:
+        print(f"發現 {len(failures)} 個反例")
+        status = 1
+    if elapsed > args.budget:
+        print(f"耗時超過預算 {args.budget} 秒")
+        status = 1
+    if throughput < args.target:
+        print(f"吞吐量未達目標 {args.target:,.0f} 筆/秒")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
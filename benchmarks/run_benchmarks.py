@@ -0,0 +1,236 @@
+"""
+計價與小票熱路徑基準測試套件
+
+涵蓋 Fruit.calculate_price、各方案的 ShoppingSystem.calculate_price、
+get_detailed_calculation、print_receipt（標準輸出重導）以及
+FruitPriceCalculatorGUI.display_result 的字串組裝（不建立視窗）。
+
+用法:
+    python benchmarks/run_benchmarks.py --save              # 量測並寫入基準檔
+    python benchmarks/run_benchmarks.py                     # 與基準檔比較
+    python benchmarks/run_benchmarks.py --tolerance 0.15    # 允許吞吐量下降15%
+    python benchmarks/run_benchmarks.py --only receipt      # 只執行名稱包含receipt的項目
+    python benchmarks/run_benchmarks.py --rounds 30         # 增加交替量測的輪數
+
+全部項目以多輪短量測交替進行，每輪另量測一次固定的純Python參考工作量（reference），
+各項目以「該輪吞吐量 / 同一輪參考工作量的吞吐量」的中位數比較，整台機器變快或變慢
+（頻率、排程、其他行程）同時影響兩者而互相抵消。中位數的雜訊由各輪的分散程度估計，
+各項目的容許誤差取--tolerance與NOISE_FACTOR ×（本次與基準兩者較大的雜訊）中較大者；
+相對吞吐量低於基準 ×（1 − 容許誤差）時列出退步項目並以狀態碼1結束；
+找不到基準檔時只列出本次結果，並以狀態碼2結束（未比較，不視為通過）。
+基準檔記錄建立時的Python版本與機器架構，與目前環境不同時列出警告，比較結果僅供參考。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from FruitPriceCalculator import Fruit, ShoppingSystem
+from profiling import NULL_TRACER
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# 找不到基準檔時的狀態碼（與退步的1區分）
+EXIT_NO_BASELINE = 2
+# 容許誤差至少為中位數雜訊的倍數
+NOISE_FACTOR = 3
+WEIGHTS = (3, 7, 2)
+_REFERENCE_TABLE = {i: i * 7 + 3 for i in range(16)}
+
+
+def reference():
+    """參考工作量：不依賴本專案程式碼的函數呼叫、整數運算與字典查詢"""
+    total = 0
+    for i in range(16):
+        total += _REFERENCE_TABLE[i] * i // 3
+    return total
+
+
+def build_cases():
+    """返回 {名稱: 無參數函數}"""
+    system = ShoppingSystem()
+    fruit = Fruit('草莓', 13)
+    cases = {
+        'fruit.calculate_price': lambda: fruit.calculate_price(7, 0.8),
+    }
+
+    for code, promotion in system.promotions.items():
+        params = (promotion.discount_for('strawberry'), promotion.discount_threshold,
+                  promotion.discount_amount)
+        weights = tuple(weight if promotion.sells(sku) else 0
+                        for sku, weight in zip(('apple', 'strawberry', 'mango'), WEIGHTS))
+        cases[f'calculate_price[{code}]'] = (
+            lambda weights=weights, params=params: system.calculate_price(*weights, *params))
+
+    d_params = (0.8, 100, 10)
+    cases['get_detailed_calculation'] = lambda: system.get_detailed_calculation(*WEIGHTS, *d_params)
+
+    sink = io.StringIO()
+
+    def print_receipt():
+        sink.seek(0)
+        sink.truncate()
+        with contextlib.redirect_stdout(sink):
+            system.print_receipt(*WEIGHTS, *d_params, customer_name='D')
+    cases['print_receipt'] = print_receipt
+
+    try:
+        from GUI_FruitCalculator import FruitPriceCalculatorGUI
+    except ImportError:  # 沒有tkinter的環境略過GUI項目
+        FruitPriceCalculatorGUI = None
+    if FruitPriceCalculatorGUI is not None:
+        gui = types.SimpleNamespace(
+            shopping_system=system,
+            tracer=NULL_TRACER,
+            update_result_segments=lambda segments: None,
+        )
+        customer_info = {"code": "D", "strawberry_discount": 0.8, "has_mango": True,
+                         "discount_threshold": 100, "discount_amount": 10}
+
+        def display_result():
+            # 每次重新報價，量測計價一次加上小票字串組裝的成本
+            quote = system.get_quote(*WEIGHTS, *d_params)
+            FruitPriceCalculatorGUI.display_result(gui, customer_info, quote)
+        cases['gui.display_result'] = display_result
+    return cases
+
+
+def calibrate(func, min_time):
+    """返回(Timer, 每次量測的呼叫次數)，使一次量測至少min_time秒"""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return timer, number
+
+
+def measure(cases, rounds=15, min_time=0.05):
+    """
+    交替量測全部項目，返回({名稱: 每秒執行次數}, {名稱: 相對吞吐量}, {名稱: 中位數雜訊})
+    每輪先量測參考工作量，再依序量測每個項目一次；相對吞吐量為各輪
+    「項目吞吐量 / 參考吞吐量」的中位數，雜訊為其中位數的相對標準誤差
+    （以中位數絕對偏差估計：1.4826 × MAD × 1.2533 / √輪數）
+    """
+    base_timer, base_number = calibrate(reference, min_time)
+    timers = {name: calibrate(func, min_time) for name, func in cases.items()}
+    ops = {name: [] for name in cases}
+    ratios = {name: [] for name in cases}
+    for _ in range(rounds):
+        base = base_number / base_timer.timeit(base_number)
+        for name, (timer, number) in timers.items():
+            value = number / timer.timeit(number)
+            ops[name].append(value)
+            ratios[name].append(value / base)
+    results, relative, noise = {}, {}, {}
+    for name in cases:
+        median = relative[name] = statistics.median(ratios[name])
+        mad = statistics.median(abs(ratio - median) for ratio in ratios[name])
+        noise[name] = 1.4826 * mad * 1.2533 / rounds ** 0.5 / median
+        results[name] = statistics.median(ops[name])
+    return results, relative, noise
+
+
+def environment():
+    """目前的量測環境（寫入基準檔，比較時核對）"""
+    return {'python': platform.python_version(), 'machine': platform.machine()}
+
+
+def environment_warnings(baseline):
+    """基準檔的建立環境與目前不同時返回警告訊息列表"""
+    warnings = []
+    for key, current in environment().items():
+        recorded = baseline.get(key)
+        if recorded != current:
+            warnings.append(f"基準檔的{key}為 {recorded or '未記錄'}，目前為 {current}")
+    return warnings
+
+
+def item_tolerance(tolerance, noise, baseline_noise):
+    """項目的容許誤差：tolerance與NOISE_FACTOR × 較大的雜訊中較大者"""
+    return max(tolerance, NOISE_FACTOR * max(noise, baseline_noise))
+
+
+def compare(results, relative, noise, baseline, tolerance):
+    """比較相對吞吐量與基準（基準檔內容），返回退步項目列表"""
+    base_results = baseline.get('results', {})
+    base_relative = baseline.get('relative', {})
+    base_noise = baseline.get('noise', {})
+    regressions = []
+    print(f"{'項目':<28}{'目前 (次/秒)':>16}{'基準 (次/秒)':>16}{'相對變化':>10}{'容許':>8}")
+    for name, ops in results.items():
+        base = base_results.get(name)
+        if base is None or name not in base_relative:
+            print(f"{name:<28}{ops:>16,.0f}{'-':>16}{'新增':>10}")
+            continue
+        change = relative[name] / base_relative[name] - 1
+        allowed = item_tolerance(tolerance, noise[name], base_noise.get(name, 0.0))
+        flag = ''
+        if change < -allowed:
+            regressions.append((name, ops, base, change, allowed))
+            flag = '  <-- 退步'
+        print(f"{name:<28}{ops:>16,.0f}{base:>16,.0f}{change:>+10.1%}{allowed:>8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="計價熱路徑基準測試")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基準檔路徑")
+    parser.add_argument('--save', action='store_true', help="將本次結果寫入基準檔")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="允許的吞吐量下降比例，預設0.10")
+    parser.add_argument('--rounds', type=int, default=15, help="交替量測的輪數（吞吐量取各輪的中位數）")
+    parser.add_argument('--only', help="只執行名稱包含此字串的項目")
+    args = parser.parse_args(argv)
+
+    cases = build_cases()
+    if args.only:
+        cases = {name: func for name, func in cases.items() if args.only in name}
+
+    results, relative, noise = measure(cases, args.rounds)
+
+    if args.save:
+        data = {**environment(), 'results': results, 'relative': relative, 'noise': noise}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                previous = json.load(f)
+            for key in ('results', 'relative', 'noise'):
+                data[key] = {**previous.get(key, {}), **data[key]}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        for name, ops in results.items():
+            print(f"{name:<28}{ops:>16,.0f} 次/秒（雜訊 {noise[name]:.1%}）")
+        print(f"已寫入基準檔: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        for name, ops in results.items():
+            print(f"{name:<28}{ops:>16,.0f} 次/秒（雜訊 {noise[name]:.1%}）")
+        print(f"找不到基準檔 {args.baseline}，未進行比較；請先以 --save 建立")
+        return EXIT_NO_BASELINE
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    mismatched = environment_warnings(baseline)
+    for warning in mismatched:
+        print(f"警告: {warning}")
+    if mismatched:
+        print("警告: 量測環境與基準檔不同，比較結果僅供參考\n")
+    regressions = compare(results, relative, noise, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} 個項目吞吐量下降超過容許誤差:")
+        for name, ops, base, change, allowed in regressions:
+            print(f"  {name}: {base:,.0f} → {ops:,.0f} 次/秒（相對變化 {change:+.1%}，容許 {allowed:.0%}）")
+        return 1
+    print(f"\n全部項目均在容許範圍（至少 {args.tolerance:.0%}）內")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
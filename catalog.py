@@ -0,0 +1,183 @@
+"""
+商品目錄
+
+將SKU代碼對應到連續的索引，單價（分）存放在連續的整數陣列中。
+購物籃以(索引, 斤數)的明細表示，計價成本只與明細行數有關，與目錄大小無關。
+
+目錄內容保存在不可變的版本快照（CatalogSnapshot）中。計價時只讀取一次
+Catalog.snapshot，之後全部使用同一個快照，不需要加鎖；修改單價時複製出新快照
+再一次替換（copy-on-write），正在計價的執行緒不會讀到新舊價格混雜的目錄。
+"""
+from money import to_cents
+
+# 預設商品：(代碼, 名稱, 單價)
+DEFAULT_ITEMS = (
+    ('apple', '蘋果', 8),
+    ('strawberry', '草莓', 13),
+    ('mango', '芒果', 20),
+)
+
+
+class CatalogSnapshot:
+    """某一版本的商品目錄（不可變）"""
+    __slots__ = ('version', 'skus', 'names', 'prices', 'price_cents', '_index')
+
+    def __init__(self, version, skus, names, prices, price_cents, index=None):
+        self.version = version
+        self.skus = skus
+        self.names = names
+        self.prices = prices              # 原始單價（元），供顯示
+        self.price_cents = price_cents    # 單價（分），依索引連續存放
+        self._index = index if index is not None else {sku: i for i, sku in enumerate(skus)}
+
+    @classmethod
+    def from_items(cls, items, version=0):
+        """由(代碼, 名稱, 單價)序列建立快照"""
+        skus, names, prices = [], [], []
+        index = {}
+        for sku, name, price in items:
+            if sku in index:
+                raise ValueError(f"重複的商品代碼: {sku}")
+            index[sku] = len(skus)
+            skus.append(sku)
+            names.append(name)
+            prices.append(price)
+        return cls(version, tuple(skus), tuple(names), tuple(prices),
+                   tuple(to_cents(price) for price in prices), index)
+
+    def index_of(self, sku):
+        """商品代碼 → 索引"""
+        try:
+            return self._index[sku]
+        except KeyError:
+            raise KeyError(f"未知的商品代碼: {sku}") from None
+
+    def with_item(self, sku, name, price):
+        """新增一項商品後的新版本"""
+        if sku in self._index:
+            raise ValueError(f"重複的商品代碼: {sku}")
+        index = dict(self._index)
+        index[sku] = len(self.skus)
+        return CatalogSnapshot(self.version + 1, self.skus + (sku,), self.names + (name,),
+                               self.prices + (price,), self.price_cents + (to_cents(price),), index)
+
+    def with_items(self, items):
+        """
+        以新的商品清單（(代碼, 名稱, 單價)序列）替換後的新版本
+        既有商品保持原索引（已編譯的計價函數依索引讀取單價），新商品附加在後面；
+        不可移除既有商品
+        """
+        updates = {}
+        for sku, name, price in items:
+            if sku in updates:
+                raise ValueError(f"重複的商品代碼: {sku}")
+            updates[sku] = (name, price)
+        missing = [sku for sku in self.skus if sku not in updates]
+        if missing:
+            raise ValueError(f"新目錄缺少既有商品: {', '.join(missing)}")
+        skus = self.skus + tuple(sku for sku in updates if sku not in self._index)
+        names = tuple(updates[sku][0] for sku in skus)
+        prices = tuple(updates[sku][1] for sku in skus)
+        # 單價未變的商品沿用原本換算好的分
+        old_prices, old_cents = self.prices, self.price_cents
+        price_cents = tuple(
+            old_cents[i] if i < len(old_prices) and old_prices[i] == price else to_cents(price)
+            for i, price in enumerate(prices)
+        )
+        index = self._index if len(skus) == len(self.skus) else {sku: i for i, sku in enumerate(skus)}
+        return CatalogSnapshot(self.version + 1, skus, names, prices, price_cents, index)
+
+    def with_prices(self, changes):
+        """修改單價後的新版本；changes為{索引: 單價}"""
+        prices = list(self.prices)
+        price_cents = list(self.price_cents)
+        for index, price in changes.items():
+            prices[index] = price
+            price_cents[index] = to_cents(price)
+        return CatalogSnapshot(self.version + 1, self.skus, self.names, tuple(prices),
+                               tuple(price_cents), self._index)
+
+    def items(self):
+        """依索引順序產出(代碼, 名稱, 單價)"""
+        return zip(self.skus, self.names, self.prices)
+
+    def __len__(self):
+        return len(self.skus)
+
+    def __contains__(self, sku):
+        return sku in self._index
+
+
+class Catalog:
+    """
+    版本化的商品目錄
+    讀取端取用snapshot屬性（不加鎖）；修改在鎖內建立新快照後一次替換，
+    寫入端之間互斥，讀取端永遠看到某一個完整的版本
+    """
+    def __init__(self, items=DEFAULT_ITEMS):
+        import threading  # 延到建立目錄時才載入，匯入計價核心時不需要
+        self._lock = threading.Lock()
+        self.snapshot = CatalogSnapshot.from_items(items)
+
+    # 以下屬性都取自目前的快照；需要多個欄位時請先取得snapshot再讀取，以免跨越兩個版本
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def skus(self):
+        return self.snapshot.skus
+
+    @property
+    def names(self):
+        return self.snapshot.names
+
+    @property
+    def prices(self):
+        return self.snapshot.prices
+
+    @property
+    def price_cents(self):
+        return self.snapshot.price_cents
+
+    def add(self, sku, name, price):
+        """新增商品，返回其索引"""
+        with self._lock:
+            snapshot = self.snapshot.with_item(sku, name, price)
+            self.snapshot = snapshot
+        return len(snapshot) - 1
+
+    def index_of(self, sku):
+        """商品代碼 → 索引"""
+        return self.snapshot.index_of(sku)
+
+    def set_price(self, index, price):
+        """
+        修改單價（以索引指定）
+        ShoppingSystem中請改用Fruit.price或ShoppingSystem.set_price，以保持兩者同步
+        """
+        return self.set_prices({index: price})
+
+    def set_prices(self, changes):
+        """一次修改多項單價（{索引: 單價}），全部生效於同一個新版本，返回新快照"""
+        with self._lock:
+            snapshot = self.snapshot.with_prices(changes)
+            self.snapshot = snapshot
+        return snapshot
+
+    def replace_items(self, items):
+        """以新的商品清單替換目錄（見CatalogSnapshot.with_items），一次生效，返回新快照"""
+        with self._lock:
+            snapshot = self.snapshot.with_items(items)
+            self.snapshot = snapshot
+        return snapshot
+
+    def items(self):
+        """依索引順序產出(代碼, 名稱, 單價)"""
+        return self.snapshot.items()
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def __contains__(self, sku):
+        return sku in self.snapshot
@@ -0,0 +1,188 @@
+"""
+商品目錄檔與熱重載
+
+單價與品名放在外部的JSON或TOML檔，修改檔案後不需重新啟動：CatalogWatcher以
+檔案的修改時間與大小輪詢（未變動時只有一次stat），變動時在計價路徑之外解析與驗證，
+通過後以ShoppingSystem.update_catalog一次替換目錄快照；正在計價的請求繼續使用
+開始時取得的快照。檔案內容有誤時保留目前的目錄，錯誤記錄在last_error。
+
+檔案格式（JSON）:
+    {"items": [{"sku": "apple", "name": "蘋果", "price": 8}, ...]}
+檔案格式（TOML）:
+    [[items]]
+    sku = "apple"
+    name = "蘋果"
+    price = 8
+
+TOML檔若只由上述版面的[[items]]組成（依序sku、name、price，字串不含跳脫字元），
+以正規表示式直接讀取；其他寫法交給純Python的tomllib（一萬項約需三百毫秒）。
+
+環境變數FRUIT_CATALOG可指定命令列、GUI與計價服務預設使用的目錄檔。
+"""
+import json
+import math
+import os
+import re
+import threading
+
+from catalog import Catalog
+
+CATALOG_ENV = 'FRUIT_CATALOG'
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+# 簡單版面的TOML：[[items]]表頭後依序接sku、name、price各一行，字串不含跳脫與控制字元，數字為十進位
+_SIMPLE_TOML_STRING = r'"([^"\\\x00-\x1f\x7f]*)"'
+_SIMPLE_TOML_ITEM = re.compile(
+    r'\[\[items\]\]\n'
+    r'sku = ' + _SIMPLE_TOML_STRING + r'\n'
+    r'name = ' + _SIMPLE_TOML_STRING + r'\n'
+    r'price = (-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?)\n'
+    r'\n*')
+
+
+def _parse_simple_toml(text):
+    """讀取簡單版面的TOML目錄檔；含任何其他寫法時返回None（改用tomllib）"""
+    items = []
+    pos = 0
+    for found in _SIMPLE_TOML_ITEM.finditer(text):
+        if found.start() != pos:
+            return None
+        sku, name, price = found.groups()
+        items.append({'sku': sku, 'name': name, 'price': float(price) if '.' in price else int(price)})
+        pos = found.end()
+    if pos != len(text) or not items:
+        return None
+    return {'items': items}
+
+
+def parse_catalog(data, source="目錄檔"):
+    """驗證已解析的目錄資料，返回[(代碼, 名稱, 單價), ...]；格式錯誤時拋出ValueError"""
+    if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+        raise ValueError(f"{source}: 缺少商品清單 items")
+    items = []
+    seen = set()
+    for number, item in enumerate(data['items'], 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"{source}: 第{number}項商品格式錯誤")
+        sku, name, price = item.get('sku'), item.get('name'), item.get('price')
+        if not isinstance(sku, str) or not sku:
+            raise ValueError(f"{source}: 第{number}項商品代碼無效: {sku!r}")
+        if sku in seen:
+            raise ValueError(f"{source}: 重複的商品代碼: {sku}")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"{source}: 商品{sku}缺少名稱")
+        if isinstance(price, bool) or not isinstance(price, (int, float)) \
+                or not math.isfinite(price) or price < 0:
+            raise ValueError(f"{source}: 商品{sku}的單價無效: {price!r}")
+        seen.add(sku)
+        items.append((sku, name, price))
+    return items
+
+
+def load_catalog_items(path):
+    """讀取並驗證目錄檔（副檔名.toml為TOML，其餘為JSON）"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        if str(path).endswith('.toml'):
+            text = raw.decode('utf-8')
+            data = _parse_simple_toml(text)
+            if data is None:
+                import tomllib  # 只有不是簡單版面的TOML目錄檔才載入
+                data = tomllib.loads(text)
+        else:
+            data = json.loads(raw)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError(f"{path}: 無法解析目錄檔: {exc}") from None
+    return parse_catalog(data, path)
+
+
+def load_catalog(path):
+    """由目錄檔建立Catalog"""
+    return Catalog(load_catalog_items(path))
+
+
+class CatalogWatcher:
+    """
+    輪詢目錄檔，變動時驗證並替換ShoppingSystem的目錄
+    參數:
+        path: 目錄檔路徑
+        system: ShoppingSystem
+        on_reload: 可選的回呼，替換成功後以新的價目版本呼叫
+        on_error: 可選的回呼，載入失敗時以例外呼叫（目前的目錄保持不變）
+    GUI在事件迴圈中定期呼叫poll()；其他程式可用start()在背景執行緒輪詢
+    """
+    def __init__(self, path, system, on_reload=None, on_error=None):
+        self.path = path
+        self.system = system
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.reloads = 0
+        self.last_error = None
+        self._stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """檢查目錄檔，有變動且內容有效時替換目錄；返回是否替換了目錄"""
+        try:
+            stamp = self._file_stamp()
+        except OSError as exc:
+            return self._failed(exc)
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp  # 內容有誤時也記下，等檔案再次變動才重試
+        try:
+            items = load_catalog_items(self.path)  # 解析與驗證都在替換之前、鎖之外完成
+            version = self.system.update_catalog(items)
+        except (OSError, ValueError) as exc:
+            return self._failed(exc)
+        self.last_error = None
+        self.reloads += 1
+        if self.on_reload is not None:
+            self.on_reload(version)
+        return True
+
+    def _failed(self, exc):
+        self.last_error = str(exc)
+        if self.on_error is not None:
+            self.on_error(exc)
+        return False
+
+    def start(self, interval=DEFAULT_POLL_INTERVAL):
+        """在背景執行緒中每interval秒輪詢一次"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                        name='catalog-watcher')
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.poll()
+
+    def stop(self):
+        """停止背景輪詢"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def watch_catalog(system, path, on_reload=None, on_error=None):
+    """
+    將目錄檔載入system並返回其CatalogWatcher（之後呼叫poll()或start()即可熱重載）
+    第一次載入失敗時拋出ValueError，不會以預設價目繼續執行
+    """
+    watcher = CatalogWatcher(path, system)
+    if not watcher.poll():
+        raise ValueError(watcher.last_error)
+    watcher.on_reload = on_reload
+    watcher.on_error = on_error
+    return watcher
@@ -0,0 +1,269 @@
+"""
+欄式二進位交易記錄（.frtx）
+
+CSV解析比計價本身還慢，大量購物記錄可先轉成欄式二進位檔，之後以記憶體映射讀取，
+各欄直接以numpy視圖交給ShoppingSystem.price_columns_cents計價，不經文字解析也不複製。
+檔案大小不受記憶體限制：轉檔與計價都以固定列數的區塊進行，也可依列範圍隨機讀取。
+
+檔案格式（小端序）:
+    標頭    magic 'FRTX'、版本(u2)、標頭長度(u2)、列數(u8)、方案數(u1)
+    方案表  每個方案代碼8位元組ASCII（不足補0），最多255個方案
+    各欄    依COLUMNS順序連續存放，每欄起點對齊64位元組
+"""
+import contextlib
+import csv
+import heapq
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from money import cents_to_yuan
+from pricing_core import ShoppingSystem, reason_message, validate_columns
+
+MAGIC = b'FRTX'
+SCHEMA_VERSION = 1
+HEADER = struct.Struct('<4sHHQB')
+SCHEME_CODE = struct.Struct('8s')
+# 方案數存成u1、方案欄為<u1，方案表最多255個代碼
+MAX_SCHEMES = 255
+ALIGNMENT = 64
+# 版本1的欄位：(名稱, numpy dtype)
+COLUMNS = (
+    ('scheme', '<u1'),
+    ('apple', '<i4'),
+    ('strawberry', '<i4'),
+    ('mango', '<i4'),
+)
+WEIGHT_LIMIT = 2 ** 31 - 1
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def column_offsets(header_size, rows):
+    """各欄在檔案中的起點位移，以及檔案總長度"""
+    offsets = {}
+    offset = _align(header_size)
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset = _align(offset + rows * np.dtype(dtype).itemsize)
+    return offsets, offset
+
+
+class ColumnarTransactions:
+    """
+    以記憶體映射讀取欄式交易記錄
+    各欄是唯讀的numpy視圖，只有實際讀到的頁面才會載入記憶體
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"不是欄式交易記錄檔: {path}")
+            magic, version, header_size, rows, scheme_count = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"不是欄式交易記錄檔: {path}")
+            if version != SCHEMA_VERSION:
+                raise ValueError(f"不支持的欄式格式版本: {version}（支持版本{SCHEMA_VERSION}）")
+            table = f.read(scheme_count * SCHEME_CODE.size)
+        self.version = version
+        self.rows = rows
+        self.schemes = tuple(
+            SCHEME_CODE.unpack_from(table, i * SCHEME_CODE.size)[0].rstrip(b'\0').decode('ascii')
+            for i in range(scheme_count)
+        )
+        offsets, size = column_offsets(header_size, rows)
+        if os.path.getsize(path) < size:
+            raise ValueError(f"欄式交易記錄檔不完整: {path}")
+        self.columns = {}
+        for name, dtype in COLUMNS:
+            if rows:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode='r',
+                                               offset=offsets[name], shape=(rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def slice(self, start=0, stop=None):
+        """[start, stop)列範圍的(方案索引, 蘋果, 草莓, 芒果)視圖（不複製）"""
+        columns = self.columns
+        return tuple(columns[name][start:stop] for name, _ in COLUMNS)
+
+    def scheme_codes(self, start=0, stop=None):
+        """[start, stop)列範圍的方案代碼（字串陣列）"""
+        return np.array(self.schemes)[self.columns['scheme'][start:stop]]
+
+    def price_cents(self, system, start=0, stop=None):
+        """計算[start, stop)列範圍的總價（分）"""
+        return system.price_columns_cents(self.schemes, *self.slice(start, stop))
+
+    def iter_chunks(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """依序產出(起始列, 結束列)，每塊最多chunk_rows列"""
+        for start in range(0, self.rows, chunk_rows):
+            yield start, min(start + chunk_rows, self.rows)
+
+    def close(self):
+        """釋放記憶體映射（已取出的視圖仍可使用，直到不再被引用）"""
+        self.columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def check_schemes(schemes):
+    """
+    檢查方案表能否存入欄式檔：代碼須為ASCII且不超過8位元組，方案數不超過MAX_SCHEMES
+    否則拋出ValueError（struct會截斷過長的代碼，u1欄位會讓超過的方案索引溢位）
+    """
+    if len(schemes) > MAX_SCHEMES:
+        raise ValueError(f"欄式檔最多支持{MAX_SCHEMES}個方案，目前有{len(schemes)}個")
+    for code in schemes:
+        try:
+            encoded = code.encode('ascii')
+        except UnicodeEncodeError:
+            raise ValueError(f"欄式檔的方案代碼須為ASCII: {code!r}") from None
+        if len(encoded) > SCHEME_CODE.size:
+            raise ValueError(f"欄式檔的方案代碼不能超過{SCHEME_CODE.size}位元組: {code!r}")
+
+
+def _write_header(f, rows, schemes):
+    header_size = HEADER.size + len(schemes) * SCHEME_CODE.size
+    f.write(HEADER.pack(MAGIC, SCHEMA_VERSION, header_size, rows, len(schemes)))
+    for code in schemes:
+        f.write(SCHEME_CODE.pack(code.encode('ascii')))
+    return header_size
+
+
+def _weight_column(values):
+    """斤數列表 → int64陣列；超出int64的值夾到範圍內（仍會被判定為超出範圍或負數）"""
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        limit = np.iinfo(np.int64)
+        return np.array([min(max(value, limit.min), limit.max) for value in values], dtype=np.int64)
+
+
+def convert_transactions(input_path, output_path, reject_path=None, fmt=None,
+                         chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    將CSV/JSONL交易記錄轉為欄式二進位檔
+    驗證規則與檔案計價模式相同，驗證失敗的行寫入拒絕檔（未指定時寫到標準錯誤）
+    逐行只解析欄位，斤數規則以pricing_core.validate_columns逐區塊整欄檢查；
+    各欄先以區塊寫入暫存檔再合併，記憶體用量與檔案大小無關
+    返回:
+        (成功筆數, 拒絕筆數)
+    """
+    from FruitPriceCalculator import guess_format, parse_transactions, read_transactions
+    if fmt is None:
+        fmt = guess_format(input_path)
+    system = ShoppingSystem()
+    schemes = tuple(sorted(system.promotions))
+    check_schemes(schemes)  # 在讀取輸入前檢查，避免轉完才發現寫不進標頭
+    scheme_index = {code: i for i, code in enumerate(schemes)}
+    directory = os.path.dirname(os.path.abspath(output_path))
+
+    with contextlib.ExitStack() as stack:
+        if input_path == '-':
+            source = sys.stdin
+        else:
+            source = stack.enter_context(open(input_path, encoding='utf-8', newline=''))
+        if reject_path:
+            rejects = stack.enter_context(open(reject_path, 'w', encoding='utf-8', newline=''))
+        else:
+            rejects = sys.stderr
+        spools = {name: stack.enter_context(tempfile.TemporaryFile(dir=directory))
+                  for name, _ in COLUMNS}
+        reject_writer = csv.writer(rejects, lineterminator='\n')
+        reject_writer.writerow(('line', 'reason'))
+
+        line_numbers = []
+        buffers = {name: [] for name, _ in COLUMNS}
+        parse_errors = []  # 本區塊無法解析的行：(行號, 錯誤訊息)
+        accepted = rejected = 0
+
+        def spill():
+            nonlocal accepted, rejected
+            scheme = np.array(buffers['scheme'], dtype=np.uint8)
+            weights = [_weight_column(buffers[name]) for name, _ in COLUMNS[1:]]
+            valid, reasons = validate_columns(schemes, scheme, *weights, weight_limit=WEIGHT_LIMIT,
+                                              promotions=system.promotions)
+            invalid = np.flatnonzero(~valid)
+            rule_errors = [(line_numbers[i], reason_message(reason, schemes[code]))
+                           for i, reason, code in zip(invalid.tolist(), reasons[invalid].tolist(),
+                                                      scheme[invalid].tolist())]
+            reject_writer.writerows(heapq.merge(parse_errors, rule_errors))
+            rejected += len(parse_errors) + len(rule_errors)
+            accepted += len(scheme) - len(invalid)
+            for (name, dtype), column in zip(COLUMNS, [scheme] + weights):
+                spools[name].write(column[valid].astype(dtype).tobytes())
+            for buffer in buffers.values():
+                buffer.clear()
+            line_numbers.clear()
+            parse_errors.clear()
+
+        for line_no, choice, apple, strawberry, mango, error in parse_transactions(
+                read_transactions(source, fmt), scheme_index):
+            if error:
+                parse_errors.append((line_no, error))
+            else:
+                line_numbers.append(line_no)
+                buffers['scheme'].append(scheme_index[choice])
+                buffers['apple'].append(apple)
+                buffers['strawberry'].append(strawberry)
+                buffers['mango'].append(mango)
+            if len(line_numbers) + len(parse_errors) >= chunk_rows:
+                spill()
+        spill()
+
+        # 標頭 + 各欄（對齊64位元組）
+        with open(output_path, 'wb') as f:
+            header_size = _write_header(f, accepted, schemes)
+            offsets, size = column_offsets(header_size, accepted)
+            for name, _ in COLUMNS:
+                f.write(b'\0' * (offsets[name] - f.tell()))
+                spools[name].seek(0)
+                shutil.copyfileobj(spools[name], f, 1 << 20)
+            f.write(b'\0' * (size - f.tell()))
+    return accepted, rejected
+
+
+def price_columnar_file(input_path, output_path='-', chunk_rows=DEFAULT_CHUNK_ROWS,
+                        catalog_path=None):
+    """
+    計價欄式交易記錄檔，結果以與檔案計價模式相同的CSV格式寫出
+    catalog_path: 可選的商品目錄檔（見catalog_reload）
+    返回:
+        筆數
+    """
+    from FruitPriceCalculator import TRANSACTION_FIELDS, make_system
+    system = make_system(catalog_path)
+    with contextlib.ExitStack() as stack:
+        transactions = stack.enter_context(ColumnarTransactions(input_path))
+        if output_path == '-':
+            output = sys.stdout
+        else:
+            output = stack.enter_context(open(output_path, 'w', encoding='utf-8', newline=''))
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerow(TRANSACTION_FIELDS + ('total',))
+        schemes = transactions.schemes
+        for start, stop in transactions.iter_chunks(chunk_rows):
+            scheme, apple, strawberry, mango = transactions.slice(start, stop)
+            totals = system.price_columns_cents(schemes, scheme, apple, strawberry, mango)
+            writer.writerows(
+                (schemes[code], a, s, m, f"{cents_to_yuan(total):.2f}")
+                for code, a, s, m, total in zip(scheme.tolist(), apple.tolist(), strawberry.tolist(),
+                                                mango.tolist(), totals.tolist())
+            )
+    return len(transactions)
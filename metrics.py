@@ -0,0 +1,148 @@
+"""
+計價熱路徑指標
+
+提供計數器與延遲直方圖，可匯出為Prometheus文字格式或JSON快照。
+由ShoppingSystem.enable_metrics()掛上：計價函數的計數與延遲抽樣直接編譯進函數內
+（計數器是函數的閉包變數，以Metrics.bind_counter登錄），
+小票與明細則以包裝實例方法的方式量測；
+未啟用時計價路徑完全不經過這裡，沒有任何額外開銷。
+"""
+import bisect
+import json
+
+# 延遲直方圖的桶上限（秒）
+LATENCY_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2,
+)
+
+
+class Histogram:
+    """固定桶的直方圖"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後一格為+Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class ClosureCounter:
+    """
+    綁定在函數閉包變數（cell）上的計數器，以counter[0]讀寫
+    同一名稱與標籤可綁定多個閉包變數（例如方案的分與元兩個函數、共用Metrics的多個系統），讀取時相加
+    """
+    __slots__ = ('cells',)
+
+    def __init__(self):
+        self.cells = []
+
+    def __getitem__(self, index):
+        return sum(cell.cell_contents for cell in self.cells)
+
+    def __setitem__(self, index, value):
+        # 總數設為value：記在第一個閉包變數，其餘歸零
+        for cell in self.cells:
+            cell.cell_contents = 0
+        if self.cells:
+            self.cells[0].cell_contents = value
+
+
+class Metrics:
+    """
+    指標登錄表
+    參數:
+        sample_every: 延遲每幾次呼叫量測一次（計數器不抽樣），1表示每次都量測
+    """
+    def __init__(self, sample_every=64):
+        self.sample_every = max(1, sample_every)
+        self.counters = {}    # (名稱, 標籤) -> ClosureCounter
+        self.histograms = {}  # (名稱, 標籤) -> Histogram
+
+    def bind_counter(self, name, cell, **labels):
+        """把函數的閉包變數（見promotions.counter_cells）登錄為計數器，返回ClosureCounter"""
+        key = (name, tuple(sorted(labels.items())))
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = ClosureCounter()
+        counter.cells.append(cell)
+        return counter
+
+    def histogram(self, name, **labels):
+        """取得直方圖"""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def value(self, name, **labels):
+        """計數器目前數值（不存在時為0）"""
+        cell = self.counters.get((name, tuple(sorted(labels.items()))))
+        return cell[0] if cell else 0
+
+    def reset(self):
+        """將全部指標歸零（保留已建立的計數器與直方圖）"""
+        for cell in self.counters.values():
+            cell[0] = 0
+        for histogram in self.histograms.values():
+            histogram.counts = [0] * len(histogram.counts)
+            histogram.count = 0
+            histogram.sum = 0.0
+
+    def snapshot(self):
+        """JSON可序列化的快照"""
+        return {
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': cell[0]}
+                for (name, labels), cell in sorted(self.counters.items())
+            ],
+            'histograms': [
+                {'name': name, 'labels': dict(labels), **histogram.snapshot()}
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self):
+        """Prometheus文字格式"""
+        lines = []
+        seen = set()
+        for (name, labels), cell in sorted(self.counters.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {cell[0]}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + inner + "}"
+
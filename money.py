@@ -0,0 +1,75 @@
+"""
+定點數金額運算
+
+金額一律以「分」為單位的整數保存，折扣以「基點」（萬分之一）為單位的整數保存，
+避免浮點數累積誤差（例如草莓8折：13 × 0.8 = 10.4000000000000004）。
+單項金額的捨入規則：單價 × 斤數 × 折扣後，四捨五入到分（0.5分進位）。
+"""
+
+CENTS_PER_YUAN = 100
+BASIS_POINTS = 10000  # 1.0 = 無折扣
+
+
+# 換算結果快取：促銷參數種類很少，查表比每次round()便宜
+_CACHE_LIMIT = 4096
+_cents_cache = {}
+_basis_points_cache = {}
+# 小票金額文字快取：批量重印小票時同樣的金額反覆出現
+_YUAN_TEXT_LIMIT = 65536
+_yuan_text_cache = {}
+
+
+def to_cents(yuan):
+    """元 → 分"""
+    try:
+        return _cents_cache[yuan]
+    except KeyError:
+        cents = round(yuan * CENTS_PER_YUAN)
+        if len(_cents_cache) < _CACHE_LIMIT:
+            _cents_cache[yuan] = cents
+        return cents
+
+
+def to_basis_points(rate):
+    """折扣率 → 基點，例如0.8 → 8000"""
+    try:
+        return _basis_points_cache[rate]
+    except KeyError:
+        bp = round(rate * BASIS_POINTS)
+        if len(_basis_points_cache) < _CACHE_LIMIT:
+            _basis_points_cache[rate] = bp
+        return bp
+
+
+def line_total_cents(price_cents, weight, discount_bp=BASIS_POINTS):
+    """單項金額（分）：單價 × 斤數 × 折扣，四捨五入到分"""
+    if discount_bp == BASIS_POINTS:
+        return price_cents * weight
+    amount = price_cents * weight * discount_bp
+    if amount < 0:
+        return -((-amount + BASIS_POINTS // 2) // BASIS_POINTS)
+    return (amount + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def cents_to_yuan(cents):
+    """分 → 元（float，僅供顯示或相容舊介面）"""
+    return cents / CENTS_PER_YUAN
+
+
+def format_yuan(cents):
+    """
+    格式化金額（不經浮點數）
+    整角金額顯示一位小數（與原本的 :.1f 小票格式相同），有分時顯示兩位小數
+    """
+    try:
+        return _yuan_text_cache[cents]
+    except KeyError:
+        sign = '-' if cents < 0 else ''
+        yuan, rest = divmod(abs(cents), CENTS_PER_YUAN)
+        if rest % 10 == 0:
+            text = f"{sign}{yuan}.{rest // 10}"
+        else:
+            text = f"{sign}{yuan}.{rest:02d}"
+        if len(_yuan_text_cache) < _YUAN_TEXT_LIMIT:
+            _yuan_text_cache[cents] = text
+        return text
@@ -0,0 +1,106 @@
+"""
+多行程批量計價
+
+將交易記錄切成固定行數的區塊，交給ProcessPoolExecutor平行解析、驗證、計價
+並格式化為CSV文字，再依原始順序寫出。同時處理中的區塊數有上限（背壓），
+記憶體用量只與區塊大小和行程數有關，與檔案大小無關。
+"""
+import io
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from FruitPriceCalculator import (
+    guess_format, make_system, open_pricing_streams, parse_header,
+    parse_transaction, price_transactions, write_priced,
+)
+
+_worker_system = None
+
+
+def _init_worker(catalog_path=None):
+    """工作行程初始化：每個行程只建立一次ShoppingSystem（指定目錄檔時各自載入）"""
+    global _worker_system
+    _worker_system = make_system(catalog_path)
+
+
+def _price_chunk(fmt, header, first_line_no, raw_lines):
+    """
+    在工作行程中處理一個區塊
+    返回:
+        (結果CSV文字, 拒絕記錄CSV文字, 成功筆數, 拒絕筆數)
+    """
+    rows = (
+        (line_no, parse_transaction(line, fmt, header), line)
+        for line_no, line in ((n, raw.strip()) for n, raw in enumerate(raw_lines, first_line_no))
+        if line
+    )
+    output = io.StringIO()
+    rejects = io.StringIO()
+    accepted, rejected = write_priced(price_transactions(rows, _worker_system),
+                                      output, rejects, header=False)
+    return output.getvalue(), rejects.getvalue(), accepted, rejected
+
+
+def _read_header(source, fmt):
+    """讀取csv標題列，返回(標題欄位, 已讀取的行數)"""
+    if fmt != 'csv':
+        return None, 0
+    line_no = 0
+    for line_no, line in enumerate(source, 1):
+        if line.strip():
+            return parse_header(line), line_no
+    return None, line_no
+
+
+def iter_chunks_parallel(source, fmt, workers=None, chunk_size=10000, max_in_flight=None,
+                         catalog_path=None):
+    """
+    平行處理交易記錄（生成器），依輸入順序產出_price_chunk的結果
+    參數:
+        source: 文字檔案物件
+        workers: 行程數，預設為CPU核心數
+        chunk_size: 每個區塊的行數
+        max_in_flight: 同時處理中的區塊上限，預設為行程數的2倍
+        catalog_path: 可選的商品目錄檔
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    header, line_no = _read_header(source, fmt)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(catalog_path,)) as executor:
+        pending = deque()
+        while True:
+            raw_lines = list(itertools.islice(source, chunk_size))
+            if not raw_lines:
+                break
+            # 背壓：處理中的區塊已達上限時，先等待最早的區塊完成並輸出
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(executor.submit(_price_chunk, fmt, header, line_no + 1, raw_lines))
+            line_no += len(raw_lines)
+        while pending:
+            yield pending.popleft().result()
+
+
+def price_file_parallel(input_path, output_path='-', reject_path=None, fmt=None,
+                        workers=None, chunk_size=10000, max_in_flight=None, catalog_path=None):
+    """
+    多行程版本的file_mode，輸出內容與file_mode完全相同
+    返回:
+        (成功筆數, 拒絕筆數)
+    """
+    if fmt is None:
+        fmt = guess_format(input_path)
+
+    with open_pricing_streams(input_path, output_path, reject_path) as (source, output, rejects):
+        write_priced((), output, rejects)  # 只寫標題列
+        accepted = rejected = 0
+        for result_text, reject_text, chunk_accepted, chunk_rejected in \
+                iter_chunks_parallel(source, fmt, workers, chunk_size, max_in_flight, catalog_path):
+            output.write(result_text)
+            rejects.write(reject_text)
+            accepted += chunk_accepted
+            rejected += chunk_rejected
+    return accepted, rejected
@@ -0,0 +1,829 @@
+"""
+計價核心：水果、購物系統與斤數檢查
+
+不依賴任何GUI套件，批量計價的行程、計價服務與GUI都從這裡匯入。
+numpy只在第一次批量計價時才載入，匯入本模組不會觸發；
+是否安裝numpy（HAS_NUMPY）也在第一次讀取時才檢查。
+threading與functools在建立ShoppingSystem時才載入，不計入匯入時間。
+"""
+from money import (
+    BASIS_POINTS, CENTS_PER_YUAN, cents_to_yuan,
+    line_total_cents, to_basis_points, to_cents,
+)
+from catalog import DEFAULT_ITEMS, Catalog
+from promotions import (
+    PROMOTIONS, basket_rates, compile_price_cents, compile_pricer, compile_promotions, counter_cells,
+)
+from quote_cache import QuoteCache
+from quotes import QuoteResult
+
+# 批量計算為可選功能：numpy是否已安裝在第一次讀取HAS_NUMPY時才檢查，實際匯入延到第一次使用
+_has_numpy = None
+_np = None
+
+def _numpy_available():
+    """檢查numpy是否已安裝（結果保存，只查一次）"""
+    global _has_numpy
+    if _has_numpy is None:
+        import importlib.util
+        _has_numpy = importlib.util.find_spec('numpy') is not None
+    return _has_numpy
+
+def __getattr__(name):
+    # HAS_NUMPY延到第一次讀取時才計算（模組層級__getattr__）
+    if name == 'HAS_NUMPY':
+        return _numpy_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _numpy():
+    """載入numpy（只在第一次批量計價時匯入）"""
+    global _np
+    if _np is None:
+        if not _numpy_available():
+            raise ImportError("批量計算需要安裝numpy")
+        import numpy
+        _np = numpy
+    return _np
+
+# calculate_price等舊介面固定的三種水果（依參數順序）
+BASKET_SKUS = ('apple', 'strawberry', 'mango')
+# 批量計價的筆數低於此值時改為逐筆計價（numpy每次呼叫的固定開銷約70微秒，約四百筆時兩者相當）
+SCALAR_BATCH_ROWS = 384
+# 有calculate_customer_a~d捷徑方法的方案代碼
+CUSTOMER_SHORTCUTS = ('A', 'B', 'C', 'D')
+
+def _missing_scheme(code):
+    """方案表沒有此代碼時calculate_customer_<代碼>使用的計價函數"""
+    def price(*weights):
+        raise ValueError(f"無效的顧客方案: {code!r}")
+    return price
+
+class Fruit:
+    __slots__ = ('name', '_price', 'price_cents', 'on_price_change')
+    
+    def __init__(self, name, price):
+        self.name = name
+        self.on_price_change = None  # 價格變動回呼，由ShoppingSystem設定
+        self.price = price
+    
+    @property
+    def price(self):
+        return self._price
+    
+    @price.setter
+    def price(self, price):
+        self._price = price
+        self.price_cents = to_cents(price)
+        if self.on_price_change is not None:
+            self.on_price_change(self)
+    
+    def calculate_price(self, weight, discount=1.0):
+        """計算該水果的總價（元）"""
+        return cents_to_yuan(self.calculate_price_cents(weight, to_basis_points(discount)))
+    
+    def calculate_price_cents(self, weight, discount_bp=BASIS_POINTS):
+        """計算該水果的總價（分），四捨五入到分"""
+        return line_total_cents(self.price_cents, weight, discount_bp)
+
+def _merge_lines(lines):
+    """
+    合併同一商品的多行明細（折扣按商品總斤數捨入，與calculate_price一致）
+    只有一行的商品不需合併，成本與明細行數成正比
+    """
+    merged = {}
+    for index, weight in lines:
+        merged[index] = merged.get(index, 0) + weight
+    return merged.items()
+
+class ShoppingSystem:
+    def __init__(self, promotions=PROMOTIONS, cache_size=None, catalog=None):
+        # 水果物件由商品目錄產生，價格變動時以新版本的目錄快照替換（見catalog.Catalog）
+        # 計價一律從同一個目錄快照讀取單價，水果物件只供顯示與舊介面使用
+        import threading  # 延到建立系統時才載入，不計入匯入時間
+        self.catalog = catalog if catalog is not None else Catalog()
+        self._price_lock = threading.Lock()
+        self.quote_cache = None
+        self.fruits = {}
+        self._sync_fruits()
+        self._basket_index = tuple(self.catalog.index_of(sku) for sku in BASKET_SKUS)
+        self._basket_state = (None, None)
+        # 通用計價（分）編譯成函數，省去方法呼叫與換算函數的呼叫（見promotions.compile_price_cents）
+        self.calculate_price_cents = compile_price_cents(self.catalog, BASKET_SKUS)
+        self.calculate_price_cents.__doc__ = ShoppingSystem.calculate_price_cents.__doc__
+        # 促銷方案在此編譯一次，之後計價直接呼叫專用函數
+        self.promotions = compile_promotions(self.fruits, promotions, BASKET_SKUS, self.catalog)
+        self._basket_rules = {code: self._compile_basket_rule(promotion)
+                              for code, promotion in self.promotions.items()}
+        self.pricers = {code: promotion.price_cents for code, promotion in self.promotions.items()}
+        # calculate_customer_a~d的捷徑只綁定存在的方案；自訂方案表沒有的代碼呼叫時報錯
+        for code in CUSTOMER_SHORTCUTS:
+            pricer = self.pricers.get(code)
+            setattr(self, f"_price_{code.lower()}", pricer if pricer is not None else _missing_scheme(code))
+        
+        self.metrics = None
+        self._uninstrumented = None
+        if cache_size:
+            self.enable_quote_cache(cache_size)
+    
+    @property
+    def catalog_version(self):
+        """價目版本：任何單價變動都會遞增，用於報價快取失效"""
+        return self.catalog.snapshot.version
+    
+    def _on_price_change(self, index, fruit):
+        """水果價格變動：以新的目錄快照替換並清空報價快取"""
+        with self._price_lock:
+            self.catalog.set_price(index, fruit.price)
+            self._sync_fruits()
+    
+    def _sync_fruits(self):
+        """依目前的目錄快照更新水果物件（新增的商品建立新的水果物件），並清空報價快取"""
+        import functools
+        snapshot = self.catalog.snapshot
+        fruits = self.fruits
+        for index, (sku, name, price) in enumerate(snapshot.items()):
+            fruit = fruits.get(sku)
+            if fruit is None:
+                fruit = fruits[sku] = Fruit(name, price)
+                fruit.on_price_change = functools.partial(self._on_price_change, index)
+            else:
+                if fruit.price != price:
+                    fruit._price = price  # 直接寫入，不再觸發價格變動回呼
+                    fruit.price_cents = snapshot.price_cents[index]
+                if fruit.name != name:
+                    fruit.name = name
+        if self.quote_cache is not None:
+            self.quote_cache.clear()
+    
+    def _unit_prices(self):
+        """
+        目前的目錄快照與報價用的單價：(快照, ((名稱, 單價, 單價(分)), ...))，依BASKET_SKUS順序
+        同一版本只建立一次
+        """
+        snapshot = self.catalog.snapshot
+        state = self._basket_state
+        if state[0] is not snapshot:
+            state = self._basket_state = (snapshot, tuple(
+                (snapshot.names[index], snapshot.prices[index], snapshot.price_cents[index])
+                for index in self._basket_index))
+        return state
+    
+    def set_price(self, sku, price):
+        """修改商品單價"""
+        self.fruits[sku].price = price
+    
+    def set_prices(self, prices):
+        """
+        一次修改多項單價（{代碼: 單價}），全部生效於同一個價目版本，返回新的版本號
+        正在計價的其他執行緒不受影響：它們使用的是開始計價時取得的目錄快照
+        """
+        index_of = self.catalog.index_of
+        changes = {index_of(sku): price for sku, price in prices.items()}
+        with self._price_lock:
+            snapshot = self.catalog.set_prices(changes)
+            self._sync_fruits()
+        return snapshot.version
+    
+    def update_catalog(self, items):
+        """
+        以新的商品清單（(代碼, 名稱, 單價)序列，例如從目錄檔載入）替換目錄，一次生效，
+        返回新的版本號；既有商品不可移除（見catalog.CatalogSnapshot.with_items）
+        """
+        with self._price_lock:
+            snapshot = self.catalog.replace_items(items)
+            self._sync_fruits()
+        return snapshot.version
+    
+    def _compile_basket_rule(self, promotion):
+        """
+        將促銷方案轉為以索引表示的規則：
+        (可購買索引, {索引: 折扣基點}, 門檻(分), 滿減(分), 分級滿減或None)
+        """
+        index_of = self.catalog.index_of
+        allowed = frozenset(index_of(sku) for sku in promotion.skus)
+        discounts = {index_of(sku): to_basis_points(rate) for sku, rate in promotion.discounts.items()
+                     if to_basis_points(rate) != BASIS_POINTS}
+        return (allowed, discounts, to_cents(promotion.discount_threshold),
+                to_cents(promotion.discount_amount), promotion.discount_tiers)
+    
+    def price_basket_cents(self, lines, discounts=None, discount_threshold=0, discount_amount=0):
+        """
+        通用購物籃計價，返回總價（分）
+        參數:
+            lines: (商品索引, 斤數)的序列，同一商品可出現多次
+            discounts: {商品索引: 折扣率}，預設無折扣
+            discount_threshold: 滿減門檻（元）
+            discount_amount: 滿減金額（元）
+        計價成本只與明細行數有關，與目錄大小無關
+        """
+        prices = self.catalog.price_cents
+        total = 0
+        if discounts:
+            basis_points = {index: to_basis_points(rate) for index, rate in discounts.items()}
+            for index, weight in _merge_lines(lines):
+                total += line_total_cents(prices[index], weight, basis_points.get(index, BASIS_POINTS))
+        else:
+            for index, weight in lines:
+                total += prices[index] * weight
+        
+        # 應用滿減
+        if discount_threshold > 0 and total >= to_cents(discount_threshold):
+            total -= to_cents(discount_amount)
+        return total
+    
+    def price_basket(self, lines, discounts=None, discount_threshold=0, discount_amount=0):
+        """通用購物籃計價，返回總價（元），參數同price_basket_cents"""
+        return cents_to_yuan(self.price_basket_cents(lines, discounts, discount_threshold, discount_amount))
+    
+    def price_sparse_basket(self, indexes, weights, discounts=None, discount_threshold=0, discount_amount=0):
+        """以稀疏向量（商品索引陣列, 斤數陣列）表示的購物籃計價，返回總價（元）"""
+        return self.price_basket(zip(indexes, weights), discounts, discount_threshold, discount_amount)
+    
+    def price_basket_scheme_cents(self, code, lines):
+        """
+        依促銷方案計價通用購物籃，返回總價（分）
+        不適用於此方案的商品拋出ValueError
+        """
+        allowed, basis_points, threshold_cents, amount_cents, tiers = self._basket_rules[code]
+        prices = self.catalog.price_cents
+        total = 0
+        for index, weight in _merge_lines(lines):
+            if index not in allowed:
+                raise ValueError(f"顧客{code}方案不支持購買{self.catalog.names[index]}")
+            total += line_total_cents(prices[index], weight, basis_points.get(index, BASIS_POINTS))
+        if threshold_cents > 0 and total >= threshold_cents:
+            total -= amount_cents
+        elif tiers is not None:
+            total -= tiers.discount_cents(total)
+        return total
+    
+    def enable_quote_cache(self, maxsize=1024):
+        """
+        在calculate_price與get_quote（get_detailed_calculation）前加上LRU報價快取
+        快取鍵為(斤數, 促銷參數, 價目版本)；未啟用時計價路徑沒有任何額外開銷
+        已啟用指標時先停用，掛上快取後再以同一個Metrics重新啟用（與啟用順序無關，見enable_metrics）
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            self.disable_metrics()
+        cache = self.quote_cache = QuoteCache(maxsize)
+        self.calculate_price_cents = self._cached('price', ShoppingSystem.calculate_price_cents.__get__(self))
+        self.get_quote = self._cached('quote', ShoppingSystem.get_quote.__get__(self))
+        if metrics is not None:
+            self.enable_metrics(metrics)
+        return cache
+    
+    def _cached(self, kind, compute):
+        """以報價快取包裝compute（calculate_price_cents或get_quote），kind區分兩者的快取鍵"""
+        cache = self.quote_cache
+        
+        def cached(apple_weight=0, strawberry_weight=0, mango_weight=0,
+                   strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                   discount_tiers=None, discounts=None):
+            key = (kind, apple_weight, strawberry_weight, mango_weight, strawberry_discount,
+                   discount_threshold, discount_amount, discount_tiers,
+                   tuple(sorted(discounts.items())) if discounts else None, self.catalog_version)
+            return cache.get_or_compute(key, lambda: compute(
+                apple_weight, strawberry_weight, mango_weight,
+                strawberry_discount, discount_threshold, discount_amount, discount_tiers, discounts))
+        
+        cached.__doc__ = getattr(ShoppingSystem, 'calculate_price_cents' if kind == 'price' else 'get_quote').__doc__
+        return cached
+    
+    # enable_metrics會替換的實例屬性
+    _INSTRUMENTED = ('calculate_price', 'calculate_price_cents', 'get_detailed_calculation', 'print_quote',
+                     'pricers', '_price_a', '_price_b', '_price_c', '_price_d',
+                     'calculate_customer_a', 'calculate_customer_b', 'calculate_customer_c',
+                     'calculate_customer_d')
+    
+    def enable_metrics(self, metrics=None, sample_every=64):
+        """
+        啟用指標：各方案計價次數、滿減觸發次數，以及calculate_price、
+        get_detailed_calculation與小票輸出的延遲直方圖（每sample_every次抽樣一次）
+        計價函數的計數與抽樣直接編譯進重新生成的函數，不另外包一層呼叫
+        已啟用報價快取時保留快取：延遲量測包含快取查詢，calculate_price的計價次數只計未命中
+        （實際計價）的次數，命中次數見quote_cache.stats()
+        返回Metrics，可用to_prometheus()或to_json()匯出
+        """
+        if self.metrics is not None:
+            self.disable_metrics()
+        from time import perf_counter
+        from metrics import Metrics  # 指標為可選功能，啟用時才載入
+        
+        metrics = metrics if metrics is not None else Metrics(sample_every)
+        sample_every = metrics.sample_every
+        # 記錄替換前的值；不讀取self.__dict__：讀取後實例改以字典保存屬性，
+        # 3.11的屬性存取特化會在兩種實例之間反覆失效，連未啟用指標的系統也變慢
+        self._uninstrumented = {name: getattr(self, name) for name in self._INSTRUMENTED}
+        
+        # 各方案：重新編譯帶計數器的計價函數；calculate_customer_a~d直接換成返回元的版本，
+        # 省下一層方法呼叫。計數器是編譯後函數的閉包變數，以bind登錄為該方案的指標
+        def bind(func, scheme):
+            cells = counter_cells(func)
+            metrics.bind_counter('fruit_quotes_total', cells['calls'], scheme=scheme)
+            metrics.bind_counter('fruit_threshold_hits_total', cells['hits'], scheme=scheme)
+            return func
+        
+        pricers = {}
+        for code, promotion in self.promotions.items():
+            pricers[code] = bind(compile_pricer(promotion, self.fruits, BASKET_SKUS, counted=True,
+                                                catalog=self.catalog), code)
+            if code in CUSTOMER_SHORTCUTS:
+                setattr(self, f"_price_{code.lower()}", pricers[code])
+                setattr(self, f"calculate_customer_{code.lower()}",
+                        bind(compile_pricer(promotion, self.fruits, BASKET_SKUS, counted=True,
+                                            catalog=self.catalog, yuan=True), code))
+        self.pricers = pricers
+        
+        price_histogram = metrics.histogram('fruit_latency_seconds', op='calculate_price')
+        if self.quote_cache is not None:
+            # 已啟用報價快取：未命中時呼叫帶計數的編譯版本，延遲在快取外抽樣；
+            # calculate_price仍是類別上的方法，經由calculate_price_cents計入同一組指標
+            cached = self._cached('price', bind(compile_price_cents(self.catalog, BASKET_SKUS, counted=True),
+                                                'custom'))
+            price_tick = 0
+            
+            def calculate_price_cents(apple_weight=0, strawberry_weight=0, mango_weight=0,
+                                      strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                                      discount_tiers=None, discounts=None):
+                nonlocal price_tick
+                price_tick += 1
+                if price_tick < sample_every:
+                    return cached(apple_weight, strawberry_weight, mango_weight, strawberry_discount,
+                                  discount_threshold, discount_amount, discount_tiers, discounts)
+                price_tick = 0
+                start = perf_counter()
+                total = cached(apple_weight, strawberry_weight, mango_weight, strawberry_discount,
+                               discount_threshold, discount_amount, discount_tiers, discounts)
+                price_histogram.observe(perf_counter() - start)
+                return total
+            
+            calculate_price_cents.__doc__ = ShoppingSystem.calculate_price_cents.__doc__
+            self.calculate_price_cents = calculate_price_cents
+        else:
+            # 通用calculate_price：重新編譯帶計數與延遲抽樣的版本（元與分各一個，計入同一組指標），
+            # 不另外包一層函數
+            generic = dict(counted=True, sample_every=sample_every, histogram=price_histogram)
+            self.calculate_price = bind(
+                compile_price_cents(self.catalog, BASKET_SKUS, yuan=True, **generic), 'custom')
+            self.calculate_price.__doc__ = ShoppingSystem.calculate_price.__doc__
+            self.calculate_price_cents = bind(compile_price_cents(self.catalog, BASKET_SKUS, **generic), 'custom')
+            self.calculate_price_cents.__doc__ = ShoppingSystem.calculate_price_cents.__doc__
+        
+        # 明細與小票：與原方法相同的呼叫層數，只多一次抽樣計數
+        get_quote = self.get_quote
+        detail_histogram = metrics.histogram('fruit_latency_seconds', op='get_detailed_calculation')
+        receipt_histogram = metrics.histogram('fruit_latency_seconds', op='receipt')
+        detail_tick = receipt_tick = 0  # 閉包變數比列表元素便宜
+        
+        def get_detailed_calculation(apple_weight, strawberry_weight, mango_weight,
+                                     strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                                     discount_tiers=None, discounts=None):
+            nonlocal detail_tick
+            detail_tick += 1
+            if detail_tick < sample_every:
+                return get_quote(apple_weight, strawberry_weight, mango_weight, strawberry_discount,
+                                 discount_threshold, discount_amount, discount_tiers, discounts).as_dict()
+            detail_tick = 0
+            start = perf_counter()
+            detail = get_quote(apple_weight, strawberry_weight, mango_weight, strawberry_discount,
+                               discount_threshold, discount_amount, discount_tiers, discounts).as_dict()
+            detail_histogram.observe(perf_counter() - start)
+            return detail
+        
+        def print_quote(quote, customer_name=""):
+            nonlocal receipt_tick
+            receipt_tick += 1
+            if receipt_tick < sample_every:
+                print(quote.receipt_text(customer_name))
+                return cents_to_yuan(quote.final_cents)
+            receipt_tick = 0
+            start = perf_counter()
+            print(quote.receipt_text(customer_name))
+            receipt_histogram.observe(perf_counter() - start)
+            return cents_to_yuan(quote.final_cents)
+        
+        get_detailed_calculation.__doc__ = ShoppingSystem.get_detailed_calculation.__doc__
+        print_quote.__doc__ = ShoppingSystem.print_quote.__doc__
+        self.get_detailed_calculation = get_detailed_calculation
+        self.print_quote = print_quote
+        self.metrics = metrics
+        return metrics
+    
+    def disable_metrics(self):
+        """停用指標，恢復未包裝的計價方法"""
+        if self.metrics is None:
+            return
+        cls = type(self)
+        for name, value in self._uninstrumented.items():
+            if getattr(value, '__self__', None) is self and value.__func__ is getattr(cls, name):
+                try:
+                    delattr(self, name)  # 原本是類別上的方法
+                except AttributeError:
+                    pass  # 已啟用報價快取時calculate_price沒有被替換
+            else:
+                setattr(self, name, value)
+        self.metrics = None
+        self._uninstrumented = None
+    
+    def calculate_price(self, apple_weight=0, strawberry_weight=0, mango_weight=0, 
+                       strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                       discount_tiers=None, discounts=None):
+        """
+        通用計算方法，返回總價（元）
+        參數:
+            apple_weight: 蘋果斤數
+            strawberry_weight: 草莓斤數
+            mango_weight: 芒果斤數
+            strawberry_discount: 草莓折扣，默認為1.0（無折扣）
+            discount_threshold: 滿減門檻，默認為0（無滿減）
+            discount_amount: 滿減金額，默認為0（無滿減）
+            discount_tiers: 可選的分級滿減（tiers.ThresholdTiers），指定時取代單一門檻
+            discounts: 可選的各水果折扣{水果代碼: 折扣率}（例如Promotion.discounts），
+                       優先於strawberry_discount，未列出的水果不打折
+        """
+        return cents_to_yuan(self.calculate_price_cents(
+            apple_weight, strawberry_weight, mango_weight,
+            strawberry_discount, discount_threshold, discount_amount, discount_tiers, discounts
+        ))
+    
+    # 實例建立時換成編譯後的同規則版本（見__init__）；報價快取未命中時直接呼叫此方法
+    def calculate_price_cents(self, apple_weight=0, strawberry_weight=0, mango_weight=0, 
+                              strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                              discount_tiers=None, discounts=None):
+        """與calculate_price相同，但以整數（分）返回精確總價"""
+        prices = self.catalog.snapshot.price_cents  # 只取一次快照，全部單價來自同一版本
+        apple, strawberry, mango = self._basket_index
+        if discounts:
+            apple_rate, strawberry_discount, mango_rate = basket_rates(BASKET_SKUS, strawberry_discount, discounts)
+            total = (line_total_cents(prices[apple], apple_weight, to_basis_points(apple_rate))
+                     + line_total_cents(prices[mango], mango_weight, to_basis_points(mango_rate)))
+        else:
+            total = prices[apple] * apple_weight + prices[mango] * mango_weight
+        strawberry_cents = prices[strawberry] * strawberry_weight
+        if strawberry_discount != 1.0:
+            # 草莓折扣：四捨五入到分（與money.line_total_cents相同）
+            strawberry_cents *= to_basis_points(strawberry_discount)
+            if strawberry_cents < 0:
+                strawberry_cents = -((-strawberry_cents + BASIS_POINTS // 2) // BASIS_POINTS)
+            else:
+                strawberry_cents = (strawberry_cents + BASIS_POINTS // 2) // BASIS_POINTS
+        total += strawberry_cents
+        
+        # 應用滿減（分級滿減以二分搜尋查出適用的一檔）
+        if discount_tiers is not None:
+            total -= discount_tiers.discount_cents(total)
+        elif discount_threshold > 0 and total >= to_cents(discount_threshold):
+            total -= to_cents(discount_amount)
+        return total
+    
+    def get_quote(self, apple_weight, strawberry_weight, mango_weight, 
+                  strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                  discount_tiers=None, discounts=None):
+        """
+        一次計價得到完整報價（QuoteResult，金額為整數分）
+        報價帶有明細、小計、滿減與總計，以及計價時使用的價目版本（catalog_version）；
+        小票文字在receipt_text()等被呼叫時才產生
+        分級滿減時報價的discount_threshold與discount_amount為適用的一檔
+        （未達任何一檔時為最低一檔）
+        discounts（各水果折扣）的用法同calculate_price
+        """
+        snapshot, unit_prices = self._unit_prices()
+        if discounts:
+            apple_rate, strawberry_discount, mango_rate = basket_rates(BASKET_SKUS, strawberry_discount, discounts)
+            apple_cents = line_total_cents(unit_prices[0][2], apple_weight, to_basis_points(apple_rate))
+            mango_cents = line_total_cents(unit_prices[2][2], mango_weight, to_basis_points(mango_rate))
+        else:
+            apple_rate = mango_rate = 1.0
+            apple_cents = unit_prices[0][2] * apple_weight
+            mango_cents = unit_prices[2][2] * mango_weight
+        strawberry_cents = unit_prices[1][2] * strawberry_weight
+        if strawberry_discount != 1.0:
+            # 草莓折扣：四捨五入到分（與money.line_total_cents相同）
+            strawberry_cents *= to_basis_points(strawberry_discount)
+            if strawberry_cents < 0:
+                strawberry_cents = -((-strawberry_cents + BASIS_POINTS // 2) // BASIS_POINTS)
+            else:
+                strawberry_cents = (strawberry_cents + BASIS_POINTS // 2) // BASIS_POINTS
+        
+        subtotal_cents = apple_cents + strawberry_cents + mango_cents
+        final_cents = subtotal_cents
+        
+        # 應用滿減
+        if discount_tiers is not None:
+            tier = discount_tiers.index_for(subtotal_cents)
+            discount_applied = tier >= 0
+            tier = max(tier, 0)
+            discount_threshold = discount_tiers.thresholds[tier]
+            discount_amount = discount_tiers.amounts[tier]
+        else:
+            discount_applied = discount_threshold > 0 and subtotal_cents >= to_cents(discount_threshold)
+        if discount_applied:
+            final_cents -= to_cents(discount_amount)
+        
+        return QuoteResult(
+            apple_weight, strawberry_weight, mango_weight,
+            apple_cents, strawberry_cents, mango_cents, subtotal_cents, final_cents,
+            discount_applied, strawberry_discount, discount_threshold, discount_amount,
+            unit_prices, snapshot.version, discount_tiers, apple_rate, mango_rate
+        )
+    
+    def quote_scheme(self, code, apple_weight=0, strawberry_weight=0, mango_weight=0):
+        """依方案代碼報價，方案不販售的水果以0斤計"""
+        promotion = self.promotions[code]
+        return self.get_quote(
+            apple_weight if promotion.sells('apple') else 0,
+            strawberry_weight if promotion.sells('strawberry') else 0,
+            mango_weight if promotion.sells('mango') else 0,
+            promotion.discount_for('strawberry'),
+            promotion.discount_threshold,
+            promotion.discount_amount,
+            promotion.discount_tiers,
+            promotion.discounts
+        )
+    
+    def get_detailed_calculation(self, apple_weight, strawberry_weight, mango_weight, 
+                                strawberry_discount=1.0, discount_threshold=0, discount_amount=0,
+                                discount_tiers=None, discounts=None):
+        """獲取詳細的計算明細（字典）"""
+        return self.get_quote(
+            apple_weight, strawberry_weight, mango_weight,
+            strawberry_discount, discount_threshold, discount_amount, discount_tiers, discounts
+        ).as_dict()
+    
+    def calculate_prices_batch(self, apple_weights, strawberry_weights, mango_weights, schemes):
+        """
+        批量計算多筆購物的總價（numpy向量化）
+        參數:
+            apple_weights: 各筆蘋果斤數
+            strawberry_weights: 各筆草莓斤數
+            mango_weights: 各筆芒果斤數
+            schemes: 各筆顧客方案代碼（見promotions.PROMOTIONS）
+        返回:
+            各筆總價的float64陣列，逐筆與calculate_customer_a~d的結果一致
+        """
+        return self.calculate_prices_batch_cents(
+            apple_weights, strawberry_weights, mango_weights, schemes
+        ) / CENTS_PER_YUAN
+    
+    def calculate_prices_batch_cents(self, apple_weights, strawberry_weights, mango_weights, schemes):
+        """
+        與calculate_prices_batch相同，但以int64（分）返回精確總價
+        少於SCALAR_BATCH_ROWS筆時逐筆呼叫編譯後的計價函數，結果相同
+        """
+        np = _numpy()
+        
+        if len(schemes) < SCALAR_BATCH_ROWS:
+            # 筆數少時numpy的固定開銷高於逐筆呼叫編譯後的計價函數
+            pricers = self.pricers
+            try:
+                totals = [pricers[code](apple, strawberry, mango) for apple, strawberry, mango, code
+                          in zip(apple_weights, strawberry_weights, mango_weights, schemes)]
+            except KeyError as exc:
+                raise ValueError(f"無效的顧客方案: {exc.args[0]!r}") from None
+            return np.array(totals, dtype=np.int64)
+        
+        if isinstance(schemes, np.ndarray) and schemes.dtype.kind == 'U':
+            # 字串陣列：在排序好的代碼表中一次二分查出整欄的方案編號，不需轉型或複製
+            scheme_table = np.array(sorted(self.promotions))
+            idx = np.searchsorted(scheme_table, schemes).clip(0, len(scheme_table) - 1)
+            invalid = scheme_table[idx] != schemes
+            if invalid.any():
+                raise ValueError(f"無效的顧客方案: {str(schemes[invalid][0])!r}")
+        else:
+            # 其他序列：每筆代碼以字典換成小整數，不經過numpy字串陣列
+            scheme_table = tuple(self.promotions)
+            numbers = {code: number for number, code in enumerate(scheme_table)}
+            if isinstance(schemes, np.ndarray):
+                schemes = schemes.tolist()
+            try:
+                idx = np.array([numbers[code] for code in schemes], dtype=np.intp)
+            except (KeyError, TypeError) as exc:
+                raise ValueError(f"無效的顧客方案: {exc.args[0]!r}") from None
+        
+        return self.price_columns_cents(scheme_table, idx, apple_weights, strawberry_weights, mango_weights)
+    
+    def price_columns_cents(self, scheme_table, scheme_index, apple_weights, strawberry_weights, mango_weights):
+        """
+        以方案索引批量計價，返回int64（分）的總價陣列
+        參數:
+            scheme_table: 方案代碼序列
+            scheme_index: 各筆方案在scheme_table中的位置（整數陣列）
+            apple_weights, strawberry_weights, mango_weights: 各筆斤數，可為任何整數dtype
+        輸入陣列（例如記憶體映射檔的視圖）直接參與運算，不會先複製或轉型
+        """
+        np = _numpy()
+        
+        try:
+            promotions = [self.promotions[str(code)] for code in scheme_table]
+        except KeyError as exc:
+            raise ValueError(f"無效的顧客方案: {exc.args[0]!r}") from None
+        idx = np.asarray(scheme_index)
+        weights = {
+            'apple': apple_weights,
+            'strawberry': strawberry_weights,
+            'mango': mango_weights,
+        }
+        
+        # 計算總價（分），捨入規則與money.line_total_cents相同；單價取自同一個目錄快照
+        prices = self.catalog.snapshot.price_cents
+        total = np.zeros(len(idx), dtype=np.int64)
+        for sku, index in zip(BASKET_SKUS, self._basket_index):
+            weight = np.asarray(weights[sku])
+            sells = np.array([p.sells(sku) for p in promotions])[idx]
+            line_bp = prices[index] * np.array(
+                [to_basis_points(p.discount_for(sku)) for p in promotions], dtype=np.int64)[idx]
+            line = np.where(sells, weight, 0) * line_bp  # 單價(分)×折扣基點為int64，乘積不會溢位
+            total += np.sign(line) * ((np.abs(line) + BASIS_POINTS // 2) // BASIS_POINTS)
+        
+        # 應用滿減
+        threshold_cents = np.array([to_cents(p.discount_threshold) for p in promotions], dtype=np.int64)[idx]
+        amount_cents = np.array([to_cents(p.discount_amount) for p in promotions], dtype=np.int64)[idx]
+        hit = (threshold_cents > 0) & (total >= threshold_cents)
+        np.subtract(total, amount_cents, out=total, where=hit)
+        
+        # 分級滿減：各方案的列以searchsorted一次查出適用的一檔
+        for number, promotion in enumerate(promotions):
+            if promotion.discount_tiers is not None:
+                rows = np.flatnonzero(idx == number)
+                total[rows] -= promotion.discount_tiers.discounts_cents(total[rows])
+        return total
+    
+    def calculate_customer_a(self, apple_weight, strawberry_weight):
+        """顧客A：只買蘋果和草莓，無促銷"""
+        return cents_to_yuan(self._price_a(apple_weight, strawberry_weight))
+    
+    def calculate_customer_b(self, apple_weight, strawberry_weight, mango_weight):
+        """顧客B：買三種水果，無促銷"""
+        return cents_to_yuan(self._price_b(apple_weight, strawberry_weight, mango_weight))
+    
+    def calculate_customer_c(self, apple_weight, strawberry_weight, mango_weight):
+        """顧客C：買三種水果，草莓8折"""
+        return cents_to_yuan(self._price_c(apple_weight, strawberry_weight, mango_weight))
+    
+    def calculate_customer_d(self, apple_weight, strawberry_weight, mango_weight):
+        """顧客D：買三種水果，草莓8折，滿100減10"""
+        return cents_to_yuan(self._price_d(apple_weight, strawberry_weight, mango_weight))
+    
+    def calculate_scheme(self, code, apple_weight=0, strawberry_weight=0, mango_weight=0):
+        """依方案代碼計價，返回總價（元）"""
+        return cents_to_yuan(self.pricers[code](apple_weight, strawberry_weight, mango_weight))
+    
+    def print_scheme_receipt(self, code, apple_weight, strawberry_weight, mango_weight):
+        """依方案代碼打印購物小票"""
+        quote = self.quote_scheme(code, apple_weight, strawberry_weight, mango_weight)
+        return self.print_quote(quote, customer_name=code)
+    
+    def print_receipt(self, apple_weight, strawberry_weight, mango_weight, 
+                     strawberry_discount=1.0, discount_threshold=0, discount_amount=0, customer_name="",
+                     discount_tiers=None, discounts=None):
+        """打印購物小票，返回總價（元）；分級滿減時小票列出適用的一檔與距離下一檔的金額"""
+        quote = self.get_quote(apple_weight, strawberry_weight, mango_weight,
+                               strawberry_discount, discount_threshold, discount_amount, discount_tiers,
+                               discounts)
+        return self.print_quote(quote, customer_name)
+    
+    def print_quote(self, quote, customer_name=""):
+        """打印已計價報價的購物小票，返回總價（元）"""
+        print(quote.receipt_text(customer_name))
+        return cents_to_yuan(quote.final_cents)
+
+# 未指定方案表時斤數檢查使用的內建方案（promotions.PROMOTIONS）
+_PROMOTION_SKUS = {promotion['code']: promotion['skus'] for promotion in PROMOTIONS}
+_FRUIT_NAMES = {sku: name for sku, name, _ in DEFAULT_ITEMS}
+
+# 斤數檢查的原因代碼：check_reason（逐筆）與validate_columns（整欄）共用同一套規則與代碼
+REASON_VALID = 0
+REASON_INVALID_SCHEME = 1
+REASON_NOT_INTEGER = 2
+REASON_ALL_ZERO = 3
+REASON_APPLE_NOT_SOLD = 4
+REASON_STRAWBERRY_NOT_SOLD = 5
+REASON_MANGO_NOT_SOLD = 6
+REASON_NEGATIVE_WEIGHT = 7
+REASON_OUT_OF_RANGE = 8
+REASON_NAMES = (
+    'valid', 'invalid_scheme', 'not_integer', 'all_zero', 'apple_not_sold',
+    'strawberry_not_sold', 'mango_not_sold', 'negative_weight', 'out_of_range',
+)
+_NOT_SOLD = dict(zip(BASKET_SKUS, (REASON_APPLE_NOT_SOLD, REASON_STRAWBERRY_NOT_SOLD,
+                                   REASON_MANGO_NOT_SOLD)))
+_NOT_SOLD_SKUS = {reason: sku for sku, reason in _NOT_SOLD.items()}
+
+def reason_message(reason, customer_type=None):
+    """原因代碼 → 錯誤訊息（與check_weights的訊息相同）"""
+    if reason in _NOT_SOLD_SKUS:
+        return f"顧客{customer_type}方案不支持購買{_FRUIT_NAMES[_NOT_SOLD_SKUS[reason]]}"
+    if reason == REASON_ALL_ZERO:
+        return "所有水果斤數不能都為零，請至少購買一種水果"
+    if reason == REASON_NEGATIVE_WEIGHT:
+        return "水果斤數不能為負數"
+    if reason == REASON_INVALID_SCHEME:
+        return f"無效的顧客方案: {customer_type!r}"
+    if reason == REASON_NOT_INTEGER:
+        return "斤數必須為整數"
+    if reason == REASON_OUT_OF_RANGE:
+        return "斤數超出範圍"
+    return None
+
+def _scheme_skus(promotions):
+    """方案代碼 → 可購買的水果；promotions為None時使用內建方案"""
+    if promotions is None:
+        return _PROMOTION_SKUS
+    return {code: promotion.skus for code, promotion in promotions.items()}
+
+def check_reason(apple_weight, strawberry_weight, mango_weight, customer_type, promotions=None,
+                 weight_limit=None):
+    """
+    檢查水果斤數，返回原因代碼（REASON_*）；通過檢查時返回REASON_VALID
+    依序檢查：全為零、方案不販售的水果（例如顧客A不支持芒果）、負數、超出weight_limit；
+    未知的方案代碼不檢查販售限制
+    promotions: 方案表（方案代碼 → Promotion，例如ShoppingSystem.promotions），預設為內建方案
+    weight_limit: 可選的斤數上限（與validate_columns相同）
+    """
+    # 檢查是否全為零
+    if apple_weight == 0 and strawberry_weight == 0 and mango_weight == 0:
+        return REASON_ALL_ZERO
+    
+    # 檢查方案是否支持所購買的水果
+    if promotions is None:
+        skus = _PROMOTION_SKUS.get(customer_type)
+    else:
+        promotion = promotions.get(customer_type)
+        skus = promotion.skus if promotion is not None else None
+    if skus is not None:
+        for sku, weight in zip(BASKET_SKUS, (apple_weight, strawberry_weight, mango_weight)):
+            if weight > 0 and sku not in skus:
+                return _NOT_SOLD[sku]
+    
+    # 檢查是否為負數（在get_user_input中已經檢查，這裡再次確認）
+    if apple_weight < 0 or strawberry_weight < 0 or mango_weight < 0:
+        return REASON_NEGATIVE_WEIGHT
+    
+    if weight_limit is not None and (apple_weight > weight_limit or strawberry_weight > weight_limit
+                                     or mango_weight > weight_limit):
+        return REASON_OUT_OF_RANGE
+    
+    return REASON_VALID
+
+def check_weights(apple_weight, strawberry_weight, mango_weight, customer_type, promotions=None,
+                  weight_limit=None):
+    """檢查水果斤數，返回錯誤訊息；通過檢查時返回None（promotions與weight_limit見check_reason）"""
+    reason = check_reason(apple_weight, strawberry_weight, mango_weight, customer_type, promotions,
+                          weight_limit)
+    return reason_message(reason, customer_type) if reason else None
+
+def validate_columns(scheme_table, scheme_index, apple_weights, strawberry_weights, mango_weights,
+                     weight_limit=None, promotions=None):
+    """
+    整欄檢查多筆購物（numpy向量化），規則與優先順序與check_reason相同
+    參數:
+        scheme_table: 方案代碼序列
+        scheme_index: 各筆方案在scheme_table中的位置（整數陣列），超出範圍或代碼未知時為無效方案
+        apple_weights, strawberry_weights, mango_weights: 各筆斤數（整數陣列）
+        weight_limit: 可選的斤數上限，其他檢查都通過但超出上限時為REASON_OUT_OF_RANGE
+        promotions: 方案表（方案代碼 → Promotion，例如ShoppingSystem.promotions），預設為內建方案
+    返回:
+        (通過檢查的布林遮罩, 各筆原因代碼的uint8陣列)
+    """
+    np = _numpy()
+    
+    codes = [str(code) for code in scheme_table]
+    scheme_skus = _scheme_skus(promotions)
+    idx = np.asarray(scheme_index)
+    # 方案屬性表多一列，供超出範圍的索引使用
+    known = np.array([code in scheme_skus for code in codes] + [False])
+    check_schemes = not known[:-1].all()
+    if idx.size and (idx.min() < 0 or idx.max() >= len(codes)):
+        idx = np.where((idx >= 0) & (idx < len(codes)), idx, len(codes))
+        check_schemes = True
+    weights = [np.asarray(w) for w in (apple_weights, strawberry_weights, mango_weights)]
+    reasons = np.zeros(len(idx), dtype=np.uint8)
+    
+    # 由優先順序最低的規則開始寫入，較優先的規則覆蓋其後
+    if weight_limit is not None:
+        over = (weights[0] > weight_limit) | (weights[1] > weight_limit) | (weights[2] > weight_limit)
+        np.putmask(reasons, over, REASON_OUT_OF_RANGE)
+    np.putmask(reasons, (weights[0] < 0) | (weights[1] < 0) | (weights[2] < 0), REASON_NEGATIVE_WEIGHT)
+    for sku, weight in reversed(list(zip(BASKET_SKUS, weights))):
+        not_sold = np.array([code in scheme_skus and sku not in scheme_skus[code]
+                             for code in codes] + [False])
+        if not_sold.any():
+            np.putmask(reasons, (weight > 0) & not_sold[idx], _NOT_SOLD[sku])
+    np.putmask(reasons, (weights[0] == 0) & (weights[1] == 0) & (weights[2] == 0), REASON_ALL_ZERO)
+    if check_schemes:
+        np.putmask(reasons, ~known[idx], REASON_INVALID_SCHEME)
+    return reasons == REASON_VALID, reasons
+
+def parse_weight(value):
+    """解析斤數欄位，只接受整數"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, bool):
+        raise ValueError(f"斤數必須為整數: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError(f"斤數必須為整數: {value!r}")
+
@@ -0,0 +1,271 @@
+"""
+asyncio計價服務
+
+以TCP行協定（每行一個JSON）提供報價：
+    請求: {"id": 1, "scheme": "D", "apple": 5, "strawberry": 5, "mango": 5}
+    回應: {"id": 1, "total": 182.0}
+          {"id": 1, "error": "..."}        驗證失敗
+          {"id": 1, "error": "overloaded"} 佇列已滿，請求被拒絕（負載卸除）
+
+同一時間窗口內的並行請求會合併為一個微批次，以一次呼叫完成計價；
+批次少於pricing_core.SCALAR_BATCH_ROWS筆時逐筆計價（比numpy的固定開銷便宜）。
+斤數超過WEIGHT_LIMIT的請求以「斤數超出範圍」拒絕。
+
+用法:
+    python pricing_server.py [--host 127.0.0.1] [--port 8765] [--catalog catalog.json]
+                             [--max-queue 4096] [--max-batch 1024] [--max-delay 0.0002]
+
+指定商品目錄檔（或環境變數FRUIT_CATALOG）時，背景執行緒定期檢查檔案，修改後自動換用新價目。
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+
+from pricing_core import (
+    HAS_NUMPY, REASON_INVALID_SCHEME, REASON_NOT_INTEGER, SCALAR_BATCH_ROWS, ShoppingSystem,
+    check_weights, parse_weight, reason_message,
+)
+from money import cents_to_yuan
+
+OVERLOADED = "overloaded"
+# 斤數上限（與columnar.WEIGHT_LIMIT相同），批量計價的int64金額不會溢位
+WEIGHT_LIMIT = 2 ** 31 - 1
+
+
+class Overloaded(Exception):
+    """請求佇列已滿"""
+
+
+class PricingService:
+    """
+    將並行的報價請求合併為微批次計價
+    參數:
+        system: ShoppingSystem
+        max_batch: 每批次最多請求數；須不小於SCALAR_BATCH_ROWS批次才會改用numpy計價
+        max_delay: 批次未滿時最多等待的秒數
+        max_queue: 等待中請求的上限，超過時直接拒絕
+    """
+    def __init__(self, system=None, max_batch=1024, max_delay=0.0002, max_queue=4096):
+        self.system = system or ShoppingSystem()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = asyncio.Queue(max_queue)
+        self._task = None
+        self.requests = 0
+        self.batches = 0
+        self.shed = 0
+
+    def start(self):
+        """啟動批次處理任務"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止批次處理任務"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def submit(self, request):
+        """
+        提交一個報價請求
+        返回:
+            Future，結果為總價（元）；驗證失敗時為ValueError
+        佇列已滿時拋出Overloaded
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((request, future))
+        except asyncio.QueueFull:
+            self.shed += 1
+            raise Overloaded(OVERLOADED) from None
+        return future
+
+    async def quote(self, request):
+        """提交請求並等待結果"""
+        return await self.submit(request)
+
+    def _drain(self, batch):
+        """從佇列取出請求直到批次已滿或佇列為空"""
+        queue = self._queue
+        while len(batch) < self.max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                self._drain(batch)
+            try:
+                self._price_batch(batch)
+            except Exception as exc:
+                # 只讓這一批的請求失敗，批次處理任務繼續服務後續請求
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"計價失敗: {exc}"))
+
+    def _price_batch(self, batch):
+        """驗證並以一次呼叫計價整個批次"""
+        self.batches += 1
+        self.requests += len(batch)
+        valid = []
+        for request, future in batch:
+            if future.done():
+                continue
+            try:
+                choice = str(request.get('scheme', '')).strip().upper()
+                if choice not in self.system.pricers:
+                    raise ValueError(reason_message(REASON_INVALID_SCHEME, choice))
+                try:
+                    weights = (parse_weight(request.get('apple')),
+                               parse_weight(request.get('strawberry')),
+                               parse_weight(request.get('mango')))
+                except ValueError:
+                    raise ValueError(reason_message(REASON_NOT_INTEGER)) from None
+                error = check_weights(*weights, choice, self.system.promotions, WEIGHT_LIMIT)
+                if error:
+                    raise ValueError(error)
+            except (ValueError, AttributeError) as exc:
+                future.set_exception(ValueError(str(exc)))
+                continue
+            valid.append((choice, weights, future))
+        if not valid:
+            return
+
+        # 批次小於SCALAR_BATCH_ROWS筆時逐筆呼叫編譯後的計價函數，比numpy的固定開銷便宜
+        if HAS_NUMPY and len(valid) >= SCALAR_BATCH_ROWS:
+            codes = [choice for choice, _, _ in valid]
+            apple, strawberry, mango = zip(*(weights for _, weights, _ in valid))
+            totals = self.system.calculate_prices_batch_cents(apple, strawberry, mango, codes).tolist()
+        else:
+            pricers = self.system.pricers
+            totals = [pricers[choice](*weights) for choice, weights, _ in valid]
+        for (_, _, future), total in zip(valid, totals):
+            future.set_result(cents_to_yuan(total))
+
+    def stats(self):
+        """服務統計"""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'shed': self.shed,
+            'queued': self._queue.qsize(),
+            'avg_batch': self.requests / self.batches if self.batches else 0.0,
+        }
+
+
+def _encode(response):
+    return json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+async def handle_client(service, reader, writer):
+    """處理一個連線：每行一個請求，回應可能不依請求順序返回（以id對應）"""
+    pending = set()
+
+    def respond(request_id, future):
+        # 以回呼寫回結果，避免為每個請求建立Task
+        pending.discard(future)
+        exc = future.exception()
+        if exc is None:
+            writer.write(_encode({'id': request_id, 'total': future.result()}))
+        else:
+            writer.write(_encode({'id': request_id, 'error': str(exc)}))
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError
+            except ValueError:
+                writer.write(_encode({'id': None, 'error': "無法解析"}))
+                continue
+            request_id = request.get('id')
+            if request.get('op') == 'stats':
+                writer.write(_encode({'id': request_id, 'stats': service.stats()}))
+                continue
+            try:
+                future = service.submit(request)
+            except Overloaded as exc:
+                writer.write(_encode({'id': request_id, 'error': str(exc)}))
+                continue
+            pending.add(future)
+            future.add_done_callback(functools.partial(respond, request_id))
+            if writer.transport.get_write_buffer_size() > 1 << 20:
+                await writer.drain()
+        if pending:
+            await asyncio.wait(pending)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host='127.0.0.1', port=8765, service=None):
+    """
+    啟動計價服務
+    返回:
+        (asyncio.Server, PricingService)；port為0時由系統分配連接埠
+    """
+    service = service or PricingService()
+    service.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_client(service, reader, writer), host, port)
+    return server, service
+
+
+async def serve(host, port, service=None):
+    server, service = await start_server(host, port, service)
+    address = server.sockets[0].getsockname()
+    print(f"計價服務已啟動: {address[0]}:{address[1]}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水果價格計價服務")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--catalog', default=os.environ.get('FRUIT_CATALOG'),
+                        help="商品目錄檔（JSON或TOML），修改後自動換用新價目")
+    parser.add_argument('--catalog-poll', type=float, default=1.0, help="檢查目錄檔的間隔（秒）")
+    parser.add_argument('--max-queue', type=int, default=4096, help="等待中請求的上限，超過時拒絕（負載卸除）")
+    parser.add_argument('--max-batch', type=int, default=1024,
+                        help=f"每批次最多請求數（少於{SCALAR_BATCH_ROWS}筆的批次逐筆計價）")
+    parser.add_argument('--max-delay', type=float, default=0.0002, help="批次未滿時最多等待的秒數")
+    args = parser.parse_args(argv)
+    system = ShoppingSystem()
+    watcher = None
+    if args.catalog:
+        from catalog_reload import watch_catalog
+        watcher = watch_catalog(system, args.catalog,
+                                on_error=lambda exc: print(f"商品目錄載入失敗，沿用目前價目: {exc}", flush=True))
+        watcher.start(args.catalog_poll)
+    try:
+        service = PricingService(system, max_batch=args.max_batch, max_delay=args.max_delay,
+                                 max_queue=args.max_queue)
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+效能剖析與事件延遲追蹤
+
+以旗標--profile（命令列互動模式）或環境變數FRUIT_PROFILE（互動模式與GUI）啟用，值為輸出檔
+的路徑前綴，例如 FRUIT_PROFILE=/tmp/fruit 會寫出：
+    /tmp/fruit.trace.json  每個事件各階段（輸入驗證、計價、小票組裝、Text插入等）的延遲，
+                           Chrome追蹤格式，可用chrome://tracing或Perfetto開啟
+    /tmp/fruit.pstats      整個工作階段的cProfile統計，可用pstats或snakeviz檢視
+兩個檔案在工作階段中定期覆寫，程式異常結束時也保留最近一次的結果。
+
+未啟用時GUI與互動模式使用NULL_TRACER，每個階段只多一次空的with區塊；
+cProfile只有在建立ProfileSession時才載入。
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+from time import monotonic, perf_counter_ns
+
+PROFILE_ENV = 'FRUIT_PROFILE'
+DEFAULT_DUMP_INTERVAL = 10.0  # 秒
+# 追蹤事件數上限，超過後只計數不再記錄
+MAX_TRACE_EVENTS = 500_000
+
+
+class _Span:
+    """Tracer.span返回的計時區塊，結束時記錄一個完整事件"""
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.category, self.start, perf_counter_ns(), self.args)
+
+
+class Tracer:
+    """
+    記錄事件延遲區段，匯出為Chrome追蹤格式（traceEvents的完整事件，時間單位為微秒）
+    區段可以巢狀，例如「計算價格」事件內含驗證、計價、小票組裝與Text插入
+    """
+    def __init__(self, max_events=MAX_TRACE_EVENTS):
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0
+        self._origin = perf_counter_ns()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def span(self, name, category='gui', **args):
+        """計時區塊：with tracer.span('pricing'): ..."""
+        return _Span(self, name, category, args)
+
+    def record(self, name, category, start_ns, end_ns, args=None):
+        """記錄一個完整事件（開始與結束時間為perf_counter_ns）"""
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start_ns - self._origin) / 1000,
+                'dur': (end_ns - start_ns) / 1000,
+                'pid': self._pid,
+                'tid': threading.get_ident(),
+            }
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def to_json(self):
+        with self._lock:
+            events = list(self.events)
+            dropped = self.dropped
+        return json.dumps({
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_events': dropped},
+        }, ensure_ascii=False)
+
+    def write(self, path):
+        """寫出追蹤檔（先寫暫存檔再替換，讀取端不會看到寫到一半的檔案）"""
+        _replace_file(path, lambda tmp: _write_text(tmp, self.to_json()))
+
+    def summary(self):
+        """各區段名稱的次數與延遲（毫秒）：[(名稱, 次數, p50, p99, 最大), ...]"""
+        with self._lock:
+            durations = {}
+            for event in self.events:
+                durations.setdefault(event['name'], []).append(event['dur'] / 1000)
+        rows = []
+        for name, values in durations.items():
+            values.sort()
+            rows.append((name, len(values), values[len(values) // 2],
+                         values[min(len(values) - 1, int(len(values) * 0.99))], values[-1]))
+        return rows
+
+
+class _NullTracer:
+    """未啟用剖析時的追蹤器：區段不計時也不記錄"""
+    _span = contextlib.nullcontext()
+
+    def span(self, name, category='gui', **args):
+        return self._span
+
+    def record(self, name, category, start_ns, end_ns, args=None):
+        pass
+
+
+NULL_TRACER = _NullTracer()
+
+
+def traced(name, category='event'):
+    """方法裝飾器：以物件的tracer屬性記錄整個方法（例如一次按鈕事件）的延遲區段"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name, category):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _replace_file(path, write):
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class ProfileSession:
+    """
+    剖析工作階段：cProfile統計加上事件延遲追蹤，每dump_interval秒寫出一次
+    參數:
+        prefix: 輸出檔路徑前綴（寫出prefix.trace.json與prefix.pstats）
+        dump_interval: 定期寫出的間隔（秒）；由呼叫端在事件之間呼叫maybe_dump()
+    cProfile只剖析呼叫start()的執行緒（GUI與互動模式的主執行緒）
+    """
+    def __init__(self, prefix, dump_interval=DEFAULT_DUMP_INTERVAL):
+        import cProfile  # 只有啟用剖析時才載入
+        self.trace_path = f"{prefix}.trace.json"
+        self.stats_path = f"{prefix}.pstats"
+        self.dump_interval = dump_interval
+        self.tracer = Tracer()
+        self.profile = cProfile.Profile()
+        self.dumps = 0
+        self._last_dump = monotonic()
+        self._running = False
+
+    def start(self):
+        self.profile.enable()
+        self._running = True
+        return self
+
+    def maybe_dump(self):
+        """距離上次寫出超過dump_interval秒時寫出；返回是否寫出"""
+        if monotonic() - self._last_dump < self.dump_interval:
+            return False
+        self.dump()
+        return True
+
+    def dump(self):
+        """寫出目前為止的統計與追蹤檔，之後繼續剖析"""
+        # dump_stats會停止剖析器，寫出後再重新啟用
+        _replace_file(self.stats_path, self.profile.dump_stats)
+        if self._running:
+            self.profile.enable()
+        self.tracer.write(self.trace_path)
+        self.dumps += 1
+        self._last_dump = monotonic()
+
+    def close(self):
+        """停止剖析並寫出最終結果"""
+        if self._running:
+            self.profile.disable()
+            self._running = False
+        self.dump()
+
+    def summary_lines(self):
+        """各區段延遲摘要的文字列"""
+        lines = [f"剖析結果: {self.trace_path}、{self.stats_path}"]
+        for name, count, p50, p99, worst in sorted(self.tracer.summary()):
+            lines.append(f"  {name:<20} {count:>7,} 次  p50 {p50:8.3f} 毫秒  p99 {p99:8.3f} 毫秒  "
+                         f"最大 {worst:8.3f} 毫秒")
+        return lines
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def session_from_env(prefix=None, dump_interval=DEFAULT_DUMP_INTERVAL):
+    """依參數或環境變數FRUIT_PROFILE建立ProfileSession；都未指定時返回None"""
+    prefix = prefix or os.environ.get(PROFILE_ENV)
+    if not prefix:
+        return None
+    return ProfileSession(prefix, dump_interval)
@@ -0,0 +1,289 @@
+"""
+促銷方案試算（what-if）
+
+推出新方案（例如顧客D的草莓8折、滿100減10）之前，以歷史購物記錄試算：
+若當時每筆購物都套用候選方案，營收、折扣成本與達到滿減門檻的比例各是多少。
+
+候選方案與promotions.PROMOTIONS的資料格式相同（折扣率、discount_threshold、
+discount_amount），每筆購物以其記錄的斤數重新計價，金額與逐筆計價逐分相同。
+折扣率相同的候選方案共用一次向量化計價，不同的門檻只需在同一組小計上計數，
+因此上百個候選方案的網格只需要掃描購物記錄一次。
+分級滿減的候選方案（discount_tiers）把每一檔的門檻都加入同組計數，
+落在第i檔的筆數即為相鄰兩檔達標筆數之差。
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from columnar import DEFAULT_CHUNK_ROWS, ColumnarTransactions, convert_transactions
+from money import BASIS_POINTS, cents_to_yuan, to_basis_points, to_cents
+from pricing_core import BASKET_SKUS, ShoppingSystem
+from promotions import Promotion
+
+RESULT_FIELDS = ('code', 'discounts', 'discount_threshold', 'discount_amount', 'baskets',
+                 'revenue', 'discount_cost', 'threshold_share', 'baseline_revenue', 'revenue_change')
+# 同一組折扣率的門檻數超過此值時，排序小計後以二分搜尋計數，否則逐一比較
+_SORT_THRESHOLDS = 8
+
+
+def candidate_grid(rates, thresholds, amounts, sku='strawberry'):
+    """
+    產生候選方案網格（promotions.PROMOTIONS格式的字典）
+    參數:
+        rates: sku的折扣率，例如(0.7, 0.8, 0.9, 1.0)
+        thresholds: 滿減門檻（元），0表示無滿減
+        amounts: 滿減金額（元）
+        sku: 折扣的水果
+    無滿減的候選方案不重複產生各種滿減金額
+    """
+    grid = []
+    for rate, threshold in itertools.product(rates, thresholds):
+        for amount in (amounts if threshold > 0 else (0,)):
+            grid.append({
+                "code": f"{sku}{rate:g}-{threshold:g}-{amount:g}",
+                "skus": BASKET_SKUS,
+                "discounts": {sku: rate} if rate != 1.0 else {},
+                "discount_threshold": threshold,
+                "discount_amount": amount,
+            })
+    return grid
+
+
+class SimulationResult:
+    """單一候選方案的試算結果（金額為整數分）"""
+    __slots__ = ('promotion', 'baskets', 'revenue_cents', 'list_cents', 'threshold_baskets',
+                 'baseline_cents')
+
+    def __init__(self, promotion, baskets, revenue_cents, list_cents, threshold_baskets,
+                 baseline_cents=None):
+        self.promotion = promotion
+        self.baskets = baskets
+        self.revenue_cents = revenue_cents
+        self.list_cents = list_cents
+        self.threshold_baskets = threshold_baskets
+        self.baseline_cents = baseline_cents
+
+    @property
+    def discount_cents(self):
+        """折扣成本（分）：原價營收減去套用方案後的營收"""
+        return self.list_cents - self.revenue_cents
+
+    @property
+    def threshold_share(self):
+        """達到滿減門檻的購物比例"""
+        return self.threshold_baskets / self.baskets if self.baskets else 0.0
+
+    def as_row(self):
+        """CSV輸出列（見RESULT_FIELDS）"""
+        promotion = self.promotion
+        baseline = self.baseline_cents
+        return (
+            promotion.code,
+            ";".join(f"{sku}={rate:g}" for sku, rate in sorted(promotion.discounts.items())),
+            *_threshold_fields(promotion),
+            self.baskets,
+            f"{cents_to_yuan(self.revenue_cents):.2f}",
+            f"{cents_to_yuan(self.discount_cents):.2f}",
+            f"{self.threshold_share:.4f}",
+            '' if baseline is None else f"{cents_to_yuan(baseline):.2f}",
+            '' if baseline is None else f"{cents_to_yuan(self.revenue_cents - baseline):.2f}",
+        )
+
+    def __repr__(self):
+        return (f"SimulationResult({self.promotion.code!r}, revenue={self.revenue_cents}, "
+                f"discount={self.discount_cents}, share={self.threshold_share:.4f})")
+
+
+def _threshold_fields(promotion):
+    """CSV輸出的門檻與滿減金額欄；分級滿減時各檔以分號分隔"""
+    tiers = promotion.discount_tiers
+    if tiers is None:
+        return f"{promotion.discount_threshold:g}", f"{promotion.discount_amount:g}"
+    return (";".join(f"{threshold:g}" for threshold in tiers.thresholds),
+            ";".join(f"{amount:g}" for amount in tiers.amounts))
+
+
+class PromotionSimulator:
+    """
+    逐區塊累計各候選方案的試算結果
+    候選方案依「各水果的單價(分)×折扣基點」分組，同組只計算一次小計；
+    各門檻的達標筆數與滿減金額都從同一組小計得出
+    """
+    def __init__(self, candidates, system=None):
+        self.system = system if system is not None else ShoppingSystem()
+        fruits = self.system.fruits
+        # 整個試算使用同一個目錄快照，試算期間的價格變動不影響結果
+        self.snapshot = self.system.catalog.snapshot
+        self.promotions = []
+        for number, data in enumerate(candidates):
+            data = dict(data)
+            data.setdefault("code", f"#{number}")
+            data.setdefault("skus", BASKET_SKUS)
+            self.promotions.append(Promotion(data, fruits))
+
+        # {各水果的單價(分)×折扣基點: {門檻(分): 達標筆數}}；不販售的水果為0
+        self._groups = {}
+        self._keys = [self._line_multipliers(promotion) for promotion in self.promotions]
+        for promotion, key in zip(self.promotions, self._keys):
+            thresholds = self._groups.setdefault(key, {})
+            if promotion.discount_tiers is not None:
+                thresholds.update(dict.fromkeys(promotion.discount_tiers.threshold_cents, 0))
+                continue
+            threshold = to_cents(promotion.discount_threshold)
+            if threshold > 0:
+                thresholds[threshold] = 0
+        self._subtotals = dict.fromkeys(self._groups, 0)
+        self._weight_sums = dict.fromkeys(BASKET_SKUS, 0)
+        self.baskets = 0
+        self.baseline_cents = None
+
+    def _line_multipliers(self, promotion):
+        snapshot = self.snapshot
+        return tuple(
+            snapshot.price_cents[snapshot.index_of(sku)] * to_basis_points(promotion.discount_for(sku))
+            if promotion.sells(sku) else 0
+            for sku in BASKET_SKUS
+        )
+
+    def add(self, apple_weights, strawberry_weights, mango_weights, baseline_cents=None):
+        """
+        累計一個區塊的購物記錄
+        參數:
+            apple_weights, strawberry_weights, mango_weights: 各筆斤數（整數陣列）
+            baseline_cents: 可選，各筆實際支付的總價（分），用於比較營收變化
+        """
+        columns = tuple(np.asarray(weights) for weights in (apple_weights, strawberry_weights,
+                                                             mango_weights))
+        rows = len(columns[0])
+        if not rows:
+            return
+        self.baskets += rows
+        for sku, weights in zip(BASKET_SKUS, columns):
+            self._weight_sums[sku] += int(weights.sum(dtype=np.int64))
+        if baseline_cents is not None:
+            self.baseline_cents = (self.baseline_cents or 0) + int(np.sum(baseline_cents, dtype=np.int64))
+
+        half = BASIS_POINTS // 2
+        for key, thresholds in self._groups.items():
+            # 與price_columns_cents相同的捨入：單價(分)×斤數×折扣基點，四捨五入到分
+            subtotal = np.zeros(rows, dtype=np.int64)
+            for multiplier, weights in zip(key, columns):
+                if not multiplier:
+                    continue
+                if multiplier % BASIS_POINTS == 0:
+                    subtotal += weights * np.int64(multiplier // BASIS_POINTS)
+                else:
+                    line = weights * np.int64(multiplier)
+                    subtotal += np.sign(line) * ((np.abs(line) + half) // BASIS_POINTS)
+            self._subtotals[key] += int(subtotal.sum())
+            if len(thresholds) > _SORT_THRESHOLDS:
+                subtotal.sort()
+                cuts = np.array(list(thresholds), dtype=np.int64)
+                counts = rows - np.searchsorted(subtotal, cuts, side='left')
+                for threshold, count in zip(thresholds, counts.tolist()):
+                    thresholds[threshold] += count
+            else:
+                for threshold in thresholds:
+                    thresholds[threshold] += int(np.count_nonzero(subtotal >= threshold))
+
+    def results(self):
+        """各候選方案的SimulationResult（依候選方案順序）"""
+        snapshot = self.snapshot
+        results = []
+        for promotion, key in zip(self.promotions, self._keys):
+            counts = self._groups[key]
+            if promotion.discount_tiers is not None:
+                hits, discount = self._tier_discount(promotion.discount_tiers, counts)
+            else:
+                threshold = to_cents(promotion.discount_threshold)
+                hits = counts[threshold] if threshold > 0 else 0
+                discount = hits * to_cents(promotion.discount_amount)
+            list_cents = sum(snapshot.price_cents[snapshot.index_of(sku)] * self._weight_sums[sku]
+                             for sku in BASKET_SKUS if promotion.sells(sku))
+            revenue = self._subtotals[key] - discount
+            results.append(SimulationResult(promotion, self.baskets, revenue, list_cents, hits,
+                                            self.baseline_cents))
+        return results
+
+    @staticmethod
+    def _tier_discount(tiers, counts):
+        """分級滿減的(達到最低一檔的筆數, 滿減總額(分))：第i檔的筆數為相鄰兩檔達標筆數之差"""
+        reached = [counts[threshold] for threshold in tiers.threshold_cents] + [0]
+        discount = sum(amount * (reached[i] - reached[i + 1])
+                       for i, amount in enumerate(tiers.amount_cents))
+        return reached[0], discount
+
+
+def simulate_columnar(transactions, candidates, system=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """以欄式交易記錄（ColumnarTransactions）試算全部候選方案，返回SimulationResult列表"""
+    simulator = PromotionSimulator(candidates, system)
+    system = simulator.system
+    for start, stop in transactions.iter_chunks(chunk_rows):
+        scheme, apple, strawberry, mango = transactions.slice(start, stop)
+        baseline = system.price_columns_cents(transactions.schemes, scheme, apple, strawberry, mango)
+        simulator.add(apple, strawberry, mango, baseline)
+    return simulator.results()
+
+
+def simulate_file(input_path, candidates, fmt=None, reject_path=None, system=None,
+                  chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    以購物記錄檔試算全部候選方案
+    .frtx欄式檔直接以記憶體映射讀取；CSV/JSONL先轉成暫存的欄式檔（驗證規則與檔案計價模式相同）
+    """
+    from FruitPriceCalculator import guess_format
+    if fmt is None:
+        fmt = guess_format(input_path)
+    with contextlib.ExitStack() as stack:
+        path = input_path
+        if fmt != 'columnar':
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            path = os.path.join(tmp, 'baskets.frtx')
+            convert_transactions(input_path, path, reject_path, fmt)
+        transactions = stack.enter_context(ColumnarTransactions(path))
+        return simulate_columnar(transactions, candidates, system, chunk_rows)
+
+
+def write_results(results, output):
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(RESULT_FIELDS)
+    writer.writerows(result.as_row() for result in results)
+
+
+def _floats(text):
+    return [float(value) for value in text.split(',') if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="促銷方案試算：以歷史購物記錄比較候選方案")
+    parser.add_argument('--input', required=True, help="購物記錄（CSV、JSONL或.frtx欄式檔）")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'columnar'], help="輸入格式，預設依副檔名判斷")
+    parser.add_argument('--rejects', help="拒絕記錄輸出路徑，預設為標準錯誤")
+    parser.add_argument('--output', default='-', help="試算結果CSV輸出路徑，預設為標準輸出")
+    parser.add_argument('--sku', default='strawberry', help="折扣的水果，預設為草莓")
+    parser.add_argument('--rates', default='0.8', help="折扣率，以逗號分隔，例如0.7,0.8,0.9")
+    parser.add_argument('--thresholds', default='100', help="滿減門檻（元），以逗號分隔，0表示無滿減")
+    parser.add_argument('--amounts', default='10', help="滿減金額（元），以逗號分隔")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="每次處理的筆數")
+    args = parser.parse_args(argv)
+
+    candidates = candidate_grid(_floats(args.rates), _floats(args.thresholds), _floats(args.amounts),
+                                args.sku)
+    results = simulate_file(args.input, candidates, args.format, args.rejects,
+                            chunk_rows=args.chunk_rows)
+    if args.output == '-':
+        write_results(results, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            write_results(results, output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
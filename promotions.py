@@ -0,0 +1,284 @@
+"""
+促銷方案定義與編譯
+
+促銷方案以資料描述（適用水果、各水果折扣、滿減門檻與金額），
+載入時編譯成專用的計價函數：折扣、門檻等參數直接寫成常數，
+計價時不需查表，也不需依方案代碼分支。
+
+分級滿減以discount_tiers描述（[(門檻, 減額), ...]，見tiers.ThresholdTiers），
+編譯後的計價函數以bisect在排序好的門檻表中查出適用的一檔。
+tiers與bisect只在方案含discount_tiers時才載入，匯入本模組不會觸發。
+"""
+from time import perf_counter
+
+from money import (
+    BASIS_POINTS, CENTS_PER_YUAN, _basis_points_cache, _cents_cache, line_total_cents, to_basis_points,
+    to_cents,
+)
+
+# 顧客方案資料（新增方案只需在此新增一筆）
+PROMOTIONS = [
+    {
+        "code": "A",
+        "label": "顧客A - 蘋果草莓，無促銷",
+        "description": "只買蘋果和草莓，無促銷",
+        "skus": ("apple", "strawberry"),
+        "discounts": {},
+        "discount_threshold": 0,
+        "discount_amount": 0,
+    },
+    {
+        "code": "B",
+        "label": "顧客B - 三種水果，無促銷",
+        "description": "買三種水果，無促銷",
+        "skus": ("apple", "strawberry", "mango"),
+        "discounts": {},
+        "discount_threshold": 0,
+        "discount_amount": 0,
+    },
+    {
+        "code": "C",
+        "label": "顧客C - 三種水果，草莓8折",
+        "description": "買三種水果，草莓8折",
+        "skus": ("apple", "strawberry", "mango"),
+        "discounts": {"strawberry": 0.8},
+        "discount_threshold": 0,
+        "discount_amount": 0,
+    },
+    {
+        "code": "D",
+        "label": "顧客D - 草莓8折，滿100減10",
+        "description": "買三種水果，草莓8折，滿100減10",
+        "skus": ("apple", "strawberry", "mango"),
+        "discounts": {"strawberry": 0.8},
+        "discount_threshold": 100,
+        "discount_amount": 10,
+    },
+]
+
+
+class Promotion:
+    """編譯後的促銷方案"""
+    def __init__(self, data, fruits, params=None, catalog=None):
+        self.code = data["code"]
+        self.label = data.get("label", f"顧客{self.code}")
+        self.description = data.get("description", "")
+        self.skus = tuple(data["skus"])
+        self.discounts = dict(data.get("discounts", {}))
+        self.discount_threshold = data.get("discount_threshold", 0)
+        self.discount_amount = data.get("discount_amount", 0)
+        tiers = data.get("discount_tiers")
+        self.discount_tiers = None
+        if tiers:
+            if self.discount_threshold > 0:
+                raise ValueError(f"方案{self.code}不能同時指定discount_threshold與discount_tiers")
+            from tiers import ThresholdTiers
+            self.discount_tiers = tiers if isinstance(tiers, ThresholdTiers) else ThresholdTiers(tiers)
+
+        unknown = (set(self.skus) | set(self.discounts)) - set(fruits)
+        if unknown:
+            raise ValueError(f"方案{self.code}包含未知水果: {', '.join(sorted(unknown))}")
+
+        self.price_cents = compile_pricer(self, fruits, params, catalog=catalog)
+
+    def discount_for(self, sku):
+        """該水果的折扣率，無折扣時為1.0"""
+        return self.discounts.get(sku, 1.0)
+
+    def sells(self, sku):
+        """該方案是否可購買此水果"""
+        return sku in self.skus
+
+
+def compile_pricer(promotion, fruits, params=None, counted=False, catalog=None,
+                   histogram=None, sample_every=1, yuan=False):
+    """
+    將促銷方案編譯成計價函數
+    參數:
+        promotion: Promotion
+        fruits: {水果代碼: Fruit}
+        params: 生成函數的前幾個參數（水果代碼），依此順序為 <代碼>_weight；
+                方案適用但不在params中的水果依序附加在後面
+        counted: 為True時每次呼叫與觸發滿減時分別把閉包變數_calls、_hits加1，
+                 直接編譯進函數內，不需另外包裝（以counter_cells取得，見Metrics.bind_counter）
+        histogram, sample_every: 可選的延遲直方圖（需同時指定counted），
+                 以_calls的計數每sample_every次量測一次，同樣編譯進函數內
+        yuan: 為True時返回元（float，與cents_to_yuan相同），可直接取代calculate_customer_a~d
+        catalog: 可選的catalog.Catalog；指定時每次計價先取得一次目錄快照，
+                 全部單價都取自同一個版本（否則直接讀取各Fruit的單價）
+    返回:
+        pricer(**weights) -> 總價（分）；不適用於此方案的水果斤數會被忽略
+    """
+    params = tuple(params) if params is not None else ()
+    params += tuple(sku for sku in promotion.skus if sku not in params)
+    invalid = [sku for sku in params if not sku.isidentifier()]
+    if invalid:
+        raise ValueError(f"水果代碼必須是合法的識別字: {', '.join(invalid)}")
+    signature = ", ".join(f"{sku}_weight=0" for sku in params)
+    body = []
+    if catalog is not None:
+        body.append("    _prices = _catalog.snapshot.price_cents")
+    body.append("    total = 0")
+    for sku in promotion.skus:
+        bp = to_basis_points(promotion.discount_for(sku))
+        if catalog is not None:
+            price = f"_prices[{catalog.index_of(sku)}]"
+        else:
+            price = f"_fruit_{sku}.price_cents"
+        if bp == BASIS_POINTS:
+            body.append(f"    total += {price} * {sku}_weight")
+        else:
+            half = BASIS_POINTS // 2
+            body.append(f"    line = {price} * {sku}_weight * {bp}")
+            body.append(f"    total += (line + {half}) // {BASIS_POINTS} if line >= 0 "
+                        f"else -((-line + {half}) // {BASIS_POINTS})")
+    tiers = promotion.discount_tiers
+    if tiers is not None:
+        # 分級滿減：二分搜尋小計達到的最高一檔
+        body.append("    _tier = _bisect(_tier_thresholds, total)")
+        body.append("    if _tier:")
+        body.append("        total -= _tier_amounts[_tier - 1]")
+        if counted:
+            body.append("        _hits += 1")
+    elif promotion.discount_threshold > 0:
+        body.append(f"    if total >= {to_cents(promotion.discount_threshold)}:")
+        body.append(f"        total -= {to_cents(promotion.discount_amount)}")
+        if counted:
+            body.append("        _hits += 1")
+    body = _instrument(body, f"total / {CENTS_PER_YUAN}" if yuan else "total",
+                       counted, histogram, sample_every)
+
+    name = f"price_{promotion.code}"
+    if not name.isidentifier():
+        name = "price_promotion"  # 方案代碼可以是任意文字（例如試算用的候選方案）
+    namespace = {f"_fruit_{sku}": fruits[sku] for sku in promotion.skus}
+    namespace.update(_catalog=catalog, _histogram=histogram, _perf_counter=perf_counter)
+    if tiers is not None:
+        import bisect
+        namespace.update(_bisect=bisect.bisect_right, _tier_thresholds=tiers.threshold_cents,
+                         _tier_amounts=tiers.amount_cents)
+    pricer = _define(name, signature, body, namespace, f"<promotion {promotion.code}>", counted)
+    pricer.__doc__ = f"{promotion.label}（編譯後的計價函數，返回{'元' if yuan else '分'}）"
+    return pricer
+
+
+def basket_rates(skus, strawberry_discount=1.0, discounts=None):
+    """
+    calculate_price等舊介面三種水果的折扣率（依skus順序，第二項為草莓）
+    discounts為{水果代碼: 折扣率}（例如Promotion.discounts），優先於strawberry_discount；
+    未列出的水果不打折
+    """
+    apple, strawberry, mango = skus
+    if not discounts:
+        return 1.0, strawberry_discount, 1.0
+    return discounts.get(apple, 1.0), discounts.get(strawberry, strawberry_discount), discounts.get(mango, 1.0)
+
+
+def compile_price_cents(catalog, skus, counted=False, histogram=None, sample_every=1, yuan=False):
+    """
+    編譯通用計價函數，與ShoppingSystem.calculate_price_cents的參數與結果相同
+    （skus為三種水果的代碼，依參數順序）。目錄索引與捨入常數直接寫入，促銷參數直接查
+    money的換算快取（查不到時才呼叫to_cents等函數）；ShoppingSystem以此作為calculate_price_cents。
+    指定discounts（各水果折扣）時改走逐行換算的一般路徑（見basket_rates）。
+    計數與延遲抽樣（enable_metrics）同樣直接編譯進函數內（參數見compile_pricer）。
+    yuan為True時返回元，與calculate_price相同
+    """
+    apple, strawberry, mango = (catalog.index_of(sku) for sku in skus)
+    half = BASIS_POINTS // 2
+    hit = ["_hits += 1"] if counted else []
+    body = [
+        "    prices = _catalog.snapshot.price_cents",
+        "    if discounts:",
+        "        rates = _basket_rates(_skus, strawberry_discount, discounts)",
+        f"        total = (_line_total_cents(prices[{apple}], apple_weight, _to_basis_points(rates[0]))",
+        f"                 + _line_total_cents(prices[{strawberry}], strawberry_weight, _to_basis_points(rates[1]))",
+        f"                 + _line_total_cents(prices[{mango}], mango_weight, _to_basis_points(rates[2])))",
+        "    else:",
+        f"        total = prices[{apple}] * apple_weight + prices[{mango}] * mango_weight",
+        f"        strawberry_cents = prices[{strawberry}] * strawberry_weight",
+        "        if strawberry_discount != 1.0:",
+        "            try:",
+        "                strawberry_cents *= _basis_points[strawberry_discount]",
+        "            except KeyError:",
+        "                strawberry_cents *= _to_basis_points(strawberry_discount)",
+        "            if strawberry_cents < 0:",
+        f"                strawberry_cents = -((-strawberry_cents + {half}) // {BASIS_POINTS})",
+        "            else:",
+        f"                strawberry_cents = (strawberry_cents + {half}) // {BASIS_POINTS}",
+        "        total += strawberry_cents",
+        "    if discount_tiers is not None:",
+        "        _discount = discount_tiers.discount_cents(total)",
+        "        if _discount:",
+        "            total -= _discount",
+        *("            " + line for line in hit),
+        "    elif discount_threshold > 0:",
+        "        try:",
+        "            threshold_cents = _cents[discount_threshold]",
+        "        except KeyError:",
+        "            threshold_cents = _to_cents(discount_threshold)",
+        "        if total >= threshold_cents:",
+        "            try:",
+        "                total -= _cents[discount_amount]",
+        "            except KeyError:",
+        "                total -= _to_cents(discount_amount)",
+        *("            " + line for line in hit),
+    ]
+    body = _instrument(body, f"total / {CENTS_PER_YUAN}" if yuan else "total",
+                       counted, histogram, sample_every)
+    signature = ("apple_weight=0, strawberry_weight=0, mango_weight=0, strawberry_discount=1.0, "
+                 "discount_threshold=0, discount_amount=0, discount_tiers=None, discounts=None")
+    namespace = {'_catalog': catalog, '_histogram': histogram, '_perf_counter': perf_counter,
+                 '_to_basis_points': to_basis_points, '_to_cents': to_cents,
+                 '_basis_points': _basis_points_cache, '_cents': _cents_cache,
+                 '_skus': tuple(skus), '_basket_rates': basket_rates, '_line_total_cents': line_total_cents}
+    return _define("calculate_price_cents", signature, body, namespace, "<calculate_price_cents>", counted)
+
+
+def counter_cells(func):
+    """編譯時指定counted的函數的計數器：{'calls': 呼叫次數, 'hits': 觸發滿減次數}（閉包cell）"""
+    cells = dict(zip(func.__code__.co_freevars, func.__closure__ or ()))
+    return {'calls': cells['_calls'], 'hits': cells['_hits']}
+
+
+def _define(name, signature, body, namespace, filename, counted):
+    """
+    執行生成的函數原始碼並返回函數
+    counted時包在工廠函數內，計數器是閉包變數：nonlocal累加比列表元素（cell[0] += 1）少一半指令
+    """
+    source = f"def {name}({signature}):\n" + "\n".join(body) + "\n"
+    if counted:
+        source = ("def _make():\n    _calls = _hits = 0\n"
+                  + "".join("    " + line + "\n" for line in source.splitlines())
+                  + f"    return {name}\n")
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace['_make']() if counted else namespace[name]
+
+
+def _instrument(body, result, counted, histogram, sample_every):
+    """
+    在生成函數的本體（計算total的程式碼行）加上呼叫計數與延遲抽樣，返回完整的函數本體
+    抽樣時本體產生兩份：未抽樣的呼叫只多一次計數與一次判斷，不需在結尾再檢查是否抽樣
+    """
+    if histogram is None:
+        head = ["    nonlocal _calls, _hits", "    _calls += 1"] if counted else []
+        return head + body + [f"    return {result}"]
+    if not counted:
+        raise ValueError("延遲直方圖需要同時指定counted")
+    return (["    nonlocal _calls, _hits",
+             "    _calls += 1",
+             f"    if _calls % {max(1, sample_every)}:"]
+            + ["    " + line for line in body] + [f"        return {result}",
+                                                  "    _start = _perf_counter()"]
+            + body + ["    _histogram.observe(_perf_counter() - _start)",
+                      f"    return {result}"])
+
+
+def compile_promotions(fruits, promotions=PROMOTIONS, params=None, catalog=None):
+    """編譯全部促銷方案，返回 {方案代碼: Promotion}；params、catalog見compile_pricer"""
+    compiled = {}
+    for data in promotions:
+        promotion = Promotion(data, fruits, params, catalog)
+        if promotion.code in compiled:
+            raise ValueError(f"重複的方案代碼: {promotion.code}")
+        compiled[promotion.code] = promotion
+    return compiled
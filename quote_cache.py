@@ -0,0 +1,72 @@
+"""
+報價快取
+
+以(方法, 斤數, 促銷參數, 價目版本)為鍵的LRU快取，容量固定，
+超出容量時淘汰最久未使用的項目，並統計命中/未命中/淘汰次數。
+可在多個執行緒中共用（例如GUI與背景目錄重新載入、同一系統的多個工作執行緒）：
+查詢、存入與淘汰都在同一個鎖內完成，計算報價則在鎖外進行。
+"""
+from collections import OrderedDict
+
+
+class QuoteCache:
+    """有容量上限的LRU報價快取"""
+    def __init__(self, maxsize=1024):
+        if maxsize <= 0:
+            raise ValueError("快取容量必須大於0")
+        import threading  # 延到建立快取時才載入，不計入匯入時間
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """
+        查詢快取；未命中時呼叫compute()計算並存入
+        compute在鎖外執行，兩個執行緒同時未命中同一個鍵時各算一次，結果相同
+        """
+        entries = self._entries
+        with self._lock:
+            try:
+                value = entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = compute()
+        with self._lock:
+            entries[key] = value
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """清空快取（統計數字保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """命中率（0~1）"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """快取統計"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate,
+            }
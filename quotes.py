@@ -0,0 +1,294 @@
+"""
+精簡的購物籃與報價資料型別
+
+以__slots__取代每個實例的__dict__，金額以整數（分）保存，
+大量保留購物籃與報價記錄時可明顯降低記憶體用量。
+報價結果仍可當作get_detailed_calculation的字典唯讀使用（Mapping視圖）。
+"""
+from collections.abc import Mapping
+
+from money import cents_to_yuan, format_yuan
+
+
+class Basket:
+    """
+    購物籃：方案代碼與攤平的明細 (索引0, 斤數0, 索引1, 斤數1, ...)
+    只用一個tuple保存明細，避免每行一個物件
+    """
+    __slots__ = ('scheme', 'lines')
+
+    def __init__(self, scheme, lines=()):
+        self.scheme = scheme
+        flat = []
+        for index, weight in lines:
+            flat.append(index)
+            flat.append(weight)
+        self.lines = tuple(flat)
+
+    @classmethod
+    def from_weights(cls, scheme, weights):
+        """由斤數序列（依商品索引）建立購物籃，略過斤數為0的商品"""
+        return cls(scheme, ((index, weight) for index, weight in enumerate(weights) if weight))
+
+    def __iter__(self):
+        """產出(商品索引, 斤數)，可直接傳給ShoppingSystem.price_basket與price_basket_scheme_cents"""
+        lines = self.lines
+        return zip(lines[::2], lines[1::2])
+
+    def __len__(self):
+        return len(self.lines) // 2
+
+    def __repr__(self):
+        return f"Basket({self.scheme!r}, {list(self)!r})"
+
+
+class QuoteResult(Mapping):
+    """
+    單筆報價（整數分）：一次計價得到的明細、小計、滿減與總計
+    小票文字在需要時才產生（receipt_text / gui_receipt_text），不需要小票時沒有任何字串處理。
+    可當作唯讀字典使用，鍵與get_detailed_calculation的返回值相同
+    """
+    __slots__ = (
+        'apple_weight', 'strawberry_weight', 'mango_weight',
+        'apple_cents', 'strawberry_cents', 'mango_cents', 'subtotal_cents', 'final_cents',
+        'discount_applied', 'strawberry_discount', 'discount_threshold', 'discount_amount',
+        'unit_prices', 'catalog_version', 'discount_tiers', 'apple_discount', 'mango_discount', '_receipt',
+    )
+
+    KEYS = (
+        'apple_price', 'strawberry_price', 'mango_price', 'subtotal', 'discount_applied',
+        'discount_amount', 'discount_info', 'final_total', 'strawberry_discount',
+        'strawberry_original',
+    )
+
+    def __init__(self, apple_weight, strawberry_weight, mango_weight,
+                 apple_cents, strawberry_cents, mango_cents, subtotal_cents, final_cents,
+                 discount_applied, strawberry_discount, discount_threshold, discount_amount,
+                 unit_prices, catalog_version=None, discount_tiers=None,
+                 apple_discount=1.0, mango_discount=1.0):
+        self.apple_weight = apple_weight
+        self.strawberry_weight = strawberry_weight
+        self.mango_weight = mango_weight
+        self.apple_cents = apple_cents
+        self.strawberry_cents = strawberry_cents
+        self.mango_cents = mango_cents
+        self.subtotal_cents = subtotal_cents
+        self.final_cents = final_cents
+        self.discount_applied = discount_applied
+        self.strawberry_discount = strawberry_discount
+        self.discount_threshold = discount_threshold
+        self.discount_amount = discount_amount
+        self.unit_prices = unit_prices  # ((名稱, 單價, 單價(分)), ...)，依蘋果、草莓、芒果順序
+        self.catalog_version = catalog_version  # 計價時使用的價目版本
+        self.discount_tiers = discount_tiers  # 分級滿減（tiers.ThresholdTiers），單一門檻時為None
+        self.apple_discount = apple_discount  # 蘋果與芒果的折扣率（方案的各水果折扣，見promotions.basket_rates）
+        self.mango_discount = mango_discount
+        self._receipt = None
+
+    @property
+    def total(self):
+        """應付總額（元）"""
+        return cents_to_yuan(self.final_cents)
+
+    @property
+    def discount_cents(self):
+        """滿減金額（分）"""
+        return self.subtotal_cents - self.final_cents
+
+    @property
+    def discount_info(self):
+        """滿減說明，例如「滿100減10」；未觸發滿減時為空字串"""
+        if not self.discount_applied:
+            return ""
+        return f"滿{self.discount_threshold}減{self.discount_amount}"
+
+    @property
+    def tier_index(self):
+        """適用的分級滿減檔次（從0起算）；未達任何一檔或不是分級滿減時為-1"""
+        if self.discount_tiers is None:
+            return -1
+        return self.discount_tiers.index_for(self.subtotal_cents)
+
+    @property
+    def next_tier_message(self):
+        """距離下一檔的提示，例如「再買12.5元即可享滿200減25」；不是分級滿減時為空字串"""
+        if self.discount_tiers is None:
+            return ""
+        from tiers import tier_message  # 只有分級滿減的報價才載入
+        return tier_message(self.discount_tiers, self.subtotal_cents)
+
+    @property
+    def lines(self):
+        """購買明細：((名稱, 斤數, 單價, 金額(分)), ...)，略過斤數為0的水果"""
+        weights = (self.apple_weight, self.strawberry_weight, self.mango_weight)
+        amounts = (self.apple_cents, self.strawberry_cents, self.mango_cents)
+        return tuple(
+            (name, weight, price, amount)
+            for (name, price, _), weight, amount in zip(self.unit_prices, weights, amounts)
+            if weight > 0
+        )
+
+    def receipt_text(self, customer_name=""):
+        """命令列小票文字（與print_receipt的輸出相同，不含最後的換行），結果會快取"""
+        cached = self._receipt
+        if cached is not None and cached[0] == customer_name:
+            return cached[1]
+        text = render_receipt(self, customer_name)
+        self._receipt = (customer_name, text)
+        return text
+
+    def gui_receipt_text(self, code):
+        """GUI結果區的小票文字"""
+        return render_gui_receipt(self, code)
+
+    def gui_receipt_segments(self, code):
+        """GUI結果區的小票（已標記樣式的片段，見render_gui_segments）"""
+        return render_gui_segments(self, code)
+
+    def __getitem__(self, key):
+        if key == 'apple_price':
+            return cents_to_yuan(self.apple_cents)
+        if key == 'strawberry_price':
+            return cents_to_yuan(self.strawberry_cents)
+        if key == 'mango_price':
+            return cents_to_yuan(self.mango_cents)
+        if key == 'subtotal':
+            return cents_to_yuan(self.subtotal_cents)
+        if key == 'discount_applied':
+            return self.discount_applied
+        if key == 'discount_amount':
+            return self.discount_amount if self.discount_applied else 0
+        if key == 'discount_info':
+            return self.discount_info
+        if key == 'final_total':
+            return cents_to_yuan(self.final_cents)
+        if key == 'strawberry_discount':
+            return self.strawberry_discount
+        if key == 'strawberry_original':
+            return cents_to_yuan(self.unit_prices[1][2] * self.strawberry_weight)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def as_dict(self):
+        """轉為一般字典（與get_detailed_calculation的格式相同）"""
+        return {key: self[key] for key in self.KEYS}
+
+    def __repr__(self):
+        return f"QuoteResult({self.as_dict()!r})"
+
+
+# 小票開頭（依顧客名稱）快取
+_receipt_heads = {}
+
+
+def _receipt_head(customer_name):
+    head = _receipt_heads.get(customer_name)
+    if head is None:
+        title = f"顧客{customer_name}的購物小票" if customer_name else "購物小票"
+        head = f"\n{'='*30}\n{title}\n{'-'*30}"
+        if len(_receipt_heads) < 256:
+            _receipt_heads[customer_name] = head
+    return head
+
+
+def _discount_text(discount):
+    """命令列小票明細行的折扣說明，無折扣時為空字串"""
+    return f" ({discount:.1%}折)" if discount != 1.0 else ""
+
+
+def _gui_discount_text(discount):
+    """GUI小票明細行的折扣說明，無折扣時為空字串"""
+    return f" ({(1-discount)*100:.0f}折)" if discount != 1.0 else ""
+
+
+def render_receipt(quote, customer_name=""):
+    """命令列購物小票"""
+    lines = [_receipt_head(customer_name)]
+    (apple_name, apple_price, _), (strawberry_name, strawberry_price, _), (mango_name, mango_price, _) = \
+        quote.unit_prices
+    if quote.apple_weight > 0:
+        lines.append(f"{apple_name}: {quote.apple_weight}斤 × {apple_price}元/斤{_discount_text(quote.apple_discount)} = "
+                     f"{format_yuan(quote.apple_cents)}元")
+    if quote.strawberry_weight > 0:
+        lines.append(f"{strawberry_name}: {quote.strawberry_weight}斤 × {strawberry_price}元/斤"
+                     f"{_discount_text(quote.strawberry_discount)} = {format_yuan(quote.strawberry_cents)}元")
+    if quote.mango_weight > 0:
+        lines.append(f"{mango_name}: {quote.mango_weight}斤 × {mango_price}元/斤{_discount_text(quote.mango_discount)} = "
+                     f"{format_yuan(quote.mango_cents)}元")
+    lines.append('-'*30)
+    if quote.discount_tiers is not None:
+        # 分級滿減：列出適用的一檔與距離下一檔的金額
+        lines.append(f"小計: {format_yuan(quote.subtotal_cents)}元")
+        if quote.discount_applied:
+            lines.append(f"滿減優惠: -{quote.discount_amount}元 "
+                         f"(滿{quote.discount_threshold}減{quote.discount_amount}，第{quote.tier_index + 1}檔)")
+        lines.append(f"下一檔: {quote.next_tier_message}")
+    elif quote.discount_applied:
+        lines.append(f"小計: {format_yuan(quote.subtotal_cents)}元")
+        lines.append(f"滿減優惠: -{quote.discount_amount}元 (滿{quote.discount_threshold}減{quote.discount_amount})")
+    lines.append(f"總計: {format_yuan(quote.final_cents)}元")
+    lines.append('='*30)
+    return "\n".join(lines)
+
+
+def render_gui_receipt(quote, code):
+    """GUI結果區的購物小票（純文字，不含最後的換行）"""
+    return "".join(render_gui_segments(quote, code)[::2])[:-1]
+
+
+def render_gui_segments(quote, code):
+    """
+    GUI結果區的購物小票，以(文字, 標籤, 文字, 標籤, ...)攤平的tuple返回
+    可直接傳給Text.insert一次插入；每行都以換行結尾，相鄰同標籤的行已合併成一段
+    """
+    (apple_name, apple_price, _), (strawberry_name, strawberry_price, _), (mango_name, mango_price, _) = \
+        quote.unit_prices
+    rule = "=" * 40 + "\n"
+    dash = "-" * 30 + "\n"
+
+    # 標題
+    head = rule
+    title = f"顧客{code} 購物小票\n"
+
+    # 購買清單
+    items = rule + "\n"
+    body = dash
+    if quote.apple_weight > 0:
+        body += (f" {apple_name}: {quote.apple_weight}斤 × {apple_price}元/斤{_gui_discount_text(quote.apple_discount)} = "
+                 f"{format_yuan(quote.apple_cents)}元\n")
+    if quote.strawberry_weight > 0:
+        body += (f" {strawberry_name}: {quote.strawberry_weight}斤 × {strawberry_price}元/斤"
+                 f"{_gui_discount_text(quote.strawberry_discount)} = {format_yuan(quote.strawberry_cents)}元\n")
+    if quote.mango_weight > 0:
+        body += (f" {mango_name}: {quote.mango_weight}斤 × {mango_price}元/斤{_gui_discount_text(quote.mango_discount)} = "
+                 f"{format_yuan(quote.mango_cents)}元\n")
+    body += dash + "\n"
+
+    # 小計
+    subtotal = f"【小計】 {format_yuan(quote.subtotal_cents)}元\n"
+
+    segments = (head, 'normal', title, 'title', items, 'normal', "【購買清單】\n", 'title',
+                body, 'normal', subtotal, 'title')
+
+    # 優惠信息（簡化版）
+    if quote.discount_tiers is not None:
+        tier = ""
+        if quote.discount_applied:
+            tier = (f"滿減優惠: -{quote.discount_amount}元 "
+                    f"(滿{quote.discount_threshold}減{quote.discount_amount}，第{quote.tier_index + 1}檔)\n")
+        segments += ("\n", 'normal', tier + f"下一檔: {quote.next_tier_message}\n", 'discount',
+                     "\n" + rule, 'normal')
+    elif quote.discount_applied:
+        segments += ("\n", 'normal', f"滿減優惠: -{quote.discount_amount}元\n", 'discount',
+                     "\n" + rule, 'normal')
+    else:
+        segments += ("\n" + rule, 'normal')
+
+    # 總計
+    segments += (f"【應付總額】 {format_yuan(quote.final_cents)}元\n", 'title', rule, 'normal')
+    return segments
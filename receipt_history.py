@@ -0,0 +1,62 @@
+"""
+歷史小票記錄
+
+只保存報價物件（QuoteResult）與方案代碼、時間，列表文字與小票內容在顯示時才產生，
+GUI的歷史面板只取可見範圍的列，十萬筆以上仍可流暢捲動。
+"""
+import datetime
+
+from money import format_yuan
+
+
+class ReceiptHistory:
+    """
+    歷史小票
+    參數:
+        maxlen: 最多保留筆數，超過時捨棄最舊的一半；None表示不限制
+    """
+    def __init__(self, maxlen=None):
+        self.maxlen = maxlen
+        self._times = []
+        self._codes = []
+        self._quotes = []
+
+    def append(self, code, quote, when=None):
+        """加入一筆小票，返回其索引"""
+        if self.maxlen is not None and len(self._quotes) >= self.maxlen:
+            drop = max(1, self.maxlen // 2)
+            del self._times[:drop], self._codes[:drop], self._quotes[:drop]
+        self._times.append(when if when is not None else datetime.datetime.now())
+        self._codes.append(code)
+        self._quotes.append(quote)
+        return len(self._quotes) - 1
+
+    def clear(self):
+        self._times.clear()
+        self._codes.clear()
+        self._quotes.clear()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def code(self, index):
+        return self._codes[index]
+
+    def quote(self, index):
+        return self._quotes[index]
+
+    def row_text(self, index):
+        """列表顯示文字，例如「#12 14:03:27 顧客D 110.4元」"""
+        quote = self._quotes[index]
+        return (f"#{index + 1} {self._times[index]:%H:%M:%S} 顧客{self._codes[index]} "
+                f"{format_yuan(quote.final_cents)}元")
+
+    def rows(self, start, stop):
+        """[start, stop)範圍內的列表文字（自動裁切到有效範圍）"""
+        start = max(0, start)
+        stop = min(stop, len(self._quotes))
+        return [self.row_text(index) for index in range(start, stop)]
+
+    def receipt_text(self, index):
+        """第index筆的GUI小票文字"""
+        return self._quotes[index].gui_receipt_text(self._codes[index])
@@ -0,0 +1,135 @@
+"""
+批量小票輸出
+
+大量重印小票（例如稽核）時，逐張print()的系統呼叫成本遠高於排版本身。
+ReceiptWriter把小票排版後累積在可重複使用的緩衝區，滿了才整塊寫出；
+內容與print_receipt的輸出逐位元組相同（小票文字加換行，UTF-8編碼）。
+
+可選的分框格式：每張小票前加4位元組的長度標頭（小端序），並在索引檔寫入
+每張小票的(位移, 長度)固定寬度記錄，之後可依序號直接讀取任一張小票。
+"""
+import struct
+
+from quotes import render_receipt
+
+# 分框標頭：小票長度（位元組）
+FRAME_HEADER = struct.Struct('<I')
+# 索引記錄：分框起點位移、小票長度（位元組）
+INDEX_RECORD = struct.Struct('<QI')
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class ReceiptWriter:
+    """
+    批量小票輸出
+    參數:
+        stream: 以二進位模式開啟的輸出檔（或spool）
+        index: 以二進位模式開啟的索引檔；指定時自動使用分框格式
+        framed: 是否使用分框格式（未指定索引檔時也可單獨使用）
+        buffer_size: 緩衝區累積到多少位元組（無分框時以字元計）時寫出
+        encoding: 文字編碼，需與print_receipt輸出時的編碼相同
+    索引記錄的是檔案中的絕對位移：可定位的輸出檔（例如以附加模式開啟的既有檔案）從目前位置起算，
+    不可定位的串流（管線）視為從0起算；索引檔不在開頭時小票序號接續其中已有的記錄數
+    """
+    def __init__(self, stream, index=None, framed=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                 encoding='utf-8'):
+        self.stream = stream
+        self.index = index
+        self.framed = framed if framed is not None else index is not None
+        if index is not None and not self.framed:
+            raise ValueError("索引檔需要使用分框格式")
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.count = 0
+        self._buffer = bytearray()       # 分框格式：已編碼的位元組
+        self._text = []                  # 無分框：待寫出的小票文字，寫出時一次編碼
+        self._text_size = 0
+        self._index_buffer = bytearray()
+        # 輸出檔中下一個分框的位移（起始位置加上已寫出與緩衝中的位元組數）
+        self._offset = stream.tell() if stream.seekable() else 0
+        if index is not None and index.seekable():
+            position = index.tell()
+            if position % INDEX_RECORD.size:
+                raise ValueError(f"索引檔位置 {position} 不是完整記錄的邊界")
+            self.count = position // INDEX_RECORD.size
+
+    def write_text(self, text):
+        """寫入一張已排版的小票（不含最後的換行），返回小票序號"""
+        number = self.count
+        self.count = number + 1
+        if not self.framed:
+            # 無分框時不需要逐張的位元組長度，累積文字後整塊編碼
+            self._text.append(text)
+            self._text_size += len(text)
+            if self._text_size >= self.buffer_size:
+                self.flush()
+            return number
+        
+        data = (text + "\n").encode(self.encoding)
+        buffer = self._buffer
+        if self.index is not None:
+            self._index_buffer += INDEX_RECORD.pack(self._offset, len(data))
+        buffer += FRAME_HEADER.pack(len(data))
+        buffer += data
+        self._offset += FRAME_HEADER.size + len(data)
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+        return number
+
+    def write_quote(self, quote, customer_name=""):
+        """排版並寫入報價的小票（與print_receipt相同的格式），返回小票序號"""
+        return self.write_text(render_receipt(quote, customer_name))
+
+    def flush(self):
+        """把緩衝區整塊寫出並清空（緩衝區物件保留重複使用）"""
+        if self._text:
+            self._text.append("")  # 最後一張小票的換行
+            self.stream.write("\n".join(self._text).encode(self.encoding))
+            self._text.clear()
+            self._text_size = 0
+        if self._buffer:
+            self.stream.write(self._buffer)
+            self._buffer.clear()
+        if self._index_buffer:
+            self.index.write(self._index_buffer)
+            self._index_buffer.clear()
+
+    def close(self):
+        """寫出剩餘內容（不關閉串流）"""
+        self.flush()
+        self.stream.flush()
+        if self.index is not None:
+            self.index.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_receipt(stream, index, number, encoding='utf-8'):
+    """依索引讀取第number張小票的文字（含最後的換行）"""
+    index.seek(number * INDEX_RECORD.size)
+    record = index.read(INDEX_RECORD.size)
+    if len(record) < INDEX_RECORD.size:
+        raise IndexError(f"小票序號超出範圍: {number}")
+    offset, length = INDEX_RECORD.unpack(record)
+    stream.seek(offset + FRAME_HEADER.size)
+    return stream.read(length).decode(encoding)
+
+
+def iter_framed_receipts(stream, encoding='utf-8'):
+    """依序讀出分框格式檔案中的每張小票（不需要索引檔）"""
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("分框標頭不完整")
+        (length,) = FRAME_HEADER.unpack(header)
+        data = stream.read(length)
+        if len(data) < length:
+            raise ValueError("小票內容不完整")
+        yield data.decode(encoding)
@@ -0,0 +1,111 @@
+"""
+分級滿減
+
+實際的促銷常是多檔滿減（滿100減10、滿200減25、滿500減70……），一個活動可能有上百檔。
+ThresholdTiers將各檔的門檻與減額換算成分，依門檻排序後存成兩個平行的tuple：
+逐筆計價以bisect二分搜尋找出小計達到的最高一檔，成本為O(log 檔數)；
+批量計價以numpy.searchsorted一次查出整欄（numpy在第一次批量查詢時才載入）。
+
+ThresholdTiers不可變且可雜湊，可作為報價快取鍵的一部分。
+"""
+import bisect
+
+from money import format_yuan, to_cents
+
+
+class ThresholdTiers:
+    """
+    依門檻排序的分級滿減表
+    參數:
+        tiers: (門檻, 減額)序列，單位為元，順序不限；門檻必須大於0且不可重複
+    """
+    __slots__ = ('thresholds', 'amounts', 'threshold_cents', 'amount_cents', '_arrays')
+
+    def __init__(self, tiers):
+        rows = sorted((to_cents(threshold), to_cents(amount), threshold, amount)
+                      for threshold, amount in tiers)
+        if not rows:
+            raise ValueError("分級滿減至少需要一檔")
+        previous = None
+        for threshold_cents, amount_cents, threshold, amount in rows:
+            if threshold_cents <= 0:
+                raise ValueError(f"滿減門檻必須大於0: {threshold!r}")
+            if amount_cents < 0:
+                raise ValueError(f"滿減金額不能為負數: {amount!r}")
+            if threshold_cents == previous:
+                raise ValueError(f"重複的滿減門檻: {threshold!r}")
+            previous = threshold_cents
+        self.threshold_cents = tuple(row[0] for row in rows)
+        self.amount_cents = tuple(row[1] for row in rows)
+        self.thresholds = tuple(row[2] for row in rows)   # 原始門檻（元），供顯示
+        self.amounts = tuple(row[3] for row in rows)      # 原始減額（元），供顯示
+        self._arrays = None
+
+    def index_for(self, subtotal_cents):
+        """小計（分）達到的最高一檔的索引；未達任何一檔時為-1"""
+        return bisect.bisect_right(self.threshold_cents, subtotal_cents) - 1
+
+    def discount_cents(self, subtotal_cents):
+        """小計（分）可減的金額（分）"""
+        index = bisect.bisect_right(self.threshold_cents, subtotal_cents)
+        return self.amount_cents[index - 1] if index else 0
+
+    def next_tier(self, subtotal_cents):
+        """小計（分）尚未達到的下一檔：(索引, 還差多少分)；已達最高一檔時為None"""
+        index = bisect.bisect_right(self.threshold_cents, subtotal_cents)
+        if index == len(self.threshold_cents):
+            return None
+        return index, self.threshold_cents[index] - subtotal_cents
+
+    def label(self, index):
+        """第index檔的說明，例如「滿200減25」"""
+        return f"滿{self.thresholds[index]}減{self.amounts[index]}"
+
+    def _sorted_arrays(self):
+        arrays = self._arrays
+        if arrays is None:
+            import numpy as np  # 只有批量查詢時才載入
+            # 減額表前面補0，searchsorted的結果可直接當索引（未達任何一檔時取到0）
+            arrays = self._arrays = (np.array(self.threshold_cents, dtype=np.int64),
+                                     np.array((0,) + self.amount_cents, dtype=np.int64))
+        return arrays
+
+    def indexes_for(self, subtotals_cents):
+        """index_for的向量版：各筆小計（分）達到的最高一檔索引（int64陣列，未達時為-1）"""
+        thresholds, _ = self._sorted_arrays()
+        return thresholds.searchsorted(subtotals_cents, side='right') - 1
+
+    def discounts_cents(self, subtotals_cents):
+        """discount_cents的向量版：各筆小計（分）可減的金額（int64陣列）"""
+        thresholds, amounts = self._sorted_arrays()
+        return amounts[thresholds.searchsorted(subtotals_cents, side='right')]
+
+    def __len__(self):
+        return len(self.threshold_cents)
+
+    def __iter__(self):
+        """依門檻順序產出(門檻, 減額)（元）"""
+        return zip(self.thresholds, self.amounts)
+
+    def __eq__(self, other):
+        if not isinstance(other, ThresholdTiers):
+            return NotImplemented
+        return self.threshold_cents == other.threshold_cents and self.amount_cents == other.amount_cents
+
+    def __hash__(self):
+        return hash((self.threshold_cents, self.amount_cents))
+
+    def __repr__(self):
+        return f"ThresholdTiers({list(self)!r})"
+
+    def __str__(self):
+        return "、".join(self.label(index) for index in range(len(self)))
+
+
+def tier_message(tiers, subtotal_cents):
+    """小票上的下一檔提示，例如「再買12.5元即可享滿200減25」；已達最高一檔時為「已達最高一檔優惠」"""
+    upcoming = tiers.next_tier(subtotal_cents)
+    if upcoming is None:
+        return "已達最高一檔優惠"
+    index, remaining = upcoming
+    return f"再買{format_yuan(remaining)}元即可享{tiers.label(index)}"
@@ -0,0 +1,381 @@
+"""
+計價正確性驗證
+
+面試題要求「無論數值為多少，均需驗證程序計算結果的正確性」。本模組以獨立的精確有理數
+參考實作（fractions.Fraction推導各水果每斤的金額，不經過money的基點換算）逐筆核對各條
+正式計價路徑：calculate_customer_a~d、編譯後的方案計價函數、calculate_price_cents、
+get_quote，以及numpy批量計價。
+
+驗證案例分為三類：
+    exhaustive  小範圍斤數的全部組合
+    edge        各方案滿減門檻（分級滿減為每一檔）附近，小計與門檻相差不到edge_window分的全部購物籃
+    random      大範圍的隨機斤數（均勻分布與對數分布各半）
+案例依區塊分配給多個行程平行驗證；發現不一致時逐步縮小斤數，輸出最小的反例。
+
+用法:
+    python verification.py [--exhaustive 30] [--random 1000000] [--workers 0]
+"""
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from itertools import repeat
+from operator import attrgetter
+
+import numpy as np
+
+from pricing_core import BASKET_SKUS, ShoppingSystem
+
+# 受驗證的計價路徑（前四項逐筆呼叫，batch為numpy向量化）
+PATHS = ('calculate_customer', 'pricer', 'calculate_price_cents', 'get_quote', 'batch')
+DEFAULT_EXHAUSTIVE = 30
+DEFAULT_RANDOM = 1_000_000
+DEFAULT_MAX_WEIGHT = 10 ** 9
+DEFAULT_EDGE_WINDOW = 2000  # 分
+DEFAULT_CHUNK = 200_000
+# 每個區塊每條路徑最多回報的不一致筆數
+MAX_FAILURES = 5
+
+
+class Reference:
+    """
+    精確參考計價：每斤金額為有理數 100×單價×折扣 = n/d（分），
+    每行金額 floor((2·n·斤數 + d) / 2d) 即四捨五入到分，再依門檻（分，有理數）比較滿減；
+    分級滿減逐檔比較，取小計達到的最高一檔（不經過bisect/searchsorted）
+    """
+    def __init__(self, system, code):
+        promotion = system.promotions[code]
+        snapshot = system.catalog.snapshot
+        self.code = code
+        self.skus = tuple(sku for sku in BASKET_SKUS if promotion.sells(sku))
+        self.rates = {}
+        for sku in BASKET_SKUS:
+            price = Fraction(str(snapshot.prices[snapshot.index_of(sku)]))
+            rate = Fraction(str(promotion.discount_for(sku)))
+            self.rates[sku] = 100 * price * rate if sku in self.skus else Fraction(0)
+        # 小計為整數分，與有理數門檻比較等同於與其無條件進位後的整數比較
+        if promotion.discount_tiers is not None:
+            tiers = list(promotion.discount_tiers)
+        elif promotion.discount_threshold > 0:
+            tiers = [(promotion.discount_threshold, promotion.discount_amount)]
+        else:
+            tiers = []
+        self.tiers = []  # [(門檻(分), 減額(分)), ...]，依門檻遞增
+        for threshold, amount in sorted(tiers, key=lambda tier: Fraction(str(tier[0]))):
+            exact = 100 * Fraction(str(amount))
+            if exact.denominator != 1:
+                raise ValueError(f"方案{code}的滿減金額不是整數分: {amount}")
+            self.tiers.append((math.ceil(100 * Fraction(str(threshold))), int(exact)))
+
+    def subtotal_cents(self, apple, strawberry, mango):
+        """小計（分，Python整數與Fraction，逐筆）"""
+        total = 0
+        for sku, weight in zip(BASKET_SKUS, (apple, strawberry, mango)):
+            exact = self.rates[sku] * weight
+            total += (2 * exact.numerator + exact.denominator) // (2 * exact.denominator)
+        return total
+
+    def price_cents(self, apple, strawberry, mango):
+        """應付總額（分，逐筆）"""
+        total = self.subtotal_cents(apple, strawberry, mango)
+        discount = 0
+        for threshold, amount in self.tiers:
+            if total >= threshold:
+                discount = amount
+        return total - discount
+
+    def subtotal_cents_array(self, apple, strawberry, mango):
+        """小計（分，int64陣列）；與subtotal_cents相同的整數運算，斤數上限見max_weight"""
+        total = np.zeros(len(apple), dtype=np.int64)
+        for sku, weight in zip(BASKET_SKUS, (apple, strawberry, mango)):
+            rate = self.rates[sku]
+            if rate:
+                n, d = rate.numerator, rate.denominator
+                total += (2 * n * weight.astype(np.int64) + d) // (2 * d)
+        return total
+
+    def price_cents_array(self, apple, strawberry, mango):
+        """應付總額（分，int64陣列）"""
+        total = self.subtotal_cents_array(apple, strawberry, mango)
+        discount = np.zeros(len(total), dtype=np.int64)
+        for threshold, amount in self.tiers:
+            discount[total >= threshold] = amount
+        return total - discount
+
+    def max_weight(self):
+        """price_cents_array不會溢位的斤數上限"""
+        largest = max((rate.numerator for rate in self.rates.values()), default=1) or 1
+        return (2 ** 62) // (2 * largest)
+
+
+def production_paths(system, code):
+    """{路徑名稱: 逐筆計價函數(蘋果, 草莓, 芒果) -> 分}，batch另外以向量化方式驗證（縮小反例時使用）"""
+    promotion = system.promotions[code]
+    customer = getattr(system, f"calculate_customer_{code.lower()}", None)
+    params = (promotion.discount_for('strawberry'), promotion.discount_threshold,
+              promotion.discount_amount, promotion.discount_tiers, promotion.discounts)
+    paths = {}
+    if customer is not None:
+        if promotion.sells('mango'):
+            paths['calculate_customer'] = lambda a, s, m: round(customer(a, s, m) * 100)
+        else:
+            paths['calculate_customer'] = lambda a, s, m: round(customer(a, s) * 100)
+    paths['pricer'] = system.pricers[code]
+    paths['calculate_price_cents'] = lambda a, s, m: system.calculate_price_cents(a, s, m, *params)
+    paths['get_quote'] = lambda a, s, m: system.get_quote(a, s, m, *params).final_cents
+    return paths
+
+
+def chunk_paths(system, code):
+    """
+    {路徑名稱: 區塊計價函數(蘋果列表, 草莓列表, 芒果列表) -> 分的列表}
+    與production_paths相同的呼叫，但以map一次走完整個區塊：固定參數以repeat傳入，
+    元→分的換算在區塊結束後以numpy一次完成，不為每筆多一層lambda呼叫
+    """
+    promotion = system.promotions[code]
+    customer = getattr(system, f"calculate_customer_{code.lower()}", None)
+    params = (promotion.discount_for('strawberry'), promotion.discount_threshold,
+              promotion.discount_amount, promotion.discount_tiers, promotion.discounts)
+    final_cents = attrgetter('final_cents')
+
+    def constants(columns):
+        return [repeat(param, len(columns[0])) for param in params]
+
+    paths = {}
+    if customer is not None:
+        def calculate_customer(*columns):
+            args = columns if promotion.sells('mango') else columns[:2]
+            # 與round(元 × 100)相同：兩者都是四捨六入五成雙
+            return np.rint(np.array(list(map(customer, *args))) * 100).astype(np.int64).tolist()
+        paths['calculate_customer'] = calculate_customer
+    pricer = system.pricers[code]
+    paths['pricer'] = lambda *columns: list(map(pricer, *columns))
+    paths['calculate_price_cents'] = lambda *columns: list(
+        map(system.calculate_price_cents, *columns, *constants(columns)))
+    paths['get_quote'] = lambda *columns: list(
+        map(final_cents, map(system.get_quote, *columns, *constants(columns))))
+    return paths
+
+
+def generate_cases(reference, kind, start, count, seed=0, exhaustive=DEFAULT_EXHAUSTIVE,
+                   max_weight=DEFAULT_MAX_WEIGHT, edge_window=DEFAULT_EDGE_WINDOW):
+    """
+    產生第start筆起count筆案例，返回(蘋果, 草莓, 芒果)三個int64陣列
+    方案不販售的水果斤數為0；random依seed與start決定，結果可重現
+    """
+    sold = [sku in reference.skus for sku in BASKET_SKUS]
+    if kind == 'exhaustive':
+        sizes = [exhaustive + 1 if s else 1 for s in sold]
+        index = np.arange(start, min(start + count, int(np.prod(sizes))), dtype=np.int64)
+        return tuple(np.unravel_index(index, sizes))
+    if kind == 'edge':
+        weights = edge_cases(reference, edge_window)
+        return tuple(w[start:start + count] for w in weights)
+    if kind == 'random':
+        rng = np.random.default_rng([seed, start])
+        columns = []
+        for s in sold:
+            if not s:
+                columns.append(np.zeros(count, dtype=np.int64))
+                continue
+            uniform = rng.integers(0, max_weight + 1, count, dtype=np.int64)
+            # 對數分布：各數量級的斤數都會出現
+            log = np.floor(np.exp(rng.uniform(0, np.log(max_weight + 1), count))).astype(np.int64) - 1
+            columns.append(np.where(rng.random(count) < 0.5, uniform, log.clip(0, max_weight)))
+        return tuple(columns)
+    raise ValueError(f"未知的案例種類: {kind}")
+
+
+def edge_cases(reference, window):
+    """小計落在任一門檻前後window分內的全部購物籃（無滿減的方案沒有此類案例）"""
+    if not reference.tiers:
+        return tuple(np.zeros(0, dtype=np.int64) for _ in BASKET_SKUS)
+    limit = reference.tiers[-1][0] + window
+    ranges = []
+    for sku in BASKET_SKUS:
+        rate = reference.rates[sku]
+        top = int(limit / rate) + 1 if rate else 0
+        ranges.append(np.arange(top + 1, dtype=np.int64))
+    grid = np.meshgrid(*ranges, indexing='ij')
+    weights = tuple(g.ravel() for g in grid)
+    subtotal = reference.subtotal_cents_array(*weights)
+    thresholds = np.array([threshold for threshold, _ in reference.tiers], dtype=np.int64)
+    # 與最接近的門檻（排序後夾住小計的兩檔之一）比較
+    position = thresholds.searchsorted(subtotal)
+    below = thresholds[np.maximum(position - 1, 0)]
+    above = thresholds[np.minimum(position, len(thresholds) - 1)]
+    nearest = np.minimum(np.abs(subtotal - below), np.abs(subtotal - above))
+    near = nearest <= window
+    return tuple(w[near] for w in weights)
+
+
+def case_count(reference, kind, random_cases=DEFAULT_RANDOM, exhaustive=DEFAULT_EXHAUSTIVE,
+               edge_window=DEFAULT_EDGE_WINDOW):
+    if kind == 'exhaustive':
+        return (exhaustive + 1) ** len(reference.skus)
+    if kind == 'edge':
+        return len(edge_cases(reference, edge_window)[0])
+    return random_cases
+
+
+def verify_chunk(system, code, kind, start, count, options, paths=PATHS):
+    """
+    驗證一個區塊
+    返回:
+        (案例數, [(路徑, 方案, 蘋果, 草莓, 芒果, 結果, 正確值), ...])
+    """
+    reference = Reference(system, code)
+    apple, strawberry, mango = generate_cases(reference, kind, start, count, **options)
+    expected = reference.price_cents_array(apple, strawberry, mango)
+    failures = []
+
+    if 'batch' in paths and len(apple):
+        got = system.calculate_prices_batch_cents(apple, strawberry, mango, np.full(len(apple), code))
+        for i in np.flatnonzero(got != expected)[:MAX_FAILURES].tolist():
+            failures.append(('batch', code, int(apple[i]), int(strawberry[i]), int(mango[i]),
+                             int(got[i]), int(expected[i])))
+
+    columns = (apple.tolist(), strawberry.tolist(), mango.tolist())
+    expected_list = expected.tolist()
+    for name, price in chunk_paths(system, code).items():
+        if name not in paths:
+            continue
+        got = price(*columns)
+        if got != expected_list:
+            bad = [i for i, (g, e) in enumerate(zip(got, expected_list)) if g != e]
+            for i in bad[:MAX_FAILURES]:
+                failures.append((name, code, columns[0][i], columns[1][i], columns[2][i],
+                                 got[i], expected_list[i]))
+    return len(apple), failures
+
+
+def minimize(system, failure):
+    """
+    縮小反例：在仍然不一致的前提下，反覆嘗試減少各水果的斤數，
+    返回最小的(路徑, 方案, 蘋果, 草莓, 芒果, 結果, 正確值)
+    """
+    name, code, *weights, _, _ = failure
+    reference = Reference(system, code)
+    if name == 'batch':
+        def price(a, s, m):
+            return int(system.calculate_prices_batch_cents([a], [s], [m], [code])[0])
+    else:
+        price = production_paths(system, code)[name]
+
+    def fails(candidate):
+        return price(*candidate) != reference.price_cents(*candidate)
+
+    changed = True
+    while changed:
+        changed = False
+        for i, weight in enumerate(weights):
+            # 先試歸零，再以逐次減半的步長往下減（步長1時即逐一遞減）
+            step = weight
+            while step:
+                candidate = list(weights)
+                candidate[i] = weights[i] - step
+                if fails(candidate):
+                    weights = candidate
+                    changed = True
+                    step = min(step, weights[i])
+                else:
+                    step //= 2
+    return (name, code, *weights, price(*weights), reference.price_cents(*weights))
+
+
+_worker_system = None
+
+
+def _init_worker():
+    global _worker_system
+    _worker_system = ShoppingSystem()
+
+
+def _verify_task(task):
+    code, kind, start, count, options, paths = task
+    return verify_chunk(_worker_system, code, kind, start, count, options, paths)
+
+
+def plan_tasks(system, kinds=('exhaustive', 'edge', 'random'), random_cases=DEFAULT_RANDOM,
+               exhaustive=DEFAULT_EXHAUSTIVE, max_weight=DEFAULT_MAX_WEIGHT,
+               edge_window=DEFAULT_EDGE_WINDOW, seed=0, chunk=DEFAULT_CHUNK, paths=PATHS):
+    """將各方案、各類案例切成區塊：[(方案, 種類, 起點, 筆數, 產生參數, 路徑), ...]"""
+    tasks = []
+    for code in sorted(system.promotions):
+        reference = Reference(system, code)
+        if max_weight > reference.max_weight():
+            raise ValueError(f"方案{code}的斤數上限最多為{reference.max_weight()}")
+        options = {'seed': seed, 'exhaustive': exhaustive, 'max_weight': max_weight,
+                   'edge_window': edge_window}
+        for kind in kinds:
+            total = case_count(reference, kind, random_cases, exhaustive, edge_window)
+            for start in range(0, total, chunk):
+                tasks.append((code, kind, start, min(chunk, total - start), options, tuple(paths)))
+    return tasks
+
+
+def run_verification(workers=None, system=None, **plan):
+    """
+    平行執行全部驗證
+    參數:
+        workers: 行程數，None或0表示CPU核心數，1表示在目前行程中執行
+        plan: 見plan_tasks
+    返回:
+        (案例數, 最小化後的反例列表)
+    """
+    system = system if system is not None else ShoppingSystem()
+    tasks = plan_tasks(system, **plan)
+    workers = workers or os.cpu_count() or 1
+    checked = 0
+    failures = []
+    if workers == 1:
+        results = (verify_chunk(system, *task) for task in tasks)
+        for count, found in results:
+            checked += count
+            failures.extend(found)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for count, found in executor.map(_verify_task, tasks):
+                checked += count
+                failures.extend(found)
+    minimized = sorted({minimize(system, failure) for failure in failures})
+    return checked, minimized
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="計價正確性驗證（與精確有理數參考實作比對）")
+    parser.add_argument('--exhaustive', type=int, default=DEFAULT_EXHAUSTIVE,
+                        help="全組合驗證的斤數上限（每種水果0~N斤）")
+    parser.add_argument('--random', type=int, default=DEFAULT_RANDOM, help="每個方案的隨機案例數")
+    parser.add_argument('--max-weight', type=int, default=DEFAULT_MAX_WEIGHT, help="隨機斤數上限")
+    parser.add_argument('--edge-window', type=int, default=DEFAULT_EDGE_WINDOW,
+                        help="門檻附近案例的範圍（分）")
+    parser.add_argument('--paths', default=','.join(PATHS), help="受驗證的計價路徑，以逗號分隔")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="每個區塊的案例數")
+    parser.add_argument('--workers', type=int, default=0, help="行程數，0表示依CPU核心數")
+    args = parser.parse_args(argv)
+
+    paths = tuple(path.strip() for path in args.paths.split(',') if path.strip())
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"未知的計價路徑: {', '.join(sorted(unknown))}")
+    checked, failures = run_verification(
+        args.workers, random_cases=args.random, exhaustive=args.exhaustive,
+        max_weight=args.max_weight, edge_window=args.edge_window, seed=args.seed,
+        chunk=args.chunk, paths=paths)
+    print(f"已驗證 {checked:,} 筆案例 × {len(paths)} 條計價路徑")
+    if not failures:
+        print("全部與精確參考值一致")
+        return 0
+    print(f"發現 {len(failures)} 個反例（已縮小）:")
+    for name, code, apple, strawberry, mango, got, expected in failures:
+        print(f"  {name} 方案{code} 蘋果{apple} 草莓{strawberry} 芒果{mango}: "
+              f"結果 {got} 分，正確值 {expected} 分")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())